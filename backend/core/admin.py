@@ -1,9 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import User
-from django.db.models import Count
 from django.utils.html import format_html
-from .models import TruckAssessment
+from .models import NotificationOutbox, TruckAssessment
+from .search import search_assessments
+from .summaries import URGENCY_COUNTERS, get_total_summary
 
 @admin.register(TruckAssessment)
 class TruckAssessmentAdmin(admin.ModelAdmin):
@@ -13,20 +14,28 @@ class TruckAssessmentAdmin(admin.ModelAdmin):
     date_hierarchy = 'assessment_date'
 
     def changelist_view(self, request, extra_context=None):
-        # Get assessment counts by urgency level
-        urgency_summary = TruckAssessment.objects.values('urgency_level').annotate(count=Count('id'))
-        
-        # Prepare data for a simple bar chart
+        # Assessment counts by urgency level, read from the maintained summary row
+        summary = get_total_summary()
         urgency_data = [
-            {'urgency': item['urgency_level'], 'count': item['count']}
-            for item in urgency_summary
+            {'urgency': urgency, 'count': getattr(summary, field)}
+            for urgency, field in URGENCY_COUNTERS.items()
+            if getattr(summary, field)
         ]
+        unknown = summary.assessments - sum(item['count'] for item in urgency_data)
+        if unknown:
+            urgency_data.append({'urgency': None, 'count': unknown})
 
         extra_context = extra_context or {}
         extra_context['urgency_data'] = urgency_data
 
         return super().changelist_view(request, extra_context=extra_context)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Indexed full-text search (core.search) instead of ILIKE '%...%' over damage_description
+        if not search_term.strip():
+            return queryset, False
+        return search_assessments(search_term, queryset), False
+
     def priority_distribution(self, obj):
         # Create a simple color-coded representation of priority
         color = 'green' if obj.priority_score < 3 else 'orange' if obj.priority_score < 7 else 'red'
@@ -35,6 +44,21 @@ class TruckAssessmentAdmin(admin.ModelAdmin):
     priority_distribution.short_description = 'Priority'
 
 
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'channel', 'recipient', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'kind', 'channel')
+    search_fields = ('recipient',)
+    readonly_fields = ('assessment', 'digest_assessments', 'message', 'provider_response', 'last_error', 'dispatcher', 'created_at', 'claimed_at', 'sent_at')
+    actions = ['requeue']
+
+    @admin.action(description='Send again')
+    def requeue(self, request, queryset):
+        from .notifications import requeue_dead_notifications
+        count = requeue_dead_notifications(list(queryset.values_list('id', flat=True)))
+        self.message_user(request, f"Requeued {count} dead-lettered notification(s)")
+
+
 class CustomUserAdmin(UserAdmin):
     model = User
     list_display = ['username', 'email', 'is_verified', 'user_type', 'is_staff', 'is_active']
@@ -0,0 +1,196 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Avg, Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .dashboard import InvalidDashboardQuery, parse_date_bound
+from .models import DamageDetection, TruckAssessment
+from .response_cache import bump_table_version, get_table_version, response_cache
+
+# Trend aggregates computed in the database: one GROUP BY (period, urgency_level) or
+# (period, damage_class) query per request. Periods that have ended can only change
+# when an existing assessment is edited, rescored or deleted (new assessments always
+# land in the current period), so their rows are cached per period under a history
+# version that only those changes bump; a poll recomputes just the open period.
+HISTORY_VERSION = 'truck_assessment_history'
+INTERVALS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+DEFAULT_BUCKETS = {'day': 30, 'week': 12, 'month': 12}
+GROUP_BY = ['urgency', 'damage_class']
+# Changing these on an existing assessment rewrites closed periods
+ANALYTICS_FIELDS = ['assessment_date', 'urgency_level', 'severity_score', 'priority_score', 'estimated_repair_cost', 'damages']
+
+
+@receiver(post_save, sender=TruckAssessment)
+def bump_history_on_update(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(ANALYTICS_FIELDS):
+        return
+    bump_table_version(HISTORY_VERSION)
+
+
+@receiver(post_delete, sender=TruckAssessment)
+def bump_history_on_delete(sender, instance, **kwargs):
+    bump_table_version(HISTORY_VERSION)
+
+
+def period_start(moment, interval):
+    day = timezone.localtime(moment).date()
+    if interval == 'week':
+        day -= timedelta(days=day.weekday())
+    elif interval == 'month':
+        day = day.replace(day=1)
+    return day
+
+
+def next_period(day, interval):
+    if interval == 'day':
+        return day + timedelta(days=1)
+    if interval == 'week':
+        return day + timedelta(days=7)
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def previous_period(day, interval):
+    if interval == 'day':
+        return day - timedelta(days=1)
+    if interval == 'week':
+        return day - timedelta(days=7)
+    return (day - timedelta(days=1)).replace(day=1)
+
+
+def period_bounds(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def parse_analytics_query(params):
+    interval = params.get('interval', 'day')
+    if interval not in INTERVALS:
+        raise InvalidDashboardQuery(f"Invalid interval {interval!r}")
+    group_by = params.get('group_by', 'urgency')
+    if group_by not in GROUP_BY:
+        raise InvalidDashboardQuery(f"Invalid group_by {group_by!r}")
+
+    date_to = parse_date_bound(params.get('date_to'), end_of_day=True) or timezone.now()
+    last = period_start(date_to, interval)
+    date_from = parse_date_bound(params.get('date_from'))
+    if date_from:
+        first = period_start(date_from, interval)
+    else:
+        first = last
+        for _ in range(DEFAULT_BUCKETS[interval] - 1):
+            first = previous_period(first, interval)
+    if first > last:
+        raise InvalidDashboardQuery('date_from is after date_to')
+
+    periods = [first]
+    while periods[-1] < last:
+        periods.append(next_period(periods[-1], interval))
+        if len(periods) > settings.ANALYTICS_MAX_BUCKETS:
+            raise InvalidDashboardQuery(f"More than {settings.ANALYTICS_MAX_BUCKETS} buckets; narrow the date range")
+    return interval, group_by, periods
+
+
+def query_buckets(interval, group_by, start, end):
+    # {period: [group rows]} for start <= assessment_date < end, in one query
+    trunc = INTERVALS[interval]
+    if group_by == 'urgency':
+        rows = (
+            TruckAssessment.objects.filter(assessment_date__gte=start, assessment_date__lt=end)
+            .annotate(period=trunc('assessment_date'))
+            .order_by()
+            .values('period', 'urgency_level')
+            .annotate(
+                assessments=Count('id'),
+                total_repair_cost=Sum('estimated_repair_cost'),
+                avg_severity=Avg('severity_score'),
+                avg_priority=Avg('priority_score'),
+            )
+        )
+        key = 'urgency_level'
+    else:
+        # Costs are per assessment and can't be split between its damage classes
+        rows = (
+            DamageDetection.objects.filter(assessment_date__gte=start, assessment_date__lt=end)
+            .annotate(period=trunc('assessment_date'))
+            .order_by()
+            .values('period', 'damage_class')
+            .annotate(
+                detections=Count('id'),
+                assessments=Count('assessment', distinct=True),
+                avg_confidence=Avg('confidence'),
+                avg_severity=Avg('assessment__severity_score'),
+                avg_priority=Avg('assessment__priority_score'),
+            )
+        )
+        key = 'damage_class'
+
+    buckets = {}
+    for row in rows:
+        period = period_start(row.pop('period'), interval).isoformat()
+        for field in ['avg_severity', 'avg_priority', 'avg_confidence']:
+            if row.get(field) is not None:
+                row[field] = round(float(row[field]), 3)
+        if row.get('total_repair_cost') is not None:
+            row['total_repair_cost'] = str(Decimal(str(row['total_repair_cost'])).quantize(Decimal('0.01')))
+        buckets.setdefault(period, []).append(row)
+    for groups in buckets.values():
+        groups.sort(key=lambda row: row[key] or '')
+    return buckets
+
+
+def closed_periods(periods, interval):
+    # Periods that ended more than the grace time ago (late commits land in them until then)
+    cutoff = timezone.now() - timedelta(seconds=settings.ANALYTICS_CLOSED_BUCKET_GRACE_SECONDS)
+    return [day for day in periods if period_bounds(next_period(day, interval)) <= cutoff]
+
+
+def analytics_buckets(interval, group_by, periods):
+    closed = closed_periods(periods, interval) if settings.ANALYTICS_CACHE_TTL_SECONDS > 0 else []
+    buckets = {}
+    missing = list(closed)
+    if closed:
+        cache = response_cache()
+        history = get_table_version(HISTORY_VERSION)[0]
+        keys = {f"analytics:{group_by}:{interval}:{history}:{day.isoformat()}": day for day in closed}
+        for key, groups in cache.get_many(list(keys)).items():
+            buckets[keys[key].isoformat()] = groups
+        missing = [day for key, day in keys.items() if keys[key].isoformat() not in buckets]
+
+    # One query per run of consecutive periods to compute (uncached closed ones and
+    # the open ones), so cached periods between them are not scanned again
+    open_periods = periods[len(closed):]
+    to_compute = missing + open_periods
+    runs = []
+    for day in to_compute:
+        if runs and next_period(runs[-1][-1], interval) == day:
+            runs[-1].append(day)
+        else:
+            runs.append([day])
+    for run in runs:
+        computed = query_buckets(interval, group_by, period_bounds(run[0]), period_bounds(next_period(run[-1], interval)))
+        for day in run:
+            buckets[day.isoformat()] = computed.get(day.isoformat(), [])
+    if missing:
+        cache.set_many(
+            {f"analytics:{group_by}:{interval}:{history}:{day.isoformat()}": buckets[day.isoformat()] for day in missing},
+            settings.ANALYTICS_CACHE_TTL_SECONDS,
+        )
+    return [{'period': day.isoformat(), 'groups': buckets[day.isoformat()]} for day in periods]
+
+
+def analytics_report(interval, group_by, periods):
+    return {
+        'interval': interval,
+        'group_by': group_by,
+        'buckets': analytics_buckets(interval, group_by, periods),
+    }
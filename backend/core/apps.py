@@ -3,4 +3,14 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'core'
\ No newline at end of file
+    name = 'core'
+
+    def ready(self):
+        # Signal receivers that keep AssessmentSummary in step with TruckAssessment
+        # and invalidate cached analytics buckets
+        from . import analytics, summaries  # noqa: F401
+
+        # Full-text search column/index or FTS5 table, re-created if a migration dropped it
+        from django.db.models.signals import post_migrate
+        from .search import install_search_index_after_migrate
+        post_migrate.connect(install_search_index_after_migrate, sender=self)
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import logging
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from . import metrics
+from .models import AssessmentNarrativeCache
+
+logger = logging.getLogger(__name__)
+
+
+def bucket_confidence(confidence):
+    # Round down to the bucket size so 0.81 and 0.84 share an entry.
+    bucket = settings.ASSESSMENT_LLM_CACHE_CONFIDENCE_BUCKET
+    return f"{math.floor(float(confidence) / bucket + 1e-9) * bucket:.2f}"
+
+
+def canonical_damages(damages):
+    return sorted([damage['area'].lower(), bucket_confidence(damage['confidence'])] for damage in damages)
+
+
+def damage_signature(damages, prompt_version, model_name):
+    payload = json.dumps({
+        'damages': canonical_damages(damages),
+        'prompt_version': prompt_version,
+        'model': model_name,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def cache_enabled():
+    return settings.ASSESSMENT_LLM_CACHE_TTL_SECONDS > 0
+
+
+def get_cached_assessment(damages, prompt_version, model_name):
+    if not cache_enabled():
+        return None
+
+    signature = damage_signature(damages, prompt_version, model_name)
+    cutoff = timezone.now() - timedelta(seconds=settings.ASSESSMENT_LLM_CACHE_TTL_SECONDS)
+    entry = AssessmentNarrativeCache.objects.filter(signature=signature, created_at__gte=cutoff).only('id', 'response').first()
+    if entry is None:
+        metrics.increment('llm_assessment_cache_misses')
+        return None
+
+    AssessmentNarrativeCache.objects.filter(id=entry.id).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    metrics.increment('llm_assessment_cache_hits')
+    logger.info(f"Reusing cached assessment {signature[:12]}")
+    return entry.response
+
+
+def store_assessment(damages, prompt_version, model_name, response):
+    if not cache_enabled():
+        return
+
+    now = timezone.now()
+    AssessmentNarrativeCache.objects.update_or_create(
+        signature=damage_signature(damages, prompt_version, model_name),
+        defaults={
+            'damage_signature': canonical_damages(damages),
+            'prompt_version': prompt_version,
+            'model_name': model_name,
+            'response': response,
+            'hits': 0,
+            'created_at': now,
+            'last_used_at': now,
+        },
+    )
+
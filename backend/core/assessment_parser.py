@@ -0,0 +1,106 @@
+import json
+import re
+from collections import defaultdict, deque
+
+# Single pass over the LLM assessment: every "Field: value" line of the
+# CHATBOT_PROMPT layout is recognised once, and each "Area" line starts a new
+# per-damage record. Tolerates bullets, numbering and markdown bold.
+FIELD_PATTERN = re.compile(
+    r'^[\s*\-•\d.)]*(?:\*\*)?\s*(area|severity|recommended action|estimated cost)\s*(?:\*\*)?\s*:\s*(?:\*\*)?\s*(.*?)\s*$',
+    re.IGNORECASE,
+)
+COST_PATTERN = re.compile(r'(?:₱|PHP|Php)\s*([\d,]+)')
+FIELD_NAMES = {
+    'area': 'area',
+    'severity': 'severity',
+    'recommended action': 'recommended_action',
+    'estimated cost': 'estimated_cost',
+}
+
+
+def normalize_area(area):
+    return re.sub(r'[\s\-]+', '_', area.strip().strip('*').strip().lower())
+
+
+def parse_cost(value):
+    match = COST_PATTERN.search(value)
+    if not match:
+        return None
+    digits = match.group(1).replace(',', '')
+    return int(digits) if digits else None
+
+
+def parse_text_records(text):
+    records = []
+    current = None
+    for line in text.splitlines():
+        match = FIELD_PATTERN.match(line)
+        if not match:
+            continue
+        field = FIELD_NAMES[match.group(1).lower()]
+        value = match.group(2).strip().strip('*').strip()
+        if field == 'area':
+            current = {'area': value, 'severity': None, 'recommended_action': None, 'estimated_cost': None}
+            records.append(current)
+        elif current is not None:
+            if field == 'severity':
+                words = re.findall(r'[A-Za-z]+', value)
+                current['severity'] = words[0].lower() if words else None
+            elif field == 'estimated_cost':
+                current['estimated_cost'] = parse_cost(value)
+            else:
+                current['recommended_action'] = value
+    return records
+
+
+def parse_json_records(text):
+    # Response of CHATBOT_PROMPT_JSON: {"damages": [{"area", "severity", "recommended_action", "estimated_cost"}]}
+    data = json.loads(text)
+    records = []
+    for item in data.get('damages', []):
+        cost = item.get('estimated_cost')
+        if isinstance(cost, str):
+            # "₱2,500" or "2500 - 4000": keep the first amount
+            digits = re.sub(r'[^\d]', '', re.split(r'\s+-\s+|–', cost)[0])
+            cost = int(digits) if digits else None
+        severity = item.get('severity')
+        records.append({
+            'area': str(item.get('area', '')),
+            'severity': str(severity).lower() if severity else None,
+            'recommended_action': item.get('recommended_action'),
+            'estimated_cost': int(cost) if cost is not None else None,
+        })
+    return records
+
+
+def parse_assessment(text):
+    stripped = text.strip()
+    if stripped.startswith('{'):
+        try:
+            return parse_json_records(stripped)
+        except (ValueError, AttributeError, TypeError):
+            pass
+    return parse_text_records(text)
+
+
+def match_records(records, damages):
+    # The n-th detection of a class gets the n-th block for that class, so duplicate
+    # classes no longer all read the first block. Unmatched detections get None.
+    by_area = defaultdict(deque)
+    for record in records:
+        by_area[normalize_area(record['area'])].append(record)
+    return [by_area[normalize_area(damage['area'])].popleft() if by_area[normalize_area(damage['area'])] else None for damage in damages]
+
+
+def format_records(records):
+    # Render parsed records (e.g. from JSON mode) in the CHATBOT_PROMPT text layout.
+    lines = ["Damage Assessment:"]
+    for record in records:
+        lines.extend([
+            "",
+            f"* Area: {record['area']}",
+            f"* Severity: {(record['severity'] or 'unknown').capitalize()}",
+            f"* Recommended Action: {record['recommended_action'] or '-'}",
+            f"* Estimated Cost: ₱{record['estimated_cost']:,}" if record['estimated_cost'] is not None else "* Estimated Cost: -",
+        ])
+    return "\n".join(lines)
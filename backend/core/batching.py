@@ -0,0 +1,67 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+# Groups items submitted concurrently from different request threads into one call
+# of run_batch. The first item of a batch waits at most max_wait_ms for company, so
+# an idle server adds at most that much latency to a lone request.
+class MicroBatcher:
+    def __init__(self, name, run_batch, max_batch_size, max_wait_ms):
+        self.name = name
+        self._run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def submit(self, item):
+        if self.max_wait <= 0 or self.max_batch_size <= 1:
+            return self._run_batch([item])[0]
+
+        future = Future()
+        self._queue.put((item, future))
+        self._ensure_worker()
+        return future.result()
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name=f"{self.name}-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self._run_batch(items)
+            except Exception as e:
+                logger.exception(f"{self.name} batch of {len(items)} failed: {str(e)}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            logger.debug(f"{self.name} ran a batch of {len(items)}")
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,15 @@
+import json
+import os
+
+# Recorded LLM assessment responses with the records they should parse into; used by
+# the parser tests and by `manage.py benchmark_assessment_parser`.
+RESPONSES_DIR = os.path.join(os.path.dirname(__file__), 'benchmark_data', 'assessment_responses')
+
+
+def load_cases():
+    with open(os.path.join(RESPONSES_DIR, 'cases.json'), encoding='utf-8') as f:
+        cases = json.load(f)
+    for name, case in cases.items():
+        with open(os.path.join(RESPONSES_DIR, f"{name}.txt"), encoding='utf-8') as f:
+            case['response'] = f.read()
+    return cases
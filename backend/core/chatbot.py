@@ -0,0 +1,118 @@
+from django.conf import settings
+from langchain_openai import ChatOpenAI
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain.chains import create_retrieval_chain
+from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.prompts import MessagesPlaceholder
+from langchain.chains.history_aware_retriever import create_history_aware_retriever
+
+from .semantic_cache import answer_cache
+
+
+class Chatbot:
+    # The retrieval chain, plus its individual steps (query rewrite -> embed ->
+    # search -> answer) so the semantic answer cache can sit between them.
+    def __init__(self, vectorStore, index_key):
+        self.vector_store = vectorStore
+        self.index_key = index_key
+
+        model = ChatOpenAI(
+            model="gpt-3.5-turbo-1106",
+            temperature=0.2,
+            max_tokens=2000,
+        )
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", "You are an AI Truck mechanic. Every request or question is truck-related, depending on what they talk about. Answer their question with a truck-related solution, if asked. Only suggest R+M services, if asked. Also, Answer the user's questions based on the context: {context}"),
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("human","{input}")
+        ])
+        self.document_chain = create_stuff_documents_chain(
+            llm=model,
+            prompt=prompt
+        )
+        retriever = vectorStore.as_retriever(search_kwargs={'k': settings.CHATBOT_RETRIEVER_K})
+        retriever_prompt = ChatPromptTemplate.from_messages([
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("human", "{input}"),
+            ("human", "Given the above conversation, generate a search query to look up in order to get information relevant to the conversation")
+        ])
+        self.query_rewriter = retriever_prompt | model | StrOutputParser()
+        history_aware_retriever = create_history_aware_retriever(
+            llm=model,
+            retriever=retriever,
+            prompt=retriever_prompt
+        )
+        self.chain = create_retrieval_chain(
+            history_aware_retriever,
+            self.document_chain
+        )
+
+    def _answer_inputs(self, user_input, langchain_history, documents):
+        return {"input": user_input, "chat_history": langchain_history, "context": documents}
+
+    def prepare_query(self, user_input, langchain_history):
+        # First-turn questions are looked up as asked; follow-ups are rewritten into a
+        # standalone query first, exactly as the history-aware retriever does.
+        query = self.query_rewriter.invoke({"input": user_input, "chat_history": langchain_history}) if langchain_history else user_input
+        return self.vector_store.embeddings.embed_query(query)
+
+    async def aprepare_query(self, user_input, langchain_history):
+        query = await self.query_rewriter.ainvoke({"input": user_input, "chat_history": langchain_history}) if langchain_history else user_input
+        return await self.vector_store.embeddings.aembed_query(query)
+
+    def ask(self, user_input, langchain_history):
+        if not settings.CHATBOT_CACHE_ENABLED:
+            return self.chain.invoke({"input": user_input, "chat_history": langchain_history})["answer"]
+
+        vector = self.prepare_query(user_input, langchain_history)
+        answer = answer_cache.lookup(vector, self.index_key)
+        if answer is None:
+            documents = self.vector_store.similarity_search_by_vector(vector, k=settings.CHATBOT_RETRIEVER_K)
+            answer = self.document_chain.invoke(self._answer_inputs(user_input, langchain_history, documents))
+            answer_cache.store(vector, answer, self.index_key)
+        return answer
+
+    async def aask(self, user_input, langchain_history):
+        if not settings.CHATBOT_CACHE_ENABLED:
+            return (await self.chain.ainvoke({"input": user_input, "chat_history": langchain_history}))["answer"]
+
+        vector = await self.aprepare_query(user_input, langchain_history)
+        answer = answer_cache.lookup(vector, self.index_key)
+        if answer is None:
+            documents = await self.vector_store.asimilarity_search_by_vector(vector, k=settings.CHATBOT_RETRIEVER_K)
+            answer = await self.document_chain.ainvoke(self._answer_inputs(user_input, langchain_history, documents))
+            answer_cache.store(vector, answer, self.index_key)
+        return answer
+
+    def stream(self, user_input, langchain_history):
+        # Yields answer tokens; a cache hit comes back as a single chunk.
+        if not settings.CHATBOT_CACHE_ENABLED:
+            for chunk in self.chain.stream({"input": user_input, "chat_history": langchain_history}):
+                if chunk.get("answer"):
+                    yield chunk["answer"]
+            return
+
+        vector = self.prepare_query(user_input, langchain_history)
+        answer = answer_cache.lookup(vector, self.index_key)
+        if answer is not None:
+            yield answer
+            return
+
+        documents = self.vector_store.similarity_search_by_vector(vector, k=settings.CHATBOT_RETRIEVER_K)
+        tokens = []
+        for token in self.document_chain.stream(self._answer_inputs(user_input, langchain_history, documents)):
+            tokens.append(token)
+            yield token
+        answer_cache.store(vector, ''.join(tokens), self.index_key)
+
+def to_langchain_history(chat_history):
+    # Convert chat history to HumanMessage and AIMessage objects
+    langchain_history = []
+    for message in chat_history:
+        if message['role'] == 'human':
+            langchain_history.append(HumanMessage(content=message['content']))
+        elif message['role'] == 'assistant':
+            langchain_history.append(AIMessage(content=message['content']))
+    return langchain_history
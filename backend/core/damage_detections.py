@@ -0,0 +1,100 @@
+import logging
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from .models import DamageDetection, TruckAssessment
+
+logger = logging.getLogger(__name__)
+
+DAMAGES_GIN_INDEX = 'core_assessment_damages_gin'
+
+
+def parse_confidence(value):
+    # Stored as a formatted string ("0.85") in TruckAssessment.damages
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_detections(assessment):
+    # Unsaved DamageDetection rows for assessment.damages. Boxes come from
+    # assessment.images, whose per-image detections are in the same order as damages.
+    damages = assessment.damages or []
+    boxes = [
+        (image_index, detection.get('box'))
+        for image_index, stored in enumerate(assessment.images or [])
+        for detection in stored.get('detections', [])
+    ]
+    if len(boxes) != len(damages):
+        boxes = [(None, None)] * len(damages)
+
+    detections = []
+    for position, (damage, (image_index, box)) in enumerate(zip(damages, boxes)):
+        confidence = parse_confidence(damage.get('confidence'))
+        if not damage.get('area') or confidence is None:
+            continue
+        x1, y1, x2, y2 = box if box and len(box) == 4 else (None, None, None, None)
+        detections.append(DamageDetection(
+            assessment=assessment,
+            position=position,
+            damage_class=str(damage['area']).lower(),
+            confidence=confidence,
+            image=damage.get('image', image_index if len(assessment.images or []) > 1 else None),
+            box_x1=x1,
+            box_y1=y1,
+            box_x2=x2,
+            box_y2=y2,
+            assessment_date=assessment.assessment_date,
+        ))
+    return detections
+
+
+def save_detections(assessments, replace=False):
+    # One bulk INSERT for any number of assessments
+    detections = [detection for assessment in assessments for detection in build_detections(assessment)]
+    with transaction.atomic():
+        if replace:
+            DamageDetection.objects.filter(assessment__in=[a.id for a in assessments]).delete()
+        DamageDetection.objects.bulk_create(detections, batch_size=1000)
+    return len(detections)
+
+
+def missing_detections():
+    # Assessments with damages but no DamageDetection rows yet
+    return TruckAssessment.objects.exclude(damages=[]).filter(
+        ~Exists(DamageDetection.objects.filter(assessment=OuterRef('pk')))
+    )
+
+
+def detection_filter(damage_classes=None, min_confidence=None, date_from=None, date_to=None):
+    # Exists() subquery for filter_assessments; repeating the date bounds lets it use
+    # the (damage_class, assessment_date, confidence) index.
+    detections = DamageDetection.objects.filter(assessment=OuterRef('pk'))
+    if damage_classes:
+        detections = detections.filter(damage_class__in=damage_classes)
+    if min_confidence is not None:
+        detections = detections.filter(confidence__gte=min_confidence)
+    if date_from:
+        detections = detections.filter(assessment_date__gte=date_from)
+    if date_to:
+        detections = detections.filter(assessment_date__lte=date_to)
+    return Exists(detections)
+
+
+def set_damages_gin_index(enabled):
+    # Optional GIN index on TruckAssessment.damages for ad-hoc JSON containment queries
+    # (damages__contains=[{'area': 'dent'}]); PostgreSQL only. Built CONCURRENTLY so
+    # writes continue while it is created.
+    if connection.vendor != 'postgresql':
+        raise ValueError('The damages GIN index is only available on PostgreSQL')
+    table = TruckAssessment._meta.db_table
+    with connection.cursor() as cursor:
+        if enabled:
+            cursor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {DAMAGES_GIN_INDEX} ON {table} USING GIN (damages jsonb_path_ops)'
+            )
+        else:
+            cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {DAMAGES_GIN_INDEX}')
+    logger.info(f"{'Created' if enabled else 'Dropped'} index {DAMAGES_GIN_INDEX}")
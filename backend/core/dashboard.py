@@ -0,0 +1,196 @@
+import base64
+import json
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .damage_detections import detection_filter
+from .models import TruckAssessment
+from .summaries import get_total_summary
+
+# Dashboard rows are ordered by (-priority_score, -assessment_date, id), with
+# unscored rows first as on PostgreSQL, and paged by keyset: the cursor is the
+# sort key of the last row sent, so every page is one index range scan however
+# deep the client scrolls. ?sort= picks another order; each is the dashboard index
+# or the (assessment_date, id) index read forwards or backwards.
+DASHBOARD_ORDERING = [
+    F('priority_score').desc(nulls_first=True),
+    F('assessment_date').desc(),
+    F('id').asc(),
+]
+DASHBOARD_SORTS = {
+    '-priority': DASHBOARD_ORDERING,
+    'priority': [F('priority_score').asc(nulls_last=True), F('assessment_date').asc(), F('id').desc()],
+    '-date': [F('assessment_date').desc(), F('id').desc()],
+    'date': [F('assessment_date').asc(), F('id').asc()],
+}
+DASHBOARD_LIST_FIELDS = [
+    'id',
+    'truck_id',
+    'assessment_date',
+    'severity_score',
+    'priority_score',
+    'urgency_level',
+    'estimated_repair_cost',
+    'assessment_engine',
+]
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+PRIORITY_RANGES = {
+    'low': (None, Decimal('3')),
+    'medium': (Decimal('3'), Decimal('7')),
+    'high': (Decimal('7'), None),
+}
+
+
+class InvalidDashboardQuery(ValueError):
+    pass
+
+
+def encode_cursor(row):
+    priority = row['priority_score']
+    payload = [str(priority) if priority is not None else None, row['assessment_date'].isoformat(), row['id']]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        priority, assessment_date, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return (
+            Decimal(priority) if priority is not None else None,
+            datetime.fromisoformat(assessment_date),
+            int(row_id),
+        )
+    except (ValueError, TypeError, InvalidOperation):
+        raise InvalidDashboardQuery('Invalid cursor')
+
+
+def after_cursor(priority, assessment_date, row_id, sort='-priority'):
+    # Rows strictly after (priority, assessment_date, row_id) in DASHBOARD_SORTS[sort]
+    if sort == '-date':
+        return Q(assessment_date__lt=assessment_date) | Q(assessment_date=assessment_date, id__lt=row_id)
+    if sort == 'date':
+        return Q(assessment_date__gt=assessment_date) | Q(assessment_date=assessment_date, id__gt=row_id)
+    if sort == 'priority':
+        # The reverse of the default order: unscored rows last
+        same_priority_later = Q(assessment_date__gt=assessment_date) | Q(assessment_date=assessment_date, id__lt=row_id)
+        if priority is None:
+            return Q(priority_score__isnull=True) & same_priority_later
+        return Q(priority_score__gt=priority) | (Q(priority_score=priority) & same_priority_later) | Q(priority_score__isnull=True)
+    same_priority_later = Q(assessment_date__lt=assessment_date) | Q(assessment_date=assessment_date, id__gt=row_id)
+    if priority is None:
+        return (Q(priority_score__isnull=True) & same_priority_later) | Q(priority_score__isnull=False)
+    return Q(priority_score__lt=priority) | (Q(priority_score=priority) & same_priority_later)
+
+
+def parse_date_bound(value, end_of_day=False):
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        day = parse_date(value) if parsed is None else None
+    except ValueError:
+        parsed = day = None
+    if parsed is None:
+        if day is None:
+            raise InvalidDashboardQuery(f"Invalid date {value!r}")
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_confidence_bound(value):
+    if value in (None, ''):
+        return None
+    try:
+        confidence = float(value)
+    except ValueError:
+        raise InvalidDashboardQuery(f"Invalid min_confidence {value!r}")
+    if not 0 <= confidence <= 1:
+        raise InvalidDashboardQuery('min_confidence must be between 0 and 1')
+    return confidence
+
+
+FILTER_PARAMS = ['urgency', 'priority', 'truck_id', 'date_from', 'date_to', 'damage_class', 'min_confidence']
+
+
+def filter_assessments(params):
+    # urgency=high,medium  priority=low|medium|high  truck_id=...  date_from / date_to (ISO dates)
+    # damage_class=dent,shattered_glass  min_confidence=0.8 (matched on DamageDetection rows)
+    queryset = TruckAssessment.objects.all()
+    urgency = [level.strip().lower() for level in params.get('urgency', '').split(',') if level.strip()]
+    if urgency:
+        queryset = queryset.filter(urgency_level__in=urgency)
+    priority = params.get('priority')
+    if priority:
+        if priority not in PRIORITY_RANGES:
+            raise InvalidDashboardQuery(f"Invalid priority {priority!r}")
+        low, high = PRIORITY_RANGES[priority]
+        if low is not None:
+            queryset = queryset.filter(priority_score__gte=low)
+        if high is not None:
+            queryset = queryset.filter(priority_score__lt=high)
+    if params.get('truck_id'):
+        queryset = queryset.filter(truck_id=params['truck_id'])
+    date_from = parse_date_bound(params.get('date_from'))
+    if date_from:
+        queryset = queryset.filter(assessment_date__gte=date_from)
+    date_to = parse_date_bound(params.get('date_to'), end_of_day=True)
+    if date_to:
+        queryset = queryset.filter(assessment_date__lte=date_to)
+    damage_classes = [name.strip().lower() for name in params.get('damage_class', '').split(',') if name.strip()]
+    min_confidence = parse_confidence_bound(params.get('min_confidence'))
+    if damage_classes or min_confidence is not None:
+        queryset = queryset.filter(detection_filter(damage_classes, min_confidence, date_from, date_to))
+    return queryset
+
+
+def get_page_size(params):
+    try:
+        page_size = int(params.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise InvalidDashboardQuery('Invalid page_size')
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def dashboard_page(params):
+    queryset = filter_assessments(params)
+    page_size = get_page_size(params)
+    sort = params.get('sort') or '-priority'
+    if sort not in DASHBOARD_SORTS:
+        raise InvalidDashboardQuery(f"Invalid sort {sort!r}; use one of: {', '.join(DASHBOARD_SORTS)}")
+
+    page = queryset.order_by(*DASHBOARD_SORTS[sort])
+    if params.get('cursor'):
+        page = page.filter(after_cursor(*decode_cursor(params['cursor']), sort=sort))
+    # One extra row tells whether another page exists without a COUNT
+    rows = list(page.values(*DASHBOARD_LIST_FIELDS, thumbnail=F('images__0__thumbnail'))[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    data = {
+        'assessments': rows,
+        'next_cursor': encode_cursor(rows[-1]) if has_more else None,
+        'has_more': has_more,
+    }
+    if params.get('cursor'):
+        return data
+    if not any(params.get(name) for name in FILTER_PARAMS):
+        # Unfiltered totals come from the maintained summary: a single-row read
+        summary = get_total_summary()
+        data.update(
+            total_assessments=summary.assessments,
+            high_priority_assessments=summary.high_priority,
+        )
+    else:
+        # Totals for the filtered set, in one query and only with the first page
+        data.update(queryset.aggregate(
+            total_assessments=Count('id'),
+            high_priority_assessments=Count('id', filter=Q(priority_score__gte=7)),
+        ))
+    return data
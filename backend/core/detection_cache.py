@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from . import metrics
+from .models import DetectionCacheEntry
+
+logger = logging.getLogger(__name__)
+
+_model_key = {'stat': None, 'key': None}
+_stores = {'count': 0}
+_stores_lock = threading.Lock()
+
+# Eviction runs on every EVICT_EVERY-th store in a process rather than on each one.
+EVICT_EVERY = 50
+
+
+def cache_enabled():
+    return settings.DETECTION_CACHE_MAX_ENTRIES > 0
+
+
+def current_model_key():
+    # SHA-256 of the detector weights plus the inference and decode sizes, re-hashed only when the
+    # weights file changes, so deploying a new last.pt invalidates every entry.
+    try:
+        stat = os.stat(settings.DETECTOR_WEIGHTS)
+    except OSError:
+        return None
+    signature = (stat.st_size, stat.st_mtime_ns, settings.DETECTOR_IMAGE_SIZE, settings.UPLOAD_DECODE_MIN_SIDE)
+    if _model_key['stat'] != signature:
+        digest = hashlib.sha256()
+        with open(settings.DETECTOR_WEIGHTS, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        # Boxes are in the coordinates of the image decoded at upload time
+        digest.update(f"imgsz={settings.DETECTOR_IMAGE_SIZE};decode={settings.UPLOAD_DECODE_MIN_SIDE}".encode('utf-8'))
+        _model_key['key'] = digest.hexdigest()
+        _model_key['stat'] = signature
+    return _model_key['key']
+
+
+def image_dhash(img):
+    # 64-bit difference hash: survives re-encoding and mild recompression, not crops.
+    import cv2
+    import numpy as np
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    value = int(np.packbits(bits).view('>u8')[0])
+    # Stored in a signed BigIntegerField
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def dhash_prefix(dhash):
+    return (dhash & ((1 << 64) - 1)) >> 48
+
+
+def hamming_distance(a, b):
+    return ((a ^ b) & ((1 << 64) - 1)).bit_count()
+
+
+def find_entry(image_sha256, img, model_key):
+    entry = DetectionCacheEntry.objects.filter(image_sha256=image_sha256, model_key=model_key).only('id', 'detections').first()
+    if entry is not None or settings.DETECTION_CACHE_PHASH_MAX_DISTANCE < 0:
+        return entry, 'exact'
+
+    # Near-identical re-encode of a photo we have seen: same size, dHash within the threshold.
+    # Only the most recently used entries of the same hash bucket are compared.
+    height, width = img.shape[:2]
+    dhash = image_dhash(img)
+    candidates = DetectionCacheEntry.objects.filter(
+        model_key=model_key, dhash_prefix=dhash_prefix(dhash), width=width, height=height
+    ).order_by('-last_used_at').values_list('id', 'dhash')[:settings.DETECTION_CACHE_PHASH_CANDIDATES]
+    best = min(((hamming_distance(dhash, other), entry_id) for entry_id, other in candidates), default=None)
+    if best is None or best[0] > settings.DETECTION_CACHE_PHASH_MAX_DISTANCE:
+        return None, None
+    return DetectionCacheEntry.objects.filter(id=best[1]).only('id', 'detections').first(), 'perceptual'
+
+
+def get_cached_detections(image_sha256, img, model_key):
+    entry, match = find_entry(image_sha256, img, model_key)
+    if entry is None:
+        metrics.increment('detection_cache_misses')
+        return None
+
+    DetectionCacheEntry.objects.filter(id=entry.id).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    metrics.increment(f"detection_cache_{match}_hits")
+    logger.info(f"Reusing cached detections for image {image_sha256[:12]} ({match} match)")
+    return entry.detections
+
+
+def store_detections(image_sha256, img, model_key, detections):
+    height, width = img.shape[:2]
+    dhash = image_dhash(img)
+    now = timezone.now()
+    DetectionCacheEntry.objects.update_or_create(
+        image_sha256=image_sha256,
+        model_key=model_key,
+        defaults={
+            'dhash': dhash,
+            'dhash_prefix': dhash_prefix(dhash),
+            'width': width,
+            'height': height,
+            'detections': detections,
+            'hits': 0,
+            'created_at': now,
+            'last_used_at': now,
+        },
+    )
+    with _stores_lock:
+        _stores['count'] += 1
+        evict = _stores['count'] % EVICT_EVERY == 1
+    if evict:
+        evict_entries(model_key)
+
+
+def evict_entries(model_key):
+    # Entries of older weights are useless; the rest is trimmed to the least recently used limit.
+    stale = DetectionCacheEntry.objects.exclude(model_key=model_key).delete()[0]
+    cutoff = (
+        DetectionCacheEntry.objects.order_by('-last_used_at')
+        .values_list('last_used_at', flat=True)[settings.DETECTION_CACHE_MAX_ENTRIES:settings.DETECTION_CACHE_MAX_ENTRIES + 1]
+        .first()
+    )
+    trimmed = DetectionCacheEntry.objects.filter(last_used_at__lte=cutoff).delete()[0] if cutoff else 0
+    if stale or trimmed:
+        logger.info(f"Evicted {stale} detection cache entries of old weights and {trimmed} least recently used")
+
+
+def detect_with_cache(images, image_hashes, detect):
+    # Runs detect() only for the images that have no cached result; image_hashes are
+    # the SHA-256 digests of the uploaded bytes (None skips the cache for that image).
+    model_key = current_model_key() if cache_enabled() else None
+    if model_key is None or not any(image_hashes):
+        return detect(images)
+
+    results = [None] * len(images)
+    misses = []
+    for index, (img, image_sha256) in enumerate(zip(images, image_hashes)):
+        if image_sha256:
+            results[index] = get_cached_detections(image_sha256, img, model_key)
+        if results[index] is None:
+            misses.append(index)
+
+    if misses:
+        detected = detect([images[index] for index in misses])
+        for index, detections in zip(misses, detected):
+            results[index] = detections
+            if image_hashes[index]:
+                store_detections(image_hashes[index], images[index], model_key, detections)
+    return results
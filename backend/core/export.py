@@ -0,0 +1,90 @@
+import csv
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .dashboard import filter_assessments
+
+# Exports are generators: each row is encoded and yielded as soon as it is read, and
+# StreamingHttpResponse (or the export_assessments command) sends it on before the next
+# one is built. QuerySet.iterator() reads through a server-side cursor on PostgreSQL,
+# chunk_size rows per round trip, so nothing holds the whole result.
+EXPORT_FIELDS = [
+    'id',
+    'truck_id',
+    'assessment_date',
+    'assessment_engine',
+    'severity_score',
+    'estimated_repair_cost',
+    'urgency_level',
+    'priority_score',
+    'damage_description',
+]
+DETECTION_FIELDS = ['damage_index', 'damage_area', 'damage_confidence', 'damage_image']
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def export_queryset(params):
+    # Same filters as the dashboard (urgency, priority, truck_id, date_from, date_to)
+    return filter_assessments(params).order_by('id').values(*EXPORT_FIELDS, 'damages')
+
+
+def export_columns(detections=False):
+    return EXPORT_FIELDS + (DETECTION_FIELDS if detections else ['damage_count', 'damages'])
+
+
+def export_rows(queryset, detections=False, chunk_size=None):
+    for row in queryset.iterator(chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE):
+        damages = row.pop('damages') or []
+        if not detections:
+            yield {**row, 'damage_count': len(damages), 'damages': damages}
+            continue
+        # One row per detection; assessments without detections still get one row
+        if not damages:
+            yield dict(row, **dict.fromkeys(DETECTION_FIELDS))
+        for index, damage in enumerate(damages):
+            yield {
+                **row,
+                'damage_index': index,
+                'damage_area': damage.get('area'),
+                'damage_confidence': damage.get('confidence'),
+                'damage_image': damage.get('image'),
+            }
+
+
+class Echo:
+    # File-like object for csv.writer that hands back each line instead of storing it
+    def write(self, value):
+        return value
+
+
+def csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        return json.dumps(value)
+    return value
+
+
+def iter_csv(rows, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([csv_value(row[column]) for column in columns])
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_export(params, export_format='csv', detections=False, chunk_size=None):
+    rows = export_rows(export_queryset(params), detections=detections, chunk_size=chunk_size)
+    if export_format == 'ndjson':
+        return iter_ndjson(rows)
+    return iter_csv(rows, export_columns(detections))
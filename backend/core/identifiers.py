@@ -0,0 +1,68 @@
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import F
+
+from .models import IdentifierSequence
+
+logger = logging.getLogger(__name__)
+
+RESERVE_ATTEMPTS = 20
+
+
+# Hands out unique, increasing numbers without COUNT(*) and without a database
+# round trip per call: each process reserves block_size values with one atomic
+# UPDATE and serves them from memory. Values are unique across processes but
+# not gap-free (a restarted process abandons the rest of its block).
+class BlockAllocator:
+    def __init__(self, name, block_size=None):
+        self.name = name
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+        self._pid = None
+
+    def _reserve_block(self, block_size):
+        for attempt in range(RESERVE_ATTEMPTS):
+            try:
+                IdentifierSequence.objects.get_or_create(name=self.name)
+                with transaction.atomic():
+                    # The UPDATE holds the row (or, on SQLite, the database) write lock until
+                    # commit, so the value read back below is ours alone.
+                    IdentifierSequence.objects.filter(name=self.name).update(next_value=F('next_value') + block_size)
+                    end = IdentifierSequence.objects.filter(name=self.name).values_list('next_value', flat=True).get()
+                break
+            except OperationalError as e:
+                # SQLite reports concurrent writers as "locked" instead of waiting in some modes
+                if 'locked' not in str(e) or attempt == RESERVE_ATTEMPTS - 1:
+                    raise
+                time.sleep(0.01 * (attempt + 1))
+        logger.debug(f"Reserved {self.name} values {end - block_size}-{end - 1}")
+        return end - block_size, end
+
+    def allocate(self):
+        with self._lock:
+            # A forked worker must not reuse the block its parent reserved.
+            if self._pid != os.getpid() or self._next >= self._end:
+                self._next, self._end = self._reserve_block(self.block_size or settings.IDENTIFIER_BLOCK_SIZE)
+                self._pid = os.getpid()
+            value = self._next
+            self._next += 1
+            return value
+
+    def reset(self):
+        with self._lock:
+            self._next = self._end = 0
+            self._pid = None
+
+
+assessment_numbers = BlockAllocator('assessment')
+
+
+def allocate_assessment_number():
+    return assessment_numbers.allocate()
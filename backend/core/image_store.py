@@ -0,0 +1,139 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.urls import reverse
+
+# Originals and annotated images are stored under the SHA-256 of their bytes in
+# two levels of shard directories (ab/cd/abcd...jpg), so identical uploads are
+# stored once, names never collide and a stored file never changes. Thumbnails
+# are named after the annotated image they were made from.
+IMAGE_NAME_PATTERN = r'[0-9a-f]{64}(?:_thumb)?\.(?:jpg|png|webp|bmp)'
+IMAGE_CONTENT_TYPES = {
+    'jpg': 'image/jpeg',
+    'png': 'image/png',
+    'webp': 'image/webp',
+    'bmp': 'image/bmp',
+}
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'BM', 'bmp'),
+]
+
+
+def image_extension(data):
+    for signature, extension in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def is_image_name(name):
+    return re.fullmatch(IMAGE_NAME_PATTERN, name) is not None
+
+
+def image_path(name):
+    return os.path.join(settings.IMAGE_STORE_ROOT, name[:2], name[2:4], name)
+
+
+def content_type(name):
+    return IMAGE_CONTENT_TYPES[name.rsplit('.', 1)[1]]
+
+
+def write_once(name, data):
+    path = image_path(name)
+    if os.path.exists(path):
+        return name
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temp file and rename so a concurrent reader never sees a partial image
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return name
+
+
+def store_original_file(path, img=None):
+    # The upload exactly as received, hashed and copied in chunks so it is never held in
+    # memory. Formats OpenCV reads but we don't serve are stored as a JPEG of img.
+    with open(path, 'rb') as f:
+        extension = image_extension(f.read(16))
+    if extension is None:
+        if img is None:
+            return None
+        data = encode_jpeg(img)
+        return write_once(f"{hashlib.sha256(data).hexdigest()}.jpg", data)
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    name = f"{digest.hexdigest()}.{extension}"
+    target = image_path(name)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return name
+
+
+def encode_jpeg(img, quality=None):
+    import cv2
+    ok, encoded = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality or settings.IMAGE_JPEG_QUALITY])
+    if not ok:
+        raise ValueError('Could not encode image as JPEG')
+    return encoded.tobytes()
+
+
+def make_thumbnail(img):
+    import cv2
+    height, width = img.shape[:2]
+    scale = settings.IMAGE_THUMBNAIL_SIZE / max(height, width)
+    if scale < 1:
+        img = cv2.resize(img, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+    return encode_jpeg(img, settings.IMAGE_THUMBNAIL_QUALITY)
+
+
+def store_annotated(img):
+    # Encoded once; the same bytes are written to disk and served from there.
+    data = encode_jpeg(img)
+    digest = hashlib.sha256(data).hexdigest()
+    annotated = write_once(f"{digest}.jpg", data)
+    thumbnail_name = f"{digest}_thumb.jpg"
+    if not os.path.exists(image_path(thumbnail_name)):
+        write_once(thumbnail_name, make_thumbnail(img))
+    return annotated, thumbnail_name
+
+
+def image_url(name, request=None):
+    if not name:
+        return None
+    url = reverse('stored_image', args=[name])
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def image_urls(stored, request=None):
+    # URLs for one entry of TruckAssessment.images
+    return {
+        'image_url': image_url(stored.get('annotated'), request),
+        'thumbnail_url': image_url(stored.get('thumbnail'), request),
+        'original_url': image_url(stored.get('original'), request),
+    }
@@ -0,0 +1,168 @@
+import logging
+import os
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import metrics
+from .image_store import store_original_file
+
+logger = logging.getLogger(__name__)
+
+EXIF_ORIENTATION_TAG = 0x0112
+# EXIF orientations 5-8 store the image rotated by 90 degrees
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+class UploadRejected(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def spool_upload(uploaded_file):
+    # Returns (path, is_temporary). Django already spools uploads larger than
+    # FILE_UPLOAD_MAX_MEMORY_SIZE to disk; smaller ones are written out here.
+    if uploaded_file.size > settings.UPLOAD_MAX_BYTES:
+        raise UploadRejected(f"Image is larger than {settings.UPLOAD_MAX_BYTES / (1024 * 1024):g} MB", status=413)
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        return uploaded_file.temporary_file_path(), False
+
+    extension = os.path.splitext(uploaded_file.name or '')[1].lower() or '.jpg'
+    fd, path = tempfile.mkstemp(suffix=extension, dir=settings.FILE_UPLOAD_TEMP_DIR)
+    with os.fdopen(fd, 'wb') as f:
+        for chunk in uploaded_file.chunks():
+            f.write(chunk)
+    return path, True
+
+
+def read_header(path):
+    # Dimensions and EXIF orientation without decoding any pixels
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+            orientation = image.getexif().get(EXIF_ORIENTATION_TAG, 1)
+    except (UnidentifiedImageError, OSError):
+        raise UploadRejected('Could not decode the uploaded image')
+    if width * height > settings.UPLOAD_MAX_PIXELS:
+        raise UploadRejected(f"Image has more than {settings.UPLOAD_MAX_PIXELS // 1_000_000} megapixels", status=413)
+    return width, height, orientation
+
+
+def reduction_factor(width, height):
+    # Largest of 1/2/4/8 that keeps the long side at least UPLOAD_DECODE_MIN_SIDE,
+    # which defaults to the detector's input size: anything larger is thrown
+    # away by the letterbox resize anyway.
+    factor = 1
+    for candidate in (2, 4, 8):
+        if max(width, height) / candidate >= settings.UPLOAD_DECODE_MIN_SIDE:
+            factor = candidate
+    return factor
+
+
+def decode_reduced(path, factor):
+    # JPEGs are decoded at 1/factor directly through libjpeg's DCT scaling, so the
+    # full-resolution bitmap is never allocated.
+    import cv2
+    flags = {
+        1: cv2.IMREAD_COLOR,
+        2: cv2.IMREAD_REDUCED_COLOR_2,
+        4: cv2.IMREAD_REDUCED_COLOR_4,
+        8: cv2.IMREAD_REDUCED_COLOR_8,
+    }[factor]
+    img = cv2.imread(path, flags | cv2.IMREAD_IGNORE_ORIENTATION)
+    if img is None:
+        raise UploadRejected('Could not decode the uploaded image')
+    return img
+
+
+def apply_orientation(img, orientation):
+    # Same result as PIL.ImageOps.exif_transpose
+    import cv2
+    if orientation == 2:
+        return cv2.flip(img, 1)
+    if orientation == 3:
+        return cv2.rotate(img, cv2.ROTATE_180)
+    if orientation == 4:
+        return cv2.flip(img, 0)
+    if orientation == 5:
+        return cv2.transpose(img)
+    if orientation == 6:
+        return cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE)
+    if orientation == 7:
+        return cv2.flip(cv2.transpose(img), -1)
+    if orientation == 8:
+        return cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return img
+
+
+@contextmanager
+def track_peak_memory(label):
+    # With UPLOAD_TRACE_MEMORY, reports the Python/NumPy allocation peak of the block
+    # (process-wide, so exact only when requests don't overlap). tracemalloc slows
+    # every allocation, so it is meant for profiling runs.
+    if not settings.UPLOAD_TRACE_MEMORY:
+        yield
+        return
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        if started:
+            tracemalloc.stop()
+        metrics.observe(f"{label}_peak_mb", round(peak / 1e6, 2))
+        logger.info(f"{label} peak memory: {peak / 1e6:.1f} MB")
+
+
+def ingest_path(path):
+    # Returns (img, upload): the oriented image decoded at reduced size, and the
+    # stored original with its full oriented dimensions for mapping boxes back.
+    width, height, orientation = read_header(path)
+    factor = reduction_factor(width, height)
+    img = apply_orientation(decode_reduced(path, factor), orientation)
+    if orientation in TRANSPOSED_ORIENTATIONS:
+        width, height = height, width
+
+    metrics.observe('upload_decoded_mb', round(img.nbytes / 1e6, 2))
+    logger.info(
+        f"Decoded {width}x{height} upload at 1/{factor} as {img.shape[1]}x{img.shape[0]} "
+        f"({img.nbytes / 1e6:.1f} MB instead of {width * height * 3 / 1e6:.1f} MB)"
+    )
+    upload = {'original': store_original_file(path, img), 'width': width, 'height': height}
+    return img, upload
+
+
+def ingest_upload(uploaded_file):
+    with track_peak_memory('upload_ingest'):
+        path, is_temporary = spool_upload(uploaded_file)
+        try:
+            return ingest_path(path)
+        finally:
+            if is_temporary:
+                os.remove(path)
+
+
+def to_original_coordinates(detections, img, upload):
+    # Boxes found on the reduced image, scaled to the uploaded photo's pixel grid
+    if not upload or not upload.get('width'):
+        return detections
+    scale_x = upload['width'] / img.shape[1]
+    scale_y = upload['height'] / img.shape[0]
+    return [
+        dict(detection, box=[
+            round(detection['box'][0] * scale_x, 1),
+            round(detection['box'][1] * scale_y, 1),
+            round(detection['box'][2] * scale_x, 1),
+            round(detection['box'][3] * scale_y, 1),
+        ])
+        for detection in detections
+    ]
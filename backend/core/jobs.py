@@ -0,0 +1,236 @@
+import logging
+import os
+import random
+import socket
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .ingestion import UploadRejected, ingest_path
+from .models import AssessmentJob
+
+logger = logging.getLogger(__name__)
+
+# Set when a job is submitted so in-process workers pick it up without waiting
+# for the next poll.
+_job_submitted = threading.Event()
+_inprocess_workers = []
+_inprocess_lock = threading.Lock()
+
+
+def store_upload(uploaded_file):
+    upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads', 'jobs')
+    os.makedirs(upload_dir, exist_ok=True)
+    extension = os.path.splitext(uploaded_file.name)[1].lower() or '.jpg'
+    path = os.path.join(upload_dir, f"{uuid.uuid4().hex}{extension}")
+    with open(path, 'wb') as f:
+        for chunk in uploaded_file.chunks():
+            f.write(chunk)
+    return path
+
+
+def enqueue_assessment_job(uploaded_files, options=None):
+    upload_paths = [store_upload(uploaded_file) for uploaded_file in uploaded_files]
+    job = AssessmentJob.objects.create(upload_paths=upload_paths, options=options or {})
+    logger.info(f"Queued assessment job {job.id} with {len(upload_paths)} image(s)")
+
+    _job_submitted.set()
+    if settings.ASSESSMENT_JOB_INPROCESS_WORKERS:
+        start_inprocess_workers()
+    return job
+
+
+def enqueue_enrichment_job(assessment, options=None):
+    job = AssessmentJob.objects.create(kind='enrich', assessment=assessment, options=options or {})
+    logger.info(f"Queued LLM enrichment job {job.id} for assessment {assessment.id}")
+
+    _job_submitted.set()
+    if settings.ASSESSMENT_JOB_INPROCESS_WORKERS:
+        start_inprocess_workers()
+    return job
+
+
+def get_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def claim_next_job(worker_id):
+    # A conditional UPDATE is atomic on every backend, so two workers can never
+    # claim the same row; the loser simply moves on to the next candidate.
+    candidates = AssessmentJob.objects.filter(
+        status='queued', next_attempt_at__lte=timezone.now()
+    ).order_by('created_at').values_list('id', flat=True)[:10]
+    for job_id in candidates:
+        now = timezone.now()
+        claimed = AssessmentJob.objects.filter(id=job_id, status='queued').update(
+            status='running',
+            worker=worker_id,
+            attempts=F('attempts') + 1,
+            started_at=now,
+            heartbeat_at=now,
+            stage='starting',
+            progress=0,
+        )
+        if claimed:
+            return AssessmentJob.objects.get(id=job_id)
+    return None
+
+
+def requeue_stale_jobs():
+    # Jobs whose worker died mid-run stop sending heartbeats; hand them back to the queue.
+    cutoff = timezone.now() - timedelta(seconds=settings.ASSESSMENT_JOB_STALE_SECONDS)
+    stale = AssessmentJob.objects.filter(status='running', heartbeat_at__lt=cutoff)
+    exhausted = list(stale.filter(attempts__gte=settings.ASSESSMENT_JOB_MAX_ATTEMPTS).values_list('id', 'upload_paths'))
+    failed = AssessmentJob.objects.filter(id__in=[job_id for job_id, _ in exhausted], status='running').update(
+        status='failed', error='Worker stopped responding', finished_at=timezone.now()
+    )
+    for _, upload_paths in exhausted:
+        remove_uploads(upload_paths)
+    requeued = stale.filter(attempts__lt=settings.ASSESSMENT_JOB_MAX_ATTEMPTS).update(status='queued', worker='')
+    if failed or requeued:
+        logger.warning(f"Requeued {requeued} and failed {failed} stale assessment job(s)")
+    return requeued
+
+
+def report_progress(job, progress, stage):
+    AssessmentJob.objects.filter(id=job.id).update(progress=progress, stage=stage, heartbeat_at=timezone.now())
+
+
+def run_enrichment_job(job):
+    # Fill in the LLM narrative of a rule-based assessment; its scores stay as they are.
+    from . import views
+
+    if job.assessment is None:
+        raise ValueError('The assessment to enrich no longer exists')
+    report_progress(job, 20, 'assessing')
+    narrative = views.request_llm_assessment(job.assessment.damages, use_cache=job.options.get('use_llm_cache', True))
+    job.assessment.llm_assessment = narrative
+    job.assessment.save(update_fields=['llm_assessment'])
+    return job.assessment, {'assessment_id': job.assessment.id, 'llm_assessment': narrative}
+
+
+def run_job(job):
+    if job.kind == 'enrich':
+        return run_enrichment_job(job)
+
+    from . import views
+
+    if job.assessment is not None:
+        # An earlier attempt saved the assessment and failed afterwards: don't create another
+        assessment = job.assessment
+        logger.info(f"Assessment job {job.id} reusing assessment {assessment.id} from an earlier attempt")
+        if (job.options.get('enrich') and assessment.assessment_engine == 'rules'
+                and not AssessmentJob.objects.filter(kind='enrich', assessment=assessment).exists()):
+            enqueue_enrichment_job(assessment, job.options)
+        result = views.build_assessment_response(assessment, assessment.damages)
+        result['assessment_id'] = assessment.id
+        return assessment, result
+
+    report_progress(job, 5, 'loading')
+    images = []
+    uploads = []
+    for path in job.upload_paths:
+        img, upload = ingest_path(path)
+        images.append(img)
+        uploads.append(upload)
+
+    assessment, damages = views.run_assessment_pipeline(
+        images,
+        report_progress=lambda progress, stage: report_progress(job, progress, stage),
+        options=job.options,
+        uploads=uploads,
+        on_created=lambda assessment: AssessmentJob.objects.filter(id=job.id).update(assessment=assessment),
+    )
+
+    result = views.build_assessment_response(assessment, damages)
+    result['assessment_id'] = assessment.id
+    return assessment, result
+
+
+def backoff_delay(attempts, base_seconds, max_seconds):
+    # Exponential backoff, capped, with equal jitter: a random wait between half and
+    # all of the delay, so retries spread out but never come back immediately.
+    delay = min(max_seconds, base_seconds * 2 ** (attempts - 1))
+    return timedelta(seconds=random.uniform(delay / 2, delay))
+
+
+def remove_uploads(upload_paths):
+    for path in upload_paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def process_job(job):
+    try:
+        assessment, result = run_job(job)
+    except Exception as e:
+        logger.exception(f"Assessment job {job.id} failed on attempt {job.attempts}: {str(e)}")
+        # A rejected upload fails the same way every time
+        retry = job.attempts < settings.ASSESSMENT_JOB_MAX_ATTEMPTS and not isinstance(e, UploadRejected)
+        AssessmentJob.objects.filter(id=job.id).update(
+            status='queued' if retry else 'failed',
+            error=str(e),
+            next_attempt_at=timezone.now() + backoff_delay(
+                job.attempts, settings.ASSESSMENT_JOB_RETRY_BASE_SECONDS, settings.ASSESSMENT_JOB_RETRY_MAX_SECONDS
+            ) if retry else F('next_attempt_at'),
+            finished_at=None if retry else timezone.now(),
+        )
+        # Nothing will read the uploads of a job that has failed for good
+        if not retry:
+            remove_uploads(job.upload_paths)
+        return False
+
+    AssessmentJob.objects.filter(id=job.id).update(
+        status='succeeded',
+        progress=100,
+        stage='done',
+        result=result,
+        error='',
+        assessment=assessment,
+        finished_at=timezone.now(),
+    )
+    remove_uploads(job.upload_paths)
+    logger.info(f"Assessment job {job.id} finished (assessment {assessment.id})")
+    return True
+
+
+def run_worker(poll_interval=None, max_jobs=None, stop_event=None):
+    poll_interval = poll_interval or settings.ASSESSMENT_JOB_POLL_SECONDS
+    worker_id = get_worker_id()
+    processed = 0
+    logger.info(f"Assessment worker {worker_id} started")
+
+    while stop_event is None or not stop_event.is_set():
+        close_old_connections()
+        requeue_stale_jobs()
+        job = claim_next_job(worker_id)
+        if job is None:
+            if max_jobs is not None:
+                break
+            _job_submitted.wait(poll_interval)
+            _job_submitted.clear()
+            continue
+
+        process_job(job)
+        processed += 1
+        if max_jobs is not None and processed >= max_jobs:
+            break
+
+    close_old_connections()
+    return processed
+
+
+def start_inprocess_workers():
+    with _inprocess_lock:
+        _inprocess_workers[:] = [thread for thread in _inprocess_workers if thread.is_alive()]
+        for index in range(len(_inprocess_workers), settings.ASSESSMENT_JOB_INPROCESS_WORKERS):
+            thread = threading.Thread(target=run_worker, name=f"assessment-worker-{index}", daemon=True)
+            thread.start()
+            _inprocess_workers.append(thread)
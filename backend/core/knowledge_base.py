@@ -0,0 +1,156 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+
+from django.conf import settings
+
+# langchain and faiss are imported inside the functions that need them so that
+# computing the index key (health checks, cache invalidation) stays cheap.
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.faiss'
+DOCSTORE_FILE = 'index.pkl'
+MANIFEST_FILE = 'manifest.json'
+
+
+def get_csv_path():
+    return os.path.join(settings.BASE_DIR, 'data', 'TruckMate.csv')
+
+
+def get_splitter_settings():
+    return {
+        'chunk_size': settings.CHATBOT_CHUNK_SIZE,
+        'chunk_overlap': settings.CHATBOT_CHUNK_OVERLAP,
+        'embedding_model': settings.CHATBOT_EMBEDDING_MODEL,
+    }
+
+
+def compute_index_key(csv_path=None):
+    # The key covers everything that changes the stored vectors: the CSV contents,
+    # the splitter settings and the embedding model.
+    csv_path = csv_path or get_csv_path()
+    digest = hashlib.sha256()
+    with open(csv_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    digest.update(json.dumps(get_splitter_settings(), sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+_current_key = {'stat': None, 'key': None}
+
+
+def current_index_key():
+    # compute_index_key(), re-hashing the CSV only when its size or mtime changed.
+    stat = os.stat(get_csv_path())
+    signature = (stat.st_size, stat.st_mtime_ns)
+    if _current_key['stat'] != signature:
+        _current_key['key'] = compute_index_key()
+        _current_key['stat'] = signature
+    return _current_key['key']
+
+
+def get_index_path(index_key):
+    return os.path.join(settings.CHATBOT_INDEX_DIR, index_key[:16])
+
+
+def get_documents_from_services():
+    from langchain_community.document_loaders.csv_loader import CSVLoader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    loader = CSVLoader(file_path=get_csv_path())
+    data = loader.load()
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=settings.CHATBOT_CHUNK_SIZE,
+        chunk_overlap=settings.CHATBOT_CHUNK_OVERLAP
+    )
+    splitData = splitter.split_documents(data)
+
+    return splitData
+
+
+def get_embeddings():
+    from langchain_openai import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(model=settings.CHATBOT_EMBEDDING_MODEL)
+
+
+def build_index(index_key, embedding):
+    from langchain_community.vectorstores.faiss import FAISS
+
+    data = get_documents_from_services()
+    vectorStore = FAISS.from_documents(data, embedding=embedding)
+
+    # Write into a scratch directory first and rename it into place, so a worker
+    # starting concurrently never sees a half-written index.
+    os.makedirs(settings.CHATBOT_INDEX_DIR, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.build-', dir=settings.CHATBOT_INDEX_DIR)
+    try:
+        vectorStore.save_local(tmp_dir)
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+            json.dump({'key': index_key, 'documents': len(data), **get_splitter_settings()}, f)
+        try:
+            os.replace(tmp_dir, get_index_path(index_key))
+        except OSError:
+            # Another process won the race; its index is identical to ours.
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    logger.info(f"Built chatbot index {index_key[:16]} from {len(data)} documents")
+    return vectorStore
+
+
+def load_index(index_key, embedding):
+    from langchain_community.vectorstores.faiss import FAISS, dependable_faiss_import
+
+    index_path = get_index_path(index_key)
+    faiss = dependable_faiss_import()
+    index_file = os.path.join(index_path, INDEX_FILE)
+    try:
+        index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        # Not every index type supports memory mapping.
+        index = faiss.read_index(index_file)
+
+    with open(os.path.join(index_path, DOCSTORE_FILE), 'rb') as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    logger.info(f"Loaded chatbot index {index_key[:16]} from {index_path}")
+    return FAISS(embedding, index, docstore, index_to_docstore_id)
+
+
+def index_exists(index_key):
+    return os.path.exists(os.path.join(get_index_path(index_key), MANIFEST_FILE))
+
+
+def load_or_build_vector_store(force_rebuild=False):
+    index_key = compute_index_key()
+    embedding = get_embeddings()
+
+    if not force_rebuild and index_exists(index_key):
+        try:
+            return load_index(index_key, embedding)
+        except Exception as e:
+            logger.error(f"Failed to load chatbot index {index_key[:16]}, rebuilding: {str(e)}")
+
+    return build_index(index_key, embedding)
+
+
+def prune_stale_indexes(keep_key):
+    if not os.path.isdir(settings.CHATBOT_INDEX_DIR):
+        return []
+    keep = os.path.basename(get_index_path(keep_key))
+    removed = []
+    for name in os.listdir(settings.CHATBOT_INDEX_DIR):
+        if name != keep and not name.startswith('.'):
+            shutil.rmtree(os.path.join(settings.CHATBOT_INDEX_DIR, name), ignore_errors=True)
+            removed.append(name)
+    return removed
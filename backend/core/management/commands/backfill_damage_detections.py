@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.analytics import HISTORY_VERSION
+from core.damage_detections import missing_detections, save_detections, set_damages_gin_index
+from core.models import TruckAssessment
+from core.response_cache import bump_table_version
+
+
+class Command(BaseCommand):
+    help = 'Fill the DamageDetection table from TruckAssessment.damages for existing assessments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--rebuild', action='store_true', help='Rewrite the detections of every assessment, not only missing ones.')
+        parser.add_argument('--gin-index', choices=['create', 'drop'],
+                            help='Create or drop the optional GIN index on TruckAssessment.damages (PostgreSQL only).')
+
+    def handle(self, *args, **options):
+        if options['gin_index']:
+            try:
+                set_damages_gin_index(options['gin_index'] == 'create')
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f"GIN index: {options['gin_index']} done"))
+            return
+
+        queryset = TruckAssessment.objects.all() if options['rebuild'] else missing_detections()
+        queryset = queryset.order_by('id').only('id', 'damages', 'images', 'assessment_date')
+
+        scanned = 0
+        written = 0
+        start = time.perf_counter()
+        # Keyset pagination on id; each chunk is one transaction with one bulk INSERT
+        last_id = 0
+        while True:
+            chunk = list(queryset.filter(id__gt=last_id)[:options['chunk_size']])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            scanned += len(chunk)
+            written += save_detections(chunk, replace=options['rebuild'])
+
+        if written:
+            # Per-class analytics of closed periods are cached
+            bump_table_version(HISTORY_VERSION)
+            bump_table_version(TruckAssessment._meta.db_table)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} detection(s) for {scanned} assessment(s) in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,94 @@
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import load_cases
+from core.views import PHILIPPINE_REPAIR_COSTS, calculate_multiple_damage_scores
+
+DAMAGE_CLASSES = ['dent', 'scratch', 'crack', 'broken_lamp', 'flat_tire', 'shattered_glass']
+
+
+def legacy_calculate_multiple_damage_scores(damages, chatbot_assessment):
+    # The regex-per-damage implementation that calculate_multiple_damage_scores replaced,
+    # kept verbatim as the benchmark baseline.
+    severity_mapping = {'low': 3, 'minor': 3, 'moderate': 6, 'high': 9, 'severe': 9}
+    total_confidence = sum(float(d['confidence']) for d in damages)
+    total_severity = 0
+    total_cost = 0
+
+    for damage in damages:
+        severity_match = re.search(rf"{re.escape(damage['area'])}.*?Severity:\s*(\w+)", chatbot_assessment, re.IGNORECASE | re.DOTALL)
+        cost_match = re.search(rf"{re.escape(damage['area'])}.*?Estimated Cost:\s*₱([\d,]+)", chatbot_assessment, re.IGNORECASE | re.DOTALL)
+
+        if severity_match:
+            severity_word = severity_match.group(1).lower()
+            severity_score = severity_mapping.get(severity_word, 5)
+        else:
+            severity_score = 5
+
+        confidence = float(damage['confidence'])
+        total_severity += severity_score * confidence
+
+        if cost_match:
+            cost = int(cost_match.group(1).replace(',', ''))
+        else:
+            cost = PHILIPPINE_REPAIR_COSTS.get(damage['area'].lower(), 1000)
+        total_cost += cost
+
+    weighted_severity = total_severity / total_confidence if total_confidence > 0 else 5
+    normalized_severity = min(10, weighted_severity)
+
+    max_severity = max((severity_mapping.get(re.search(rf"{re.escape(d['area'])}.*?Severity:\s*(\w+)", chatbot_assessment, re.IGNORECASE | re.DOTALL).group(1).lower(), 5) if re.search(rf"{re.escape(d['area'])}.*?Severity:\s*(\w+)", chatbot_assessment, re.IGNORECASE | re.DOTALL) else 5) for d in damages)
+
+    if max_severity <= 3:
+        urgency = 'low'
+    elif max_severity <= 6:
+        urgency = 'medium'
+    else:
+        urgency = 'high'
+
+    urgency_value = {'low': 1, 'medium': 2, 'high': 3}[urgency]
+    priority_score = (normalized_severity * 0.4) + (min(total_cost / 10000, 1) * 0.3) + (urgency_value * 0.3)
+
+    return normalized_severity, min(10, priority_score), total_cost, urgency
+
+
+def synthetic_case(count):
+    damages = []
+    blocks = ["Damage Assessment:"]
+    for index in range(count):
+        area = DAMAGE_CLASSES[index % len(DAMAGE_CLASSES)]
+        damages.append({'area': area, 'confidence': f"{0.5 + (index % 5) / 10:.2f}"})
+        blocks.append(
+            f"\n* Area: {area}\n* Severity: {['Low', 'Moderate', 'High'][index % 3]}\n"
+            f"* Recommended Action: Inspect and repair the {area.replace('_', ' ')} on panel {index}\n"
+            f"* Estimated Cost: ₱{1000 + index * 250:,}"
+        )
+    return damages, "\n".join(blocks)
+
+
+def time_call(function, damages, response, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function(damages, response)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+class Command(BaseCommand):
+    help = 'Compare the single-pass assessment parser with the previous regex-per-damage implementation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        cases = [(name, case['damages'], case['response']) for name, case in load_cases().items()]
+        cases += [(f"synthetic_{count}", *synthetic_case(count)) for count in (12, 50, 200)]
+
+        self.stdout.write(f"{'case':<22} {'damages':>7} {'legacy (us)':>12} {'single-pass (us)':>17} {'speedup':>8}  same result")
+        for name, damages, response in cases:
+            legacy_us = time_call(legacy_calculate_multiple_damage_scores, damages, response, iterations)
+            new_us = time_call(calculate_multiple_damage_scores, damages, response, iterations)
+            same = legacy_calculate_multiple_damage_scores(damages, response) == calculate_multiple_damage_scores(damages, response)
+            self.stdout.write(f"{name:<22} {len(damages):>7} {legacy_us:>12.1f} {new_us:>17.1f} {legacy_us / new_us:>7.1f}x  {'yes' if same else 'no'}")
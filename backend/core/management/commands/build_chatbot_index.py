@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from core.knowledge_base import (
+    build_index,
+    compute_index_key,
+    get_embeddings,
+    get_index_path,
+    index_exists,
+    prune_stale_indexes,
+)
+
+
+class Command(BaseCommand):
+    help = 'Build the persisted chatbot FAISS index for data/TruckMate.csv (run during deploy).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild even if an index for the current CSV exists.')
+        parser.add_argument('--prune', action='store_true', help='Delete indexes built from older versions of the CSV.')
+
+    def handle(self, *args, **options):
+        index_key = compute_index_key()
+        index_path = get_index_path(index_key)
+
+        if index_exists(index_key) and not options['force']:
+            self.stdout.write(f"Chatbot index is up to date: {index_path}")
+        else:
+            build_index(index_key, get_embeddings())
+            self.stdout.write(self.style.SUCCESS(f"Built chatbot index: {index_path}"))
+
+        if options['prune']:
+            for name in prune_stale_indexes(index_key):
+                self.stdout.write(f"Removed stale index {name}")
@@ -0,0 +1,52 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.dashboard import InvalidDashboardQuery
+from core.export import EXPORT_FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = 'Stream assessments as CSV or NDJSON, with the same filters as the admin dashboard.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', '-o', default='-', help='File to write (default: stdout).')
+        parser.add_argument('--urgency', default='', help='Comma-separated urgency levels, e.g. high,medium.')
+        parser.add_argument('--priority', choices=['low', 'medium', 'high'])
+        parser.add_argument('--truck-id')
+        parser.add_argument('--date-from', help='ISO date or datetime (inclusive).')
+        parser.add_argument('--date-to', help='ISO date or datetime (inclusive).')
+        parser.add_argument('--damage-class', default='', help='Comma-separated damage classes, e.g. dent,shattered_glass.')
+        parser.add_argument('--min-confidence', help='Only assessments with a detection (of --damage-class) at least this confident.')
+        parser.add_argument('--detections', action='store_true', help='One row per detection instead of per assessment.')
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        params = {
+            'urgency': options['urgency'],
+            'priority': options['priority'],
+            'truck_id': options['truck_id'],
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+            'damage_class': options['damage_class'],
+            'min_confidence': options['min_confidence'],
+        }
+        try:
+            content = iter_export(params, options['format'], options['detections'], options['chunk_size'])
+        except InvalidDashboardQuery as e:
+            raise CommandError(str(e))
+
+        if options['output'] == '-':
+            self.write_lines(sys.stdout, content)
+        else:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+                count = self.write_lines(f, content)
+            self.stderr.write(f"Wrote {count} line(s) to {options['output']}")
+
+    def write_lines(self, f, content):
+        count = 0
+        for line in content:
+            f.write(line)
+            count += 1
+        return count
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.search import install_search_index
+
+
+class Command(BaseCommand):
+    help = 'Create the assessment full-text search index if missing and rebuild its contents (SQLite FTS5).'
+
+    def handle(self, *args, **options):
+        backend = install_search_index(rebuild=True)
+        if backend is None:
+            self.stdout.write(self.style.WARNING('No full-text search on this database; searches fall back to ILIKE'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Search index ready ({backend})"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.summaries import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the AssessmentSummary counters from scratch and report any drift that was corrected.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without rewriting the summary.')
+
+    def handle(self, *args, **options):
+        drift = rebuild_summaries(dry_run=options['dry_run'])
+        for bucket, (stored, expected) in sorted(drift.items()):
+            differences = ', '.join(
+                f"{field} {stored[field]} -> {expected[field]}"
+                for field in expected if str(stored[field]) != str(expected[field])
+            )
+            self.stdout.write(f"  {bucket}: {differences}")
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Assessment summaries are up to date'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} bucket(s) have drifted"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt assessment summaries ({len(drift)} bucket(s) corrected)"))
@@ -0,0 +1,87 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.analytics import HISTORY_VERSION
+from core.models import TruckAssessment
+from core.rescoring import rescore_chunk
+from core.response_cache import bump_table_version
+from core.summaries import rebuild_summaries
+
+SCORE_FIELDS = ['severity_score', 'estimated_repair_cost', 'urgency_level', 'priority_score']
+UPDATE_FIELDS = SCORE_FIELDS + ['priority_explanation', 'damage_description']
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored assessment scores after PHILIPPINE_REPAIR_COSTS or the priority weights change.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--engine', choices=['rules', 'llm', 'all'], default='rules',
+                            help='Which assessments to rescore (default: rule-based ones, whose scores come only from the detections).')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing.')
+        parser.add_argument('--show', type=int, default=20, help='Number of changed rows to print in the diff report.')
+
+    def handle(self, *args, **options):
+        queryset = TruckAssessment.objects.order_by('id').only(
+            'id', 'truck_id', 'assessment_engine', 'damages', *UPDATE_FIELDS
+        )
+        if options['engine'] != 'all':
+            queryset = queryset.filter(assessment_engine=options['engine'])
+
+        chunk_size = options['chunk_size']
+        scanned = 0
+        changed_count = 0
+        field_counts = dict.fromkeys(UPDATE_FIELDS, 0)
+        shown = 0
+        start = time.perf_counter()
+
+        # Keyset pagination on id keeps every chunk query cheap and is safe to run
+        # while writing to the same table. bulk_update skips post_save, so
+        # rescoring never re-sends priority notifications (nor updates the summary
+        # counters, which are rebuilt once at the end instead).
+        last_id = 0
+        while True:
+            chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            scanned += len(chunk)
+            changed_count, shown = self.process_chunk(chunk, options, field_counts, changed_count, shown)
+
+        if changed_count and not options['dry_run']:
+            rebuild_summaries()
+
+        elapsed = time.perf_counter() - start
+        verb = 'Would update' if options['dry_run'] else 'Updated'
+        self.stdout.write(f"Scanned {scanned} assessment(s); {verb.lower()} {changed_count}")
+        for field, count in field_counts.items():
+            if count:
+                self.stdout.write(f"  {field}: {count} row(s)")
+        rate = scanned / elapsed if elapsed > 0 else 0
+        self.stdout.write(self.style.SUCCESS(f"{verb} in {elapsed:.2f}s ({rate:,.0f} rows/sec)"))
+
+    def process_chunk(self, chunk, options, field_counts, changed_count, shown):
+        changed = rescore_chunk(chunk)
+        for assessment, changes in changed:
+            for field in changes:
+                field_counts[field] += 1
+            if options['dry_run'] and shown < options['show']:
+                shown += 1
+                self.stdout.write(f"{assessment.truck_id} (#{assessment.id}):")
+                for field in SCORE_FIELDS:
+                    if field in changes:
+                        old, new = changes[field]
+                        self.stdout.write(f"  {field}: {old} -> {new}")
+                if 'damage_description' in changes:
+                    self.stdout.write("  damage_description: regenerated")
+
+        if changed and not options['dry_run']:
+            # Only the columns that changed somewhere in this chunk: each one costs a CASE WHEN per row.
+            fields = [field for field in UPDATE_FIELDS if any(field in changes for _, changes in changed)]
+            with transaction.atomic():
+                TruckAssessment.objects.bulk_update([assessment for assessment, _ in changed], fields, batch_size=500)
+                bump_table_version(TruckAssessment._meta.db_table)
+                bump_table_version(HISTORY_VERSION)
+        return changed_count + len(changed), shown
@@ -0,0 +1,47 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import run_worker
+
+
+def worker_main(poll_interval, max_jobs):
+    # Forked children must not share the parent's database connection.
+    connections.close_all()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    run_worker(poll_interval=poll_interval, max_jobs=max_jobs)
+
+
+class Command(BaseCommand):
+    help = 'Run background workers that process queued assessment jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Number of worker processes.')
+        parser.add_argument('--poll-interval', type=float, default=None, help='Seconds between queue polls when idle.')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling forever.')
+
+    def handle(self, *args, **options):
+        max_jobs = float('inf') if options['once'] else None
+        poll_interval = options['poll_interval']
+
+        if options['processes'] <= 1:
+            processed = run_worker(poll_interval=poll_interval, max_jobs=max_jobs)
+            self.stdout.write(f"Processed {processed} job(s)")
+            return
+
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=worker_main, args=(poll_interval, max_jobs), name=f"assessment-worker-{index}")
+            for index in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {len(workers)} assessment worker process(es)")
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
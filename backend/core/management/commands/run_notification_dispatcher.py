@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.notifications import requeue_dead_notifications, run_dispatcher
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued SMS notifications from the outbox, retrying failures with backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=None, help='Seconds between outbox polls when idle.')
+        parser.add_argument('--once', action='store_true', help='Send everything that is due and exit.')
+        parser.add_argument('--requeue-dead', nargs='*', type=int, metavar='ID',
+                            help='Move dead-lettered notifications (all, or these ids) back to pending and exit.')
+
+    def handle(self, *args, **options):
+        if options['requeue_dead'] is not None:
+            requeued = requeue_dead_notifications(options['requeue_dead'])
+            self.stdout.write(self.style.SUCCESS(f"Requeued {requeued} dead-lettered notification(s)"))
+            return
+        try:
+            sent = run_dispatcher(poll_interval=options['poll_interval'], once=options['once'])
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} notification(s)"))
@@ -0,0 +1,67 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Each probe runs in a fresh interpreter so earlier imports don't hide the cost of
+# later ones. "setup" is excluded from the timing.
+PROBES = [
+    ('django + core.urls', 'import django; django.setup()', 'import core.urls'),
+    ('cv2', '', 'import cv2'),
+    ('ultralytics / torch', '', 'import ultralytics'),
+    ('openai', '', 'import openai'),
+    ('langchain chatbot chain', 'import django; django.setup()', 'import core.chatbot'),
+    ('faiss', '', 'import faiss'),
+]
+
+LOAD_PROBES = [
+    ('detector load', 'import django; django.setup(); from core import providers', 'providers.detector.get()'),
+    ('chatbot index + chain load', 'import django; django.setup(); from core import providers', 'providers.chatbot.get()'),
+]
+
+PROBE_TEMPLATE = """
+import json, time
+{setup}
+start = time.perf_counter()
+{statement}
+print(json.dumps(time.perf_counter() - start))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Measure import (and optionally load) time of each heavy subsystem in a fresh interpreter.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--load', action='store_true', help='Also time loading the detector and chatbot chain (needs weights and OpenAI credentials).')
+
+    def run_probe(self, setup, statement):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'truck_assessment.settings'))
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE_TEMPLATE.format(setup=setup, statement=statement)],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()
+            return None, error[-1] if error else f"exit code {result.returncode}"
+        return json.loads(result.stdout.strip().splitlines()[-1]), None
+
+    def handle(self, *args, **options):
+        probes = PROBES + (LOAD_PROBES if options['load'] else [])
+        self.stdout.write(f"{'subsystem':<30} {'min (s)':>9} {'median (s)':>11}")
+        for name, setup, statement in probes:
+            timings = []
+            error = None
+            for _ in range(options['repeat']):
+                elapsed, error = self.run_probe(setup, statement)
+                if error:
+                    break
+                timings.append(elapsed)
+            if error:
+                self.stdout.write(f"{name:<30} {'-':>9} {'-':>11}  ({error})")
+            else:
+                self.stdout.write(f"{name:<30} {min(timings):>9.3f} {statistics.median(timings):>11.3f}")
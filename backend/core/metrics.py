@@ -0,0 +1,35 @@
+import threading
+from collections import defaultdict
+
+# In-process counters and timing summaries, exposed on /health/metrics. Each worker
+# keeps its own numbers; scrape every worker (or aggregate upstream) for totals.
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_observations = {}
+
+
+def increment(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name, value):
+    with _lock:
+        summary = _observations.get(name)
+        if summary is None:
+            _observations[name] = {'count': 1, 'sum': value, 'min': value, 'max': value, 'last': value}
+        else:
+            summary['count'] += 1
+            summary['sum'] += value
+            summary['min'] = min(summary['min'], value)
+            summary['max'] = max(summary['max'], value)
+            summary['last'] = value
+
+
+def snapshot():
+    with _lock:
+        observations = {
+            name: {**summary, 'avg': summary['sum'] / summary['count']}
+            for name, summary in _observations.items()
+        }
+        return {'counters': dict(_counters), 'observations': observations}
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_assessmentjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessmentjob',
+            name='options',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.CreateModel(
+            name='AssessmentNarrativeCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('signature', models.CharField(max_length=64, unique=True)),
+                ('damage_signature', models.JSONField(default=list)),
+                ('prompt_version', models.CharField(max_length=20)),
+                ('model_name', models.CharField(max_length=50)),
+                ('response', models.TextField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='core_assess_created_29361e_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_assessmentjob_options_assessmentnarrativecache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessmentjob',
+            name='kind',
+            field=models.CharField(choices=[('assess', 'Assess uploaded images'), ('enrich', 'Add LLM narrative to an assessment')], default='assess', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='truckassessment',
+            name='assessment_engine',
+            field=models.CharField(choices=[('llm', 'LLM'), ('rules', 'Rule-based')], default='llm', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='truckassessment',
+            name='llm_assessment',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:40
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_assessment_sequence(apps, schema_editor):
+    # Numbers used to come from COUNT(*) + 1, which never exceeds the highest id,
+    # so starting above it can't reuse an existing TRUCK-<n> or assessment_<n>.jpg.
+    TruckAssessment = apps.get_model('core', 'TruckAssessment')
+    IdentifierSequence = apps.get_model('core', 'IdentifierSequence')
+    max_id = TruckAssessment.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    IdentifierSequence.objects.create(name='assessment', next_value=max_id + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_assessmentjob_kind_truckassessment_assessment_engine_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdentifierSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('next_value', models.BigIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(seed_assessment_sequence, migrations.RunPython.noop),
+    ]
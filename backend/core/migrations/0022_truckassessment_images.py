@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_identifiersequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='truckassessment',
+            name='images',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_truckassessment_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DetectionCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_sha256', models.CharField(max_length=64)),
+                ('model_key', models.CharField(max_length=64)),
+                ('dhash', models.BigIntegerField(blank=True, null=True)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('detections', models.JSONField(default=list)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model_key', 'width', 'height'], name='core_detect_model_k_96ceda_idx'), models.Index(fields=['last_used_at'], name='core_detect_last_us_2b3733_idx')],
+                'unique_together': {('image_sha256', 'model_key')},
+            },
+        ),
+    ]
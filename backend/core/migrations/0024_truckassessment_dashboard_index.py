@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_detectioncacheentry'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='truckassessment',
+            name='core_trucka_priorit_72600c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='truckassessment',
+            index=models.Index(fields=['-priority_score', '-assessment_date', 'id'], name='core_assessment_dashboard_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:49
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def seed_assessment_summaries(apps, schema_editor):
+    # Counters for the assessments that already exist; from here on they are
+    # maintained by core.summaries.
+    TruckAssessment = apps.get_model('core', 'TruckAssessment')
+    AssessmentSummary = apps.get_model('core', 'AssessmentSummary')
+    aggregates = {
+        'assessments': Count('id'),
+        'low_urgency': Count('id', filter=Q(urgency_level='low')),
+        'medium_urgency': Count('id', filter=Q(urgency_level='medium')),
+        'high_urgency': Count('id', filter=Q(urgency_level='high')),
+        'high_priority': Count('id', filter=Q(priority_score__gte=7)),
+        'total_repair_cost': Coalesce(Sum('estimated_repair_cost'), Value(Decimal('0')), output_field=DecimalField()),
+    }
+    summaries = [AssessmentSummary(bucket='total', **TruckAssessment.objects.aggregate(**aggregates))]
+    daily = TruckAssessment.objects.annotate(day=TruncDate('assessment_date')).order_by().values('day').annotate(**aggregates)
+    for row in daily:
+        summaries.append(AssessmentSummary(bucket=row['day'].isoformat(), **row))
+    AssessmentSummary.objects.bulk_create(summaries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_truckassessment_dashboard_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssessmentSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(max_length=10, unique=True)),
+                ('day', models.DateField(blank=True, db_index=True, null=True)),
+                ('assessments', models.IntegerField(default=0)),
+                ('low_urgency', models.IntegerField(default=0)),
+                ('medium_urgency', models.IntegerField(default=0)),
+                ('high_urgency', models.IntegerField(default=0)),
+                ('high_priority', models.IntegerField(default=0)),
+                ('total_repair_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(seed_assessment_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_tableversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DamageDetection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('damage_class', models.CharField(max_length=50)),
+                ('confidence', models.FloatField()),
+                ('image', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('box_x1', models.FloatField(blank=True, null=True)),
+                ('box_y1', models.FloatField(blank=True, null=True)),
+                ('box_x2', models.FloatField(blank=True, null=True)),
+                ('box_y2', models.FloatField(blank=True, null=True)),
+                ('assessment_date', models.DateTimeField()),
+                ('assessment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='detections', to='core.truckassessment')),
+            ],
+            options={
+                'ordering': ['assessment', 'position'],
+                'indexes': [models.Index(fields=['damage_class', '-assessment_date', 'confidence'], name='core_detection_class_date_idx'), models.Index(fields=['damage_class', '-confidence'], name='core_detection_class_conf_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='damagedetection',
+            constraint=models.UniqueConstraint(fields=('assessment', 'position'), name='core_detection_unique_position'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_damagedetection'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='truckassessment',
+            index=models.Index(fields=['urgency_level', 'assessment_date'], name='core_assessment_urgency_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationRateLimit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(max_length=20)),
+                ('recipient', models.CharField(max_length=254)),
+                ('tokens', models.FloatField()),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='digest_assessments',
+            field=models.ManyToManyField(blank=True, related_name='digests', to='core.truckassessment'),
+        ),
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='kind',
+            field=models.CharField(choices=[('alert', 'Single alert'), ('digest', 'Digest of alerts')], default='alert', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='notificationoutbox',
+            name='channel',
+            field=models.CharField(choices=[('sms', 'SMS'), ('email', 'Email')], default='sms', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='notificationoutbox',
+            name='message',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='notificationoutbox',
+            name='recipient',
+            field=models.CharField(max_length=254),
+        ),
+        migrations.AddIndex(
+            model_name='notificationoutbox',
+            index=models.Index(fields=['channel', 'recipient', '-created_at'], name='core_outbox_recipient_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationoutbox',
+            constraint=models.UniqueConstraint(condition=models.Q(('kind', 'digest'), ('status', 'pending')), fields=('channel', 'recipient'), name='core_outbox_one_open_digest'),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationratelimit',
+            constraint=models.UniqueConstraint(fields=('channel', 'recipient'), name='core_rate_limit_recipient'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_notification_digests'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessmentjob',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:08
+
+from django.db import migrations, models
+
+
+def fill_dhash_prefix(apps, schema_editor):
+    DetectionCacheEntry = apps.get_model('core', 'DetectionCacheEntry')
+    for entry in DetectionCacheEntry.objects.filter(dhash__isnull=False).only('id', 'dhash').iterator():
+        prefix = (entry.dhash & ((1 << 64) - 1)) >> 48
+        DetectionCacheEntry.objects.filter(id=entry.id).update(dhash_prefix=prefix)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_assessmentjob_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='detectioncacheentry',
+            name='core_detect_model_k_96ceda_idx',
+        ),
+        migrations.AddField(
+            model_name='detectioncacheentry',
+            name='dhash_prefix',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='detectioncacheentry',
+            index=models.Index(fields=['model_key', 'dhash_prefix', 'width', 'height'], name='core_detect_model_k_587289_idx'),
+        ),
+        migrations.RunPython(fill_dhash_prefix, migrations.RunPython.noop),
+    ]
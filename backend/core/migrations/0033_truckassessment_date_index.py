@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_detectioncacheentry_dhash_prefix'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='truckassessment',
+            index=models.Index(fields=['assessment_date', 'id'], name='core_assessment_date_idx'),
+        ),
+    ]
@@ -1,16 +1,14 @@
 import logging
-import requests
 import json
 
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.db import models
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.core.mail import send_mail
 from django.conf import settings
-from twilio.rest import Client
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +39,8 @@ class TruckAssessment(models.Model):
     assessment_date = models.DateTimeField(auto_now_add=True)
     damage_description = models.TextField()
     image_url = models.TextField()
+    # [{'original': name, 'annotated': name, 'thumbnail': name}] in core.image_store, one per photo
+    images = models.JSONField(default=list, blank=True)
     damages = models.JSONField(default=list)
     severity_score = models.DecimalField(
         max_digits=4,
@@ -69,6 +69,13 @@ class TruckAssessment(models.Model):
         blank=True
     )
     priority_explanation = models.TextField(null=True, blank=True)
+    ENGINE_CHOICES = [
+        ('llm', 'LLM'),
+        ('rules', 'Rule-based'),
+    ]
+    assessment_engine = models.CharField(max_length=10, choices=ENGINE_CHOICES, default='llm')
+    # Optional LLM narrative added after the fact to a rule-based assessment
+    llm_assessment = models.TextField(null=True, blank=True)
 
     def __str__(self):
         return f"Assessment for Truck {self.truck_id} on {self.assessment_date}"
@@ -77,44 +84,249 @@ class TruckAssessment(models.Model):
         ordering = ['-priority_score', '-assessment_date']
         indexes = [
             models.Index(fields=['truck_id']),
-            models.Index(fields=['-priority_score']),
+            # Keyset pagination order of the admin dashboard
+            models.Index(fields=['-priority_score', '-assessment_date', 'id'], name='core_assessment_dashboard_idx'),
+            # Dashboard sorted by date (?sort=date / -date)
+            models.Index(fields=['assessment_date', 'id'], name='core_assessment_date_idx'),
+            # Per-urgency trends in core.analytics
+            models.Index(fields=['urgency_level', 'assessment_date'], name='core_assessment_urgency_idx'),
+        ]
+
+class DamageDetection(models.Model):
+    # One row per entry of TruckAssessment.damages (see core.damage_detections), so
+    # damage-class analytics are index range scans instead of JSON parsing.
+    # assessment_date is copied from the assessment (it never changes) so the
+    # class/date/confidence index answers "class X above c since d" on its own.
+    assessment = models.ForeignKey(TruckAssessment, on_delete=models.CASCADE, related_name='detections')
+    position = models.PositiveIntegerField()
+    damage_class = models.CharField(max_length=50)
+    confidence = models.FloatField()
+    image = models.PositiveSmallIntegerField(null=True, blank=True)
+    # Box in original image coordinates, when the assessment stored one
+    box_x1 = models.FloatField(null=True, blank=True)
+    box_y1 = models.FloatField(null=True, blank=True)
+    box_x2 = models.FloatField(null=True, blank=True)
+    box_y2 = models.FloatField(null=True, blank=True)
+    assessment_date = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.damage_class} ({self.confidence:.2f}) in assessment {self.assessment_id}"
+
+    class Meta:
+        ordering = ['assessment', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['assessment', 'position'], name='core_detection_unique_position'),
+        ]
+        indexes = [
+            models.Index(fields=['damage_class', '-assessment_date', 'confidence'], name='core_detection_class_date_idx'),
+            models.Index(fields=['damage_class', '-confidence'], name='core_detection_class_conf_idx'),
         ]
 
 @receiver(post_save, sender=TruckAssessment)
 def notify_priority_assessment(sender, instance, created, **kwargs):
+    # Cached dashboard and list responses are keyed by the table version
+    from .response_cache import bump_table_version
+    bump_table_version(TruckAssessment._meta.db_table)
+
     if created and instance.urgency_level in ['high']:
-        urgency_phrase = "Immediate action required" if instance.urgency_level == "high" else "Prompt attention needed"
-        
-        damages_list = ", ".join([f"{damage['area']} ({damage['confidence']})" for damage in instance.get_damages()])
-        
-        sms_message = f"""
-URGENT: Truck {instance.truck_id} Assessment
-Priority Score: {instance.priority_score:.2f}/10
-Severity: {instance.severity_score}/10
-Est. Cost: ₱{instance.estimated_repair_cost:.2f}
-Urgency: {instance.urgency_level.capitalize()}
-Damages: {damages_list}
-{urgency_phrase}
-Review ASAP for timely repairs.
-"""
-
-        sendista_payload = {
-            "secret": settings.SENDISTA_API_SECRET,
-            "mode": "devices",
-            "device": settings.SENDISTA_DEVICE_ID,
-            "sim": 1,
-            "priority": 1,
-            "phone": settings.ADMIN_PHONE_NUMBER,
-            "message": sms_message.strip()
-        }
-
-        try:
-            response = requests.post(settings.SENDISTA_API_URL, params=sendista_payload)
-            result = response.json()
-            
-            if result['status'] == 200:
-                logger.info(f"SMS notification sent for Truck {instance.truck_id}")
-            else:
-                logger.error(f"Failed to send SMS notification for Truck {instance.truck_id}: {result['message']}")
-        except Exception as e:
-            logger.error(f"Error occurred while sending SMS notification for Truck {instance.truck_id}: {str(e)}")
\ No newline at end of file
+        # Written to the outbox in the assessment's transaction; core.notifications
+        # delivers it from a dispatcher process, never inside the request.
+        from .notifications import enqueue_priority_notification
+        enqueue_priority_notification(instance)
+
+@receiver(post_delete, sender=TruckAssessment)
+def bump_assessment_version_on_delete(sender, instance, **kwargs):
+    from .response_cache import bump_table_version
+    bump_table_version(TruckAssessment._meta.db_table)
+
+class AssessmentJob(models.Model):
+    KIND_CHOICES = [
+        ('assess', 'Assess uploaded images'),
+        ('enrich', 'Add LLM narrative to an assessment'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='assess')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0)
+    stage = models.CharField(max_length=50, blank=True)
+    upload_paths = models.JSONField(default=list)
+    options = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    assessment = models.ForeignKey(TruckAssessment, null=True, blank=True, on_delete=models.SET_NULL, related_name='jobs')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Failed attempts are retried with backoff, not before this time
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Assessment job {self.id} ({self.status})"
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+
+class AssessmentNarrativeCache(models.Model):
+    # LLM assessment text reused for uploads with the same canonical damage signature
+    signature = models.CharField(max_length=64, unique=True)
+    damage_signature = models.JSONField(default=list)
+    prompt_version = models.CharField(max_length=20)
+    model_name = models.CharField(max_length=50)
+    response = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Cached assessment {self.signature[:12]} ({self.model_name}, prompt v{self.prompt_version})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+
+class IdentifierSequence(models.Model):
+    # Counter rows for core.identifiers; each process reserves a block of values at a time.
+    name = models.CharField(max_length=50, unique=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name} (next {self.next_value})"
+
+
+class DetectionCacheEntry(models.Model):
+    # Detector output for an uploaded image, reused when the same photo is submitted again
+    image_sha256 = models.CharField(max_length=64)
+    model_key = models.CharField(max_length=64)
+    dhash = models.BigIntegerField(null=True, blank=True)
+    # Top 16 bits of dhash: near-duplicate lookups only scan entries in the same bucket
+    dhash_prefix = models.PositiveIntegerField(null=True, blank=True)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    detections = models.JSONField(default=list)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Detections for {self.image_sha256[:12]} (model {self.model_key[:12]})"
+
+    class Meta:
+        unique_together = ('image_sha256', 'model_key')
+        indexes = [
+            models.Index(fields=['model_key', 'dhash_prefix', 'width', 'height']),
+            models.Index(fields=['last_used_at']),
+        ]
+
+
+class AssessmentSummary(models.Model):
+    # Running totals of TruckAssessment kept up to date by core.summaries: one 'total'
+    # row plus one row per assessment day (bucket is the ISO date).
+    bucket = models.CharField(max_length=10, unique=True)
+    day = models.DateField(null=True, blank=True, db_index=True)
+    assessments = models.IntegerField(default=0)
+    low_urgency = models.IntegerField(default=0)
+    medium_urgency = models.IntegerField(default=0)
+    high_urgency = models.IntegerField(default=0)
+    high_priority = models.IntegerField(default=0)
+    total_repair_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Assessment summary {self.bucket}: {self.assessments}"
+
+
+class TableVersion(models.Model):
+    # Bumped after every committed change to a table (see core.response_cache), so
+    # cached responses built from it can be validated with a single-row read.
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+    modified_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class NotificationOutbox(models.Model):
+    # Messages waiting for (or done with) delivery by core.notifications.run_dispatcher.
+    # An 'alert' is about one assessment; a 'digest' coalesces the alerts raised for a
+    # recipient within NOTIFICATION_DIGEST_WINDOW_SECONDS and is written when it is sent.
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead-lettered'),
+    ]
+    CHANNEL_CHOICES = [
+        ('sms', 'SMS'),
+        ('email', 'Email'),
+    ]
+    KIND_CHOICES = [
+        ('alert', 'Single alert'),
+        ('digest', 'Digest of alerts'),
+    ]
+    assessment = models.ForeignKey(TruckAssessment, null=True, blank=True, on_delete=models.SET_NULL, related_name='notifications')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='alert')
+    digest_assessments = models.ManyToManyField(TruckAssessment, blank=True, related_name='digests')
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES, default='sms')
+    recipient = models.CharField(max_length=254)
+    message = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    provider_response = models.JSONField(null=True, blank=True)
+    dispatcher = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.channel} {self.kind} to {self.recipient} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Due messages, oldest first
+            models.Index(fields=['status', 'next_attempt_at'], name='core_outbox_due_idx'),
+            # Last message per recipient, for the digest window
+            models.Index(fields=['channel', 'recipient', '-created_at'], name='core_outbox_recipient_idx'),
+        ]
+        constraints = [
+            # At most one open digest per recipient collects the coalesced alerts
+            models.UniqueConstraint(
+                fields=['channel', 'recipient'],
+                condition=models.Q(kind='digest', status='pending'),
+                name='core_outbox_one_open_digest',
+            ),
+        ]
+
+
+class NotificationRateLimit(models.Model):
+    # Token bucket per recipient, shared by every dispatcher process
+    channel = models.CharField(max_length=20)
+    recipient = models.CharField(max_length=254)
+    tokens = models.FloatField()
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.channel} {self.recipient}: {self.tokens:.2f} token(s)"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['channel', 'recipient'], name='core_rate_limit_recipient'),
+        ]
@@ -0,0 +1,371 @@
+import logging
+import re
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .jobs import backoff_delay, get_worker_id
+from .models import NotificationOutbox, NotificationRateLimit
+
+logger = logging.getLogger(__name__)
+
+# Transactional outbox: alerts are rows written in the same transaction as the
+# assessment, so they exist exactly when the assessment does. A dispatcher process
+# claims due rows, sends them over one pooled HTTP session with timeouts, and
+# retries failures with exponential backoff until NOTIFICATION_MAX_ATTEMPTS, after
+# which the row is dead-lettered (status 'dead') for an operator to inspect.
+#
+# Each recipient in NOTIFICATION_RECIPIENTS gets its own rows. Bursts are coalesced:
+# the first alert to a recipient is sent at once, later ones within the digest window
+# join a single pending digest sent when the window closes. Every send, retries
+# included, takes a token from the recipient's bucket or waits for one.
+
+# Set after a commit that queued messages, so an in-process dispatcher sends them now
+_notification_queued = threading.Event()
+
+
+class DeliveryError(Exception):
+    def __init__(self, message, permanent=False, response=None):
+        super().__init__(message)
+        self.permanent = permanent
+        self.response = response
+
+
+def build_priority_message(assessment):
+    urgency_phrase = "Immediate action required" if assessment.urgency_level == "high" else "Prompt attention needed"
+    damages_list = ", ".join(f"{damage['area']} ({damage['confidence']})" for damage in assessment.damages or [])
+    return f"""
+URGENT: Truck {assessment.truck_id} Assessment
+Priority Score: {assessment.priority_score:.2f}/10
+Severity: {assessment.severity_score}/10
+Est. Cost: ₱{assessment.estimated_repair_cost:.2f}
+Urgency: {assessment.urgency_level.capitalize()}
+Damages: {damages_list}
+{urgency_phrase}
+Review ASAP for timely repairs.
+""".strip()
+
+
+def build_digest_message(assessments):
+    assessments = sorted(assessments, key=lambda a: (a.priority_score or 0, a.id), reverse=True)
+    top_n = settings.NOTIFICATION_DIGEST_TOP_N
+    total_cost = sum(a.estimated_repair_cost or 0 for a in assessments)
+    lines = [
+        f"URGENT: {len(assessments)} more high-urgency truck assessment(s) since the last alert",
+        f"Total Est. Cost: ₱{total_cost:,.2f}",
+        f"Top {min(top_n, len(assessments))} by priority:",
+    ]
+    for assessment in assessments[:top_n]:
+        lines.append(f"- Truck {assessment.truck_id}: {assessment.priority_score:.2f}/10, ₱{assessment.estimated_repair_cost:,.2f}")
+    if len(assessments) > top_n:
+        lines.append(f"(+{len(assessments) - top_n} more)")
+    lines.append("Review ASAP for timely repairs.")
+    return "\n".join(lines)
+
+
+def enqueue_alert(assessment, channel, recipient):
+    now = timezone.now()
+    window = settings.NOTIFICATION_DIGEST_WINDOW_SECONDS
+    recent = window > 0 and NotificationOutbox.objects.filter(
+        channel=channel, recipient=recipient, created_at__gte=now - timedelta(seconds=window),
+    ).exclude(status='dead').exists()
+    if not recent:
+        notification = NotificationOutbox.objects.create(
+            assessment=assessment, channel=channel, recipient=recipient, message=build_priority_message(assessment),
+        )
+        logger.info(f"Queued {channel} alert {notification.id} for Truck {assessment.truck_id}")
+        return notification
+
+    # The row lock keeps a dispatcher from claiming the digest until this alert is in it
+    digest = NotificationOutbox.objects.select_for_update().filter(
+        channel=channel, recipient=recipient, kind='digest', status='pending',
+    ).first()
+    if digest is None:
+        digest, _ = NotificationOutbox.objects.get_or_create(
+            channel=channel, recipient=recipient, kind='digest', status='pending',
+            defaults={'next_attempt_at': now + timedelta(seconds=window)},
+        )
+    digest.digest_assessments.add(assessment)
+    logger.info(f"Added Truck {assessment.truck_id} to {channel} digest {digest.id}")
+    return digest
+
+
+def enqueue_priority_notification(assessment):
+    # Joins the caller's transaction (the assessment's save) when there is one
+    with transaction.atomic():
+        notifications = [enqueue_alert(assessment, channel, recipient) for channel, recipient in settings.NOTIFICATION_RECIPIENTS]
+    transaction.on_commit(_notification_queued.set)
+    return notifications
+
+
+class SendistaGateway:
+    # One requests.Session per dispatcher: connections to the gateway are kept alive
+    # and reused. Retries are the outbox's job, so the adapter itself never retries.
+    def __init__(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.NOTIFICATION_HTTP_POOL_SIZE, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def send(self, notification):
+        import requests
+
+        payload = {
+            "secret": settings.SENDISTA_API_SECRET,
+            "mode": "devices",
+            "device": settings.SENDISTA_DEVICE_ID,
+            "sim": 1,
+            "priority": 1,
+            "phone": notification.recipient,
+            "message": notification.message,
+        }
+        try:
+            response = self.session.post(
+                settings.SENDISTA_API_URL,
+                params=payload,
+                timeout=(settings.NOTIFICATION_CONNECT_TIMEOUT, settings.NOTIFICATION_READ_TIMEOUT),
+            )
+        except requests.RequestException as e:
+            # The message quotes the request URL, whose query string carries the API secret
+            raise DeliveryError(f"{type(e).__name__}: {re.sub(r'[?][^ )]*', '', str(e))}")
+
+        try:
+            result = response.json()
+        except ValueError:
+            result = {'body': response.text[:500]}
+        if response.status_code >= 500 or response.status_code == 429:
+            raise DeliveryError(f"Gateway returned HTTP {response.status_code}", response=result)
+        if response.status_code >= 400:
+            # Bad credentials or payload fail the same way on every attempt
+            raise DeliveryError(f"Gateway returned HTTP {response.status_code}", permanent=True, response=result)
+        if result.get('status') != 200:
+            raise DeliveryError(f"Gateway rejected the message: {result.get('message')}", response=result)
+        return result
+
+    def close(self):
+        self.session.close()
+
+
+class EmailGateway:
+    # Through EMAIL_BACKEND, with one connection kept open for the dispatcher's lifetime
+    def __init__(self):
+        from django.core.mail import get_connection
+        self.connection = get_connection()
+
+    def send(self, notification):
+        from django.core.mail import EmailMessage
+
+        subject, _, body = notification.message.partition('\n')
+        try:
+            EmailMessage(subject, body or subject, settings.EMAIL_HOST_USER, [notification.recipient], connection=self.connection).send()
+        except Exception as e:
+            raise DeliveryError(f"{type(e).__name__}: {e}")
+        return {'status': 'sent'}
+
+    def close(self):
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+
+
+GATEWAYS = {
+    'sms': SendistaGateway,
+    'email': EmailGateway,
+}
+
+
+class GatewayPool(dict):
+    # Gateways are opened on first use, so a dispatcher only connects to channels it sends on
+    def __missing__(self, channel):
+        gateway = self[channel] = GATEWAYS[channel]()
+        return gateway
+
+
+def claim_notifications(dispatcher_id, limit=None):
+    # Conditional UPDATE per row, as in core.jobs.claim_next_job: two dispatchers never
+    # claim the same message.
+    now = timezone.now()
+    candidates = NotificationOutbox.objects.filter(status='pending', next_attempt_at__lte=now).order_by('next_attempt_at').values_list('id', flat=True)
+    claimed = []
+    for notification_id in candidates[:limit or settings.NOTIFICATION_BATCH_SIZE]:
+        if NotificationOutbox.objects.filter(id=notification_id, status='pending').update(
+            status='sending', dispatcher=dispatcher_id, claimed_at=now, attempts=F('attempts') + 1,
+        ):
+            claimed.append(notification_id)
+    return list(NotificationOutbox.objects.filter(id__in=claimed).order_by('next_attempt_at'))
+
+
+def reopen(notification_id, from_status='sending', **fields):
+    # Back to pending, if still in from_status. Alerts that arrive while a digest is sending or dead-lettered
+    # start a new digest, and only one digest per recipient may be pending, so the
+    # reopened digest absorbs that newer one.
+    with transaction.atomic():
+        notification = NotificationOutbox.objects.select_for_update().filter(id=notification_id, status=from_status).first()
+        if notification is None:
+            return 0
+        if notification.kind == 'digest':
+            newer = NotificationOutbox.objects.select_for_update().filter(
+                channel=notification.channel, recipient=notification.recipient, kind='digest', status='pending',
+            ).exclude(id=notification.id).first()
+            if newer is not None:
+                notification.digest_assessments.add(*newer.digest_assessments.all())
+                newer.delete()
+                logger.info(f"Merged digest {newer.id} into reopened digest {notification.id}")
+        return NotificationOutbox.objects.filter(id=notification_id, status=from_status).update(status='pending', **fields)
+
+
+def requeue_stale_notifications():
+    # Messages whose dispatcher died mid-send. The gateway may have delivered them, so a
+    # requeue can duplicate an SMS; that beats losing an urgent alert.
+    cutoff = timezone.now() - timedelta(seconds=settings.NOTIFICATION_SENDING_TIMEOUT)
+    stale = NotificationOutbox.objects.filter(status='sending', claimed_at__lt=cutoff).values_list('id', flat=True)
+    requeued = sum(reopen(notification_id, dispatcher='') for notification_id in list(stale))
+    if requeued:
+        logger.warning(f"Requeued {requeued} notification(s) from a stopped dispatcher")
+    return requeued
+
+
+def take_token(channel, recipient):
+    # 0 when a token was taken, else the seconds until the recipient's bucket has one
+    rate = settings.NOTIFICATION_RATE_LIMIT_PER_MINUTE / 60
+    burst = settings.NOTIFICATION_RATE_LIMIT_BURST
+    if rate <= 0 or burst <= 0:
+        return 0
+    with transaction.atomic():
+        bucket, _ = NotificationRateLimit.objects.select_for_update().get_or_create(
+            channel=channel, recipient=recipient, defaults={'tokens': burst},
+        )
+        now = timezone.now()
+        tokens = min(burst, bucket.tokens + max(0, (now - bucket.updated_at).total_seconds()) * rate)
+        wait = 0 if tokens >= 1 else (1 - tokens) / rate
+        bucket.tokens = tokens - 1 if tokens >= 1 else tokens
+        bucket.updated_at = now
+        bucket.save(update_fields=['tokens', 'updated_at'])
+    return wait
+
+
+def prepare_digest(notification):
+    # Rebuilt on every attempt: alerts can join a digest while it waits for a retry
+    if notification.kind != 'digest':
+        return True
+    assessments = list(notification.digest_assessments.all())
+    if not assessments:
+        NotificationOutbox.objects.filter(id=notification.id).update(status='dead', last_error='No assessments left to report', dispatcher='')
+        return False
+    notification.message = build_digest_message(assessments)
+    NotificationOutbox.objects.filter(id=notification.id).update(message=notification.message)
+    return True
+
+
+def deliver(notification, gateway):
+    # True when sent, False when it failed, None when deferred by the rate limit
+    wait = take_token(notification.channel, notification.recipient)
+    if wait:
+        reopen(notification.id, attempts=F('attempts') - 1, next_attempt_at=timezone.now() + timedelta(seconds=wait), dispatcher='')
+        logger.info(f"Notification {notification.id} to {notification.recipient} rate-limited for {wait:.0f}s")
+        return None
+    if not prepare_digest(notification):
+        return False
+
+    try:
+        result = gateway.send(notification)
+    except DeliveryError as e:
+        dead = e.permanent or notification.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS
+        fields = {
+            'next_attempt_at': timezone.now() + backoff_delay(
+                notification.attempts, settings.NOTIFICATION_RETRY_BASE_SECONDS, settings.NOTIFICATION_RETRY_MAX_SECONDS
+            ),
+            'last_error': str(e),
+            'provider_response': e.response,
+            'dispatcher': '',
+        }
+        if dead:
+            NotificationOutbox.objects.filter(id=notification.id).update(status='dead', **fields)
+        else:
+            reopen(notification.id, **fields)
+        log = logger.error if dead else logger.warning
+        log(f"Notification {notification.id} failed on attempt {notification.attempts}"
+            f"{' and was dead-lettered' if dead else ''}: {e}")
+        return False
+
+    NotificationOutbox.objects.filter(id=notification.id).update(
+        status='sent', sent_at=timezone.now(), last_error='', provider_response=result, dispatcher='',
+    )
+    logger.info(f"Sent {notification.channel} notification {notification.id} to {notification.recipient}")
+    return True
+
+
+def dispatch_pending(gateways, dispatcher_id=None):
+    # One pass over the due messages; returns (sent, failed)
+    dispatcher_id = dispatcher_id or get_worker_id()
+    requeue_stale_notifications()
+    sent = failed = 0
+    for notification in claim_notifications(dispatcher_id):
+        delivered = deliver(notification, gateways[notification.channel])
+        if delivered:
+            sent += 1
+        elif delivered is False:
+            failed += 1
+    return sent, failed
+
+
+def open_gateways():
+    return GatewayPool()
+
+
+def run_dispatcher(poll_interval=None, once=False, stop_event=None):
+    poll_interval = poll_interval or settings.NOTIFICATION_POLL_SECONDS
+    dispatcher_id = get_worker_id()
+    gateways = open_gateways()
+    logger.info(f"Notification dispatcher {dispatcher_id} started")
+    total = 0
+    try:
+        while stop_event is None or not stop_event.is_set():
+            close_old_connections()
+            sent, failed = dispatch_pending(gateways, dispatcher_id)
+            total += sent
+            if once and not sent and not failed:
+                break
+            if not sent and not failed:
+                _notification_queued.wait(poll_interval)
+                _notification_queued.clear()
+    finally:
+        for gateway in gateways.values():
+            gateway.close()
+        close_old_connections()
+    return total
+
+
+def requeue_dead_notifications(ids=None):
+    queryset = NotificationOutbox.objects.filter(status='dead')
+    if ids:
+        queryset = queryset.filter(id__in=ids)
+    return sum(
+        reopen(notification_id, 'dead', attempts=0, next_attempt_at=timezone.now(), last_error='')
+        for notification_id in list(queryset.values_list('id', flat=True))
+    )
+
+
+def serialize_notification(notification):
+    return {
+        'id': notification.id,
+        'assessment_id': notification.assessment_id,
+        'kind': notification.kind,
+        'assessment_ids': [assessment.id for assessment in notification.digest_assessments.all()] if notification.kind == 'digest' else None,
+        'channel': notification.channel,
+        'recipient': notification.recipient,
+        'status': notification.status,
+        'attempts': notification.attempts,
+        'next_attempt_at': notification.next_attempt_at,
+        'last_error': notification.last_error,
+        'created_at': notification.created_at,
+        'sent_at': notification.sent_at,
+    }
@@ -0,0 +1,117 @@
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Heavy subsystems (torch/ultralytics, openai, langchain/faiss) are only imported
+# when a provider is first used or explicitly warmed up, so manage.py commands and
+# the URLconf import stay fast and need no network credentials.
+class LazyProvider:
+    def __init__(self, name, factory):
+        self.name = name
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.error = None
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # A process forked while another thread was loading (gunicorn --preload warms
+        # up in the master) would inherit the lock held forever: start it unlocked,
+        # and forget an unfinished load.
+        self._lock = threading.Lock()
+        if self._instance is None:
+            self.load_seconds = None
+            self.error = None
+
+    @property
+    def loaded(self):
+        return self._instance is not None
+
+    def get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    start = time.perf_counter()
+                    try:
+                        self._instance = self._factory()
+                        self.error = None
+                    except Exception as e:
+                        self.error = str(e)
+                        logger.exception(f"Failed to load {self.name}: {str(e)}")
+                        raise
+                    finally:
+                        self.load_seconds = round(time.perf_counter() - start, 3)
+                    logger.info(f"Loaded {self.name} in {self.load_seconds:.2f}s")
+        return self._instance
+
+    def peek(self):
+        # The instance if already loaded, without triggering a load.
+        return self._instance
+
+    def reset(self):
+        with self._lock:
+            self._instance = None
+            self.load_seconds = None
+            self.error = None
+
+    def status(self):
+        return {
+            'loaded': self.loaded,
+            'load_seconds': self.load_seconds,
+            'error': self.error,
+        }
+
+
+def load_detector():
+    from ultralytics import YOLO
+    return YOLO(settings.DETECTOR_WEIGHTS)
+
+
+def load_assessment_client():
+    import openai
+    return openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+
+
+def load_async_assessment_client():
+    import openai
+    return openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+
+
+def load_vector_store():
+    from .knowledge_base import load_or_build_vector_store
+    return load_or_build_vector_store()
+
+
+def load_chatbot():
+    from .chatbot import Chatbot
+    from .knowledge_base import current_index_key
+    index_key = current_index_key()
+    return Chatbot(vector_store.get(), index_key)
+
+
+detector = LazyProvider('detector', load_detector)
+assessment_client = LazyProvider('assessment LLM client', load_assessment_client)
+async_assessment_client = LazyProvider('async assessment LLM client', load_async_assessment_client)
+vector_store = LazyProvider('chatbot index', load_vector_store)
+chatbot = LazyProvider('chatbot chain', load_chatbot)
+
+ALL_PROVIDERS = [detector, assessment_client, vector_store, chatbot]
+
+
+def get_chatbot():
+    # Rebuild the chatbot (and its index) if data/TruckMate.csv changed since it was loaded.
+    from .knowledge_base import current_index_key
+    bot = chatbot.get()
+    if bot.index_key != current_index_key():
+        logger.info("Knowledge base changed, reloading the chatbot index")
+        vector_store.reset()
+        chatbot.reset()
+        bot = chatbot.get()
+    return bot
@@ -0,0 +1,134 @@
+from collections import Counter
+from decimal import Decimal
+
+import numpy as np
+
+from .views import (
+    DAMAGE_SEVERITY,
+    PHILIPPINE_REPAIR_COSTS,
+    PRIORITY_COST_CEILING,
+    PRIORITY_DAMAGE_CEILING,
+    PRIORITY_WEIGHTS,
+    calculate_multiple_damage_scores,
+    damage_instance_key,
+    generate_damage_description,
+    generate_priority_explanation,
+    repair_cost_key,
+)
+
+URGENCY_LEVELS = np.array(['low', 'medium', 'high'])
+TWO_PLACES = Decimal('0.01')
+
+
+def flatten_damages(damages_lists):
+    # One entry per detection across the whole chunk, tagged with its row index,
+    # so the per-row sums below are single np.bincount calls.
+    rows, severities, base_costs, confidences, instance_factors = [], [], [], [], []
+    for row, damages in enumerate(damages_lists):
+        # Only dents and scratches scale with repeated instances
+        instance_counts = Counter(damage_instance_key(d) for d in damages if d['area'].lower() in ['dent', 'scratch'])
+        for damage in damages:
+            cost_key = repair_cost_key(damage['area'])
+            rows.append(row)
+            severities.append(DAMAGE_SEVERITY.get(cost_key, 5))
+            base_costs.append(PHILIPPINE_REPAIR_COSTS.get(cost_key, 2000))
+            confidences.append(float(damage['confidence']))
+            if damage['area'].lower() in ['dent', 'scratch']:
+                instance_factors.append(min(2.0, 1.0 + 0.2 * (instance_counts[damage_instance_key(damage)] - 1)))
+            else:
+                instance_factors.append(1.0)
+    return (
+        np.array(rows, dtype=np.intp),
+        np.array(severities, dtype=float),
+        np.array(base_costs, dtype=float),
+        np.array(confidences, dtype=float),
+        np.array(instance_factors, dtype=float),
+    )
+
+
+def score_rules_chunk(damages_lists):
+    # Vectorised equivalent of calculate_severity_score, estimate_repair_cost,
+    # calculate_urgency_level and calculate_priority_score for a chunk of rows.
+    row_count = len(damages_lists)
+    rows, severities, base_costs, confidences, instance_factors = flatten_damages(damages_lists)
+
+    damage_counts = np.bincount(rows, minlength=row_count)
+    total_confidence = np.bincount(rows, weights=confidences, minlength=row_count)
+    weighted_severity = np.bincount(rows, weights=severities * confidences, minlength=row_count)
+    severity = np.zeros(row_count)
+    np.divide(weighted_severity, total_confidence, out=severity, where=total_confidence > 0)
+    severity = np.minimum(10.0, severity)
+
+    total_cost = np.bincount(rows, weights=base_costs * confidences * instance_factors, minlength=row_count)
+    # Round half up to the nearest 100 PHP like estimate_repair_cost; the inner
+    # round absorbs float noise so exact halves match the Decimal path.
+    cost = np.floor(np.round(total_cost, 6) / 100 + 0.5) * 100
+
+    urgency = np.where(
+        (severity >= 7) | (damage_counts > 3), 3,
+        np.where((severity >= 4) | (damage_counts > 1), 2, 1),
+    )
+
+    priority = (
+        severity * PRIORITY_WEIGHTS['severity']
+        + np.minimum(cost / PRIORITY_COST_CEILING, 1) * PRIORITY_WEIGHTS['cost']
+        + urgency * PRIORITY_WEIGHTS['urgency']
+        + np.minimum(1, damage_counts / PRIORITY_DAMAGE_CEILING) * PRIORITY_WEIGHTS['damage_count']
+    )
+    priority = np.minimum(10.0, priority)
+
+    return severity, cost, URGENCY_LEVELS[urgency - 1], priority
+
+
+def to_decimal(value):
+    return Decimal(str(float(value))).quantize(TWO_PLACES)
+
+
+def rescore_chunk(assessments):
+    # Returns (assessment, changes) for every row whose stored scores differ from
+    # the current rules; changes maps field name to (old, new).
+    results = []
+    rules_rows = [a for a in assessments if a.assessment_engine == 'rules']
+    if rules_rows:
+        severity, cost, urgency, priority = score_rules_chunk([a.damages for a in rules_rows])
+        for index, assessment in enumerate(rules_rows):
+            scores = (float(severity[index]), float(cost[index]), str(urgency[index]), float(priority[index]))
+            description = generate_damage_description(assessment.damages)
+            results.append((assessment, scores, description))
+
+    for assessment in assessments:
+        if assessment.assessment_engine == 'rules':
+            continue
+        # LLM rows keep the model's narrative; only the scores derived from it change.
+        # Rows it can't be scored from (e.g. no damages) keep their stored values.
+        try:
+            severity_score, priority_score, estimated_repair_cost, urgency_level = calculate_multiple_damage_scores(
+                assessment.damages, assessment.damage_description
+            )
+        except Exception:
+            continue
+        scores = (float(severity_score), float(estimated_repair_cost), urgency_level, float(priority_score))
+        results.append((assessment, scores, assessment.damage_description))
+
+    changed = []
+    for assessment, (severity_score, estimated_repair_cost, urgency_level, priority_score), description in results:
+        new_values = {
+            'severity_score': to_decimal(severity_score),
+            'estimated_repair_cost': to_decimal(estimated_repair_cost),
+            'urgency_level': urgency_level,
+            'priority_score': to_decimal(priority_score),
+            'damage_description': description,
+        }
+        new_values['priority_explanation'] = generate_priority_explanation(
+            severity_score, estimated_repair_cost, urgency_level, assessment.damages, priority_score
+        )
+        changes = {
+            field: (getattr(assessment, field), value)
+            for field, value in new_values.items()
+            if getattr(assessment, field) != value
+        }
+        if changes:
+            for field, (_, value) in changes.items():
+                setattr(assessment, field, value)
+            changed.append((assessment, changes))
+    return changed
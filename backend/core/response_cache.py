@@ -0,0 +1,88 @@
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from . import metrics
+from .models import TableVersion
+
+logger = logging.getLogger(__name__)
+
+# Responses built from a table are cached under that table's version. Any committed
+# write bumps the version, so stale entries are never served, only left to expire.
+# A poll whose If-None-Match / If-Modified-Since still matches the version gets a 304
+# after one single-row read: no query on the table itself and no serialisation. The
+# ETag decides when both are sent. Last-Modified has one-second resolution, so it is
+# only sent and checked once the version's second is over: until then another write
+# in the same second would carry the same date and be hidden by If-Modified-Since.
+
+
+def bump_table_version(name):
+    # After commit: a reader that sees the new version is guaranteed to see the new rows.
+    def bump():
+        if not TableVersion.objects.filter(name=name).update(version=F('version') + 1, modified_at=timezone.now()):
+            TableVersion.objects.get_or_create(name=name)
+    transaction.on_commit(bump)
+
+
+def get_table_version(name):
+    row = TableVersion.objects.filter(name=name).values_list('version', 'modified_at').first()
+    if row is None:
+        table_version = TableVersion.objects.get_or_create(name=name)[0]
+        row = (table_version.version, table_version.modified_at)
+    return row
+
+
+def response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def add_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Browsers keep the body but revalidate every time, so polls become conditional requests
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Authorization', 'Cookie'])
+    return response
+
+
+def cached_json_response(request, namespace, table, build):
+    # build() returns the response data; it only runs when the cache has no entry for
+    # the current version of table. The key covers host and query string because the
+    # payload contains absolute URLs and depends on the filters.
+    version, modified_at = get_table_version(table)
+    last_modified = int(modified_at.timestamp())
+    if timezone.now().timestamp() < last_modified + 1:
+        last_modified = None
+    request_key = hashlib.sha256(request.build_absolute_uri().encode('utf-8')).hexdigest()[:32]
+    etag = quote_etag(f"{namespace}-{version}-{request_key[:16]}")
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        metrics.increment('response_cache_not_modified')
+        return add_validators(not_modified, etag, last_modified)
+
+    if settings.RESPONSE_CACHE_TTL_SECONDS <= 0:
+        content = JSONRenderer().render(build())
+    else:
+        cache = response_cache()
+        key = f"response:{namespace}:{version}:{request_key}"
+        content = cache.get(key)
+        if content is None:
+            metrics.increment('response_cache_misses')
+            content = JSONRenderer().render(build())
+            cache.set(key, content, settings.RESPONSE_CACHE_TTL_SECONDS)
+        else:
+            metrics.increment('response_cache_hits')
+
+    response = HttpResponse(content, content_type='application/json')
+    return add_validators(response, etag, last_modified)
@@ -0,0 +1,208 @@
+import logging
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+
+from .assessment_parser import FIELD_PATTERN
+from .dashboard import DASHBOARD_LIST_FIELDS, InvalidDashboardQuery, filter_assessments, get_page_size
+from .models import TruckAssessment
+
+logger = logging.getLogger(__name__)
+
+# Full-text search over truck_id and damage_description.
+# - PostgreSQL: a stored generated tsvector column (truck_id weighted A, description B)
+#   with a GIN index, queried with websearch_to_tsquery and ranked with ts_rank_cd.
+# - SQLite: an external-content FTS5 table kept in sync by triggers, ranked by bm25.
+# - Anything else (or SQLite without FTS5): ILIKE, unranked.
+# Both are installed idempotently after every migrate (see install_search_index):
+# SQLite drops a table's triggers whenever a migration rebuilds the table.
+SEARCH_CONFIG = 'english'
+SEARCH_COLUMN = 'search_vector'
+SEARCH_INDEX = 'core_assessment_search_idx'
+FTS_TABLE = 'core_assessment_fts'
+FTS_TRIGGERS = {
+    f'{FTS_TABLE}_ai': """AFTER INSERT ON {table} BEGIN
+        INSERT INTO {fts}(rowid, truck_id, damage_description) VALUES (new.id, new.truck_id, new.damage_description);
+    END""",
+    f'{FTS_TABLE}_ad': """AFTER DELETE ON {table} BEGIN
+        INSERT INTO {fts}({fts}, rowid, truck_id, damage_description) VALUES ('delete', old.id, old.truck_id, old.damage_description);
+    END""",
+    f'{FTS_TABLE}_au': """AFTER UPDATE OF truck_id, damage_description ON {table} BEGIN
+        INSERT INTO {fts}({fts}, rowid, truck_id, damage_description) VALUES ('delete', old.id, old.truck_id, old.damage_description);
+        INSERT INTO {fts}(rowid, truck_id, damage_description) VALUES (new.id, new.truck_id, new.damage_description);
+    END""",
+}
+_fts5_available = None
+
+
+def fts5_available(conn):
+    global _fts5_available
+    if _fts5_available is None:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            _fts5_available = bool(cursor.fetchone()[0])
+            if not _fts5_available:
+                # Builds with FTS5 as a loadable module don't report the compile option
+                try:
+                    cursor.execute('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)')
+                    cursor.execute('DROP TABLE temp.fts5_probe')
+                    _fts5_available = True
+                except Exception:
+                    pass
+    return _fts5_available
+
+
+def search_backend(conn=None):
+    conn = conn or connection
+    if conn.vendor == 'postgresql':
+        return 'postgresql'
+    if conn.vendor == 'sqlite' and fts5_available(conn):
+        return 'sqlite'
+    return None
+
+
+def install_search_index(conn=None, rebuild=False):
+    conn = conn or connection
+    backend = search_backend(conn)
+    table = conn.ops.quote_name(TruckAssessment._meta.db_table)
+    if backend == 'postgresql':
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {SEARCH_COLUMN} tsvector GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(truck_id, '')), 'A') || "
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(damage_description, '')), 'B')) STORED"
+            )
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} ON {table} USING GIN ({SEARCH_COLUMN})')
+    elif backend == 'sqlite':
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE %s", [f'{FTS_TABLE}%'])
+            existing = {row[0] for row in cursor.fetchall()}
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"truck_id, damage_description, content={table}, content_rowid='id', tokenize='porter unicode61')"
+            )
+            for name, body in FTS_TRIGGERS.items():
+                cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} ' + body.format(table=table, fts=FTS_TABLE))
+            # Rows written while a trigger was missing are only picked up by a rebuild
+            if rebuild or not set(FTS_TRIGGERS) | {FTS_TABLE} <= existing:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+                logger.info('Rebuilt the assessment full-text index')
+    return backend
+
+
+def install_search_index_after_migrate(sender, using='default', **kwargs):
+    from django.db import connections
+    install_search_index(connections[using])
+
+
+def fts_query(query):
+    # User input as a list of quoted prefix terms, so FTS5 syntax characters are inert
+    return ' '.join(f'"{term}"*' for term in re.findall(r'[^\W_]+', query))
+
+
+def search_assessments(query, queryset=None):
+    # queryset filtered to matches and annotated with search_rank (higher is better)
+    queryset = TruckAssessment.objects.all() if queryset is None else queryset
+    backend = search_backend()
+    table = connection.ops.quote_name(TruckAssessment._meta.db_table)
+    if backend == 'postgresql':
+        tsquery = 'websearch_to_tsquery(%s::regconfig, %s)'
+        return queryset.filter(
+            RawSQL(f'{table}.{SEARCH_COLUMN} @@ {tsquery}', (SEARCH_CONFIG, query), output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f'ts_rank_cd({table}.{SEARCH_COLUMN}, {tsquery})', (SEARCH_CONFIG, query), output_field=FloatField())
+        )
+    if backend == 'sqlite':
+        match = fts_query(query)
+        if not match:
+            return queryset.none()
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (match,))
+        ).annotate(
+            # bm25 is lower for better matches; truck_id hits count ten times as much
+            search_rank=RawSQL(
+                f'(SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id)',
+                (match,),
+                output_field=FloatField(),
+            )
+        )
+    return queryset.filter(
+        Q(truck_id__icontains=query) | Q(damage_description__icontains=query)
+    ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def description_blocks(text):
+    # Paragraphs of the description, with each "Area:" line starting a new damage block
+    blocks = [[]]
+    for line in (text or '').splitlines():
+        match = FIELD_PATTERN.match(line)
+        if not line.strip() or (match and match.group(1).lower() == 'area'):
+            if blocks[-1]:
+                blocks.append([])
+            if not line.strip():
+                continue
+        blocks[-1].append(line)
+    return ['\n'.join(block) for block in blocks if block]
+
+
+def term_pattern(query):
+    # Rough stemming so "dents" and "dented" highlight "dent" like the database matched them
+    stems = []
+    for term in re.findall(r'[^\W_]+', query.lower()):
+        for suffix in ('ing', 'ed', 'es', 's'):
+            if len(term) > len(suffix) + 3 and term.endswith(suffix):
+                term = term[:-len(suffix)]
+                break
+        stems.append(re.escape(term))
+    if not stems:
+        return None
+    return re.compile(rf"(?<![^\W_])(?:{'|'.join(sorted(set(stems), key=len, reverse=True))})[^\W_]*", re.IGNORECASE)
+
+
+def highlight(text, query):
+    # The damage block with the most matched terms, HTML-escaped with matches in <mark>
+    pattern = term_pattern(query)
+    blocks = description_blocks(text)
+    if pattern is None or not blocks:
+        return None
+    best = max(blocks, key=lambda block: len(set(match.lower() for match in pattern.findall(block))))
+    if not pattern.search(best):
+        return None
+    parts = []
+    position = 0
+    for match in pattern.finditer(best):
+        parts.append(escape(best[position:match.start()]))
+        parts.append(f'<mark>{escape(match.group(0))}</mark>')
+        position = match.end()
+    parts.append(escape(best[position:]))
+    return ''.join(parts)
+
+
+def search_page(params):
+    # ?q=...&page=N on top of the dashboard filters, best matches first. Offset paging:
+    # the rank is computed per query, so there is no stable key to page on.
+    query = params.get('q', '').strip()
+    if not query:
+        raise InvalidDashboardQuery('Missing search query q')
+    try:
+        page = max(1, int(params.get('page', 1)))
+    except ValueError:
+        raise InvalidDashboardQuery('Invalid page')
+    page_size = get_page_size(params)
+
+    queryset = search_assessments(query, filter_assessments(params)).order_by('-search_rank', '-assessment_date', 'id')
+    offset = (page - 1) * page_size
+    rows = list(queryset.values(*DASHBOARD_LIST_FIELDS, 'search_rank', 'damage_description', thumbnail=F('images__0__thumbnail'))[offset:offset + page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    for row in rows:
+        row['highlight'] = highlight(row.pop('damage_description'), query)
+    return {
+        'query': query,
+        'page': page,
+        'results': rows,
+        'has_more': has_more,
+    }
@@ -0,0 +1,113 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from . import metrics
+from .knowledge_base import current_index_key
+
+
+# Per-process cache of chatbot answers keyed by the embedding of the (rewritten)
+# question. A lookup hits when the best cosine similarity reaches the threshold.
+# Entries expire after a TTL, the least recently used entry is evicted once the
+# cache is full, and everything is dropped when data/TruckMate.csv changes.
+class SemanticAnswerCache:
+    def __init__(self, threshold, ttl_seconds, max_entries):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # id -> (unit vector, answer, stored_at)
+        self._matrix = None
+        self._matrix_ids = []
+        self._index_key = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _normalize(self, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_knowledge_base(self, index_key):
+        # Called with the lock held.
+        current_key = current_index_key()
+        if self._index_key != current_key:
+            if self._entries:
+                metrics.increment('chatbot_cache_invalidations')
+            self._entries.clear()
+            self._matrix = None
+            self._index_key = current_key
+        return index_key == current_key
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [entry_id for entry_id, (_, _, stored_at) in self._entries.items() if stored_at < cutoff]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        if expired:
+            self._matrix = None
+
+    def _similarities(self, vector):
+        if self._matrix is None:
+            self._matrix_ids = list(self._entries)
+            self._matrix = np.stack([self._entries[entry_id][0] for entry_id in self._matrix_ids]) if self._entries else None
+        if self._matrix is None:
+            return None
+        return self._matrix @ vector
+
+    def lookup(self, vector, index_key):
+        vector = self._normalize(vector)
+        with self._lock:
+            answer = None
+            if self._check_knowledge_base(index_key):
+                self._expire()
+                similarities = self._similarities(vector)
+                if similarities is not None:
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.threshold:
+                        entry_id = self._matrix_ids[best]
+                        self._entries.move_to_end(entry_id)
+                        answer = self._entries[entry_id][1]
+
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.increment('chatbot_cache_hits' if answer is not None else 'chatbot_cache_misses')
+        return answer
+
+    def store(self, vector, answer, index_key):
+        vector = self._normalize(vector)
+        with self._lock:
+            # Don't cache answers produced from an index that is no longer current.
+            if not self._check_knowledge_base(index_key):
+                return
+            self._entries[uuid.uuid4().hex] = (vector, answer, time.monotonic())
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'index_key': self._index_key[:16] if self._index_key else None,
+            }
+
+
+answer_cache = SemanticAnswerCache(
+    threshold=settings.CHATBOT_CACHE_SIMILARITY_THRESHOLD,
+    ttl_seconds=settings.CHATBOT_CACHE_TTL_SECONDS,
+    max_entries=settings.CHATBOT_CACHE_MAX_ENTRIES,
+)
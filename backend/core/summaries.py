@@ -0,0 +1,154 @@
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import AssessmentSummary, TruckAssessment
+from .response_cache import bump_table_version
+
+logger = logging.getLogger(__name__)
+
+TOTAL_BUCKET = 'total'
+HIGH_PRIORITY_THRESHOLD = Decimal('7')
+URGENCY_COUNTERS = {'low': 'low_urgency', 'medium': 'medium_urgency', 'high': 'high_urgency'}
+COUNTER_FIELDS = ['assessments', 'low_urgency', 'medium_urgency', 'high_urgency', 'high_priority', 'total_repair_cost']
+# Fields of TruckAssessment that feed the summary
+SOURCE_FIELDS = ['assessment_date', 'urgency_level', 'priority_score', 'estimated_repair_cost']
+
+
+def contribution(assessment_date, urgency_level, priority_score, estimated_repair_cost):
+    # (day, counters) that one assessment adds to the summary
+    counters = {
+        'assessments': 1,
+        'high_priority': 1 if priority_score is not None and Decimal(str(priority_score)) >= HIGH_PRIORITY_THRESHOLD else 0,
+        'total_repair_cost': Decimal(str(estimated_repair_cost or 0)),
+    }
+    if urgency_level in URGENCY_COUNTERS:
+        counters[URGENCY_COUNTERS[urgency_level]] = 1
+    return timezone.localdate(assessment_date), counters
+
+
+def instance_contribution(instance):
+    return contribution(*(getattr(instance, field) for field in SOURCE_FIELDS))
+
+
+def apply_contribution(day, counters, sign):
+    for bucket, bucket_day in ((TOTAL_BUCKET, None), (day.isoformat(), day)):
+        AssessmentSummary.objects.get_or_create(bucket=bucket, defaults={'day': bucket_day})
+        AssessmentSummary.objects.filter(bucket=bucket).update(
+            **{field: F(field) + sign * value for field, value in counters.items() if value},
+            updated_at=timezone.now(),
+        )
+
+
+@receiver(pre_save, sender=TruckAssessment)
+def remember_summary_contribution(sender, instance, raw=False, update_fields=None, **kwargs):
+    # The stored row's contribution, so post_save can apply the difference
+    instance._summary_before = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(SOURCE_FIELDS):
+        return
+    before = TruckAssessment.objects.filter(pk=instance.pk).values_list(*SOURCE_FIELDS).first()
+    if before is not None:
+        instance._summary_before = contribution(*before)
+
+
+@receiver(post_save, sender=TruckAssessment)
+def update_summary_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if not created and getattr(instance, '_summary_before', None) is None:
+        return
+    after = instance_contribution(instance)
+    before = None if created else instance._summary_before
+    if before == after:
+        return
+    # Same transaction as the save, so the counters roll back with it
+    with transaction.atomic():
+        if before is not None:
+            apply_contribution(*before, sign=-1)
+        apply_contribution(*after, sign=1)
+
+
+@receiver(post_delete, sender=TruckAssessment)
+def update_summary_on_delete(sender, instance, **kwargs):
+    if instance.assessment_date is None:
+        return
+    with transaction.atomic():
+        apply_contribution(*instance_contribution(instance), sign=-1)
+
+
+def summary_aggregates(queryset):
+    return {
+        'assessments': Count('id'),
+        'low_urgency': Count('id', filter=Q(urgency_level='low')),
+        'medium_urgency': Count('id', filter=Q(urgency_level='medium')),
+        'high_urgency': Count('id', filter=Q(urgency_level='high')),
+        'high_priority': Count('id', filter=Q(priority_score__gte=HIGH_PRIORITY_THRESHOLD)),
+        'total_repair_cost': Coalesce(Sum('estimated_repair_cost'), Value(Decimal('0')), output_field=DecimalField()),
+    }
+
+
+def compute_summaries():
+    # Every summary row recomputed from TruckAssessment: {bucket: (day, counters)}
+    queryset = TruckAssessment.objects.all()
+    summaries = {TOTAL_BUCKET: (None, queryset.aggregate(**summary_aggregates(queryset)))}
+    daily = (
+        queryset.annotate(day=TruncDate('assessment_date'))
+        .order_by()
+        .values('day')
+        .annotate(**summary_aggregates(queryset))
+    )
+    for row in daily:
+        day = row.pop('day')
+        summaries[day.isoformat()] = (day, row)
+    for _, counters in summaries.values():
+        counters['total_repair_cost'] = Decimal(str(counters['total_repair_cost'])).quantize(Decimal('0.01'))
+    return summaries
+
+
+def stored_summaries():
+    return {
+        summary.bucket: (summary.day, {field: getattr(summary, field) for field in COUNTER_FIELDS})
+        for summary in AssessmentSummary.objects.all()
+    }
+
+
+def summary_drift(expected, stored):
+    # Buckets whose stored counters differ from the recomputed ones: {bucket: (stored, expected)}
+    empty = dict.fromkeys(COUNTER_FIELDS, 0)
+    drift = {}
+    for bucket in set(expected) | set(stored):
+        expected_counters = expected.get(bucket, (None, empty))[1]
+        stored_counters = stored.get(bucket, (None, empty))[1]
+        if any(Decimal(str(expected_counters[f])) != Decimal(str(stored_counters[f])) for f in COUNTER_FIELDS):
+            drift[bucket] = (stored_counters, expected_counters)
+    return drift
+
+
+def rebuild_summaries(dry_run=False):
+    # Recompute every bucket from scratch; returns the drift that was corrected
+    with transaction.atomic():
+        expected = compute_summaries()
+        drift = summary_drift(expected, stored_summaries())
+        if drift and not dry_run:
+            AssessmentSummary.objects.all().delete()
+            AssessmentSummary.objects.bulk_create([
+                AssessmentSummary(bucket=bucket, day=day, **counters)
+                for bucket, (day, counters) in expected.items()
+            ])
+            # The dashboard totals changed without a TruckAssessment write
+            bump_table_version(TruckAssessment._meta.db_table)
+            logger.info(f"Rebuilt assessment summaries, {len(drift)} bucket(s) had drifted")
+    return drift
+
+
+def get_total_summary():
+    summary = AssessmentSummary.objects.filter(bucket=TOTAL_BUCKET).first()
+    return summary or AssessmentSummary(bucket=TOTAL_BUCKET)
@@ -1,3 +1,294 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
 
-# Create your tests here.
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .assessment_parser import match_records, parse_assessment
+from .benchmarks import load_cases
+from .identifiers import BlockAllocator
+from .models import NotificationOutbox, TruckAssessment
+from .notifications import claim_notifications, deliver, dispatch_pending, open_gateways
+from .views import calculate_multiple_damage_scores
+
+class AssessmentParserTests(SimpleTestCase):
+    def test_recorded_responses(self):
+        for name, case in load_cases().items():
+            with self.subTest(name=name):
+                records = match_records(parse_assessment(case['response']), case['damages'])
+                self.assertEqual(records, case['records'])
+
+    def test_duplicate_classes_use_their_own_block(self):
+        case = load_cases()['duplicate_classes']
+        severity, priority, cost, urgency = calculate_multiple_damage_scores(case['damages'], case['response'])
+        self.assertEqual(cost, 1500 + 12000 + 3500)
+        self.assertEqual(urgency, 'high')
+
+
+class AssessmentNumberAllocatorTests(TransactionTestCase):
+    def test_concurrent_allocators_never_collide(self):
+        # Each allocator stands in for a separate worker process with its own block.
+        allocators = [BlockAllocator('assessment', block_size=5) for _ in range(4)]
+        allocated = []
+        errors = []
+
+        def allocate(allocator):
+            try:
+                values = [allocator.allocate() for _ in range(50)]
+                allocated.extend(values)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=allocate, args=(allocators[index % len(allocators)],)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(allocated), 400)
+        self.assertEqual(len(set(allocated)), 400)
+
+    def test_forked_process_reserves_a_new_block(self):
+        allocator = BlockAllocator('assessment', block_size=10)
+        first = allocator.allocate()
+        allocator._pid = -1  # as seen from a child process after fork
+        self.assertGreaterEqual(allocator.allocate(), first + 10)
+
+
+class StubSmsGateway(ThreadingHTTPServer):
+    # Local stand-in for the Sendista API: records each request's parameters and
+    # answers with the queued (status, body, delay) responses, then with success.
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubSmsGatewayHandler)
+        self.received = []
+        self.responses = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/send/sms"
+
+
+class StubSmsGatewayHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.server.received.append(dict(parse_qsl(urlparse(self.path).query)))
+        status, body, delay = self.server.responses.pop(0) if self.server.responses else (200, {'status': 200, 'message': 'Queued'}, 0)
+        time.sleep(delay)
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class NotificationOutboxTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.gateway = StubSmsGateway()
+        threading.Thread(target=cls.gateway.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gateway.shutdown()
+        cls.gateway.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.gateway.received.clear()
+        self.gateway.responses.clear()
+        settings_override = override_settings(
+            SENDISTA_API_URL=self.gateway.url,
+            NOTIFICATION_MAX_ATTEMPTS=3,
+            NOTIFICATION_RECIPIENTS=[('sms', '+639170000001')],
+            NOTIFICATION_DIGEST_WINDOW_SECONDS=300,
+            NOTIFICATION_RATE_LIMIT_PER_MINUTE=2,
+            NOTIFICATION_RATE_LIMIT_BURST=5,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.gateways = open_gateways()
+        self.addCleanup(lambda: [gateway.close() for gateway in self.gateways.values()])
+
+    def create_assessment(self, urgency_level='high', truck_id='TRUCK-7', priority_score=7.5):
+        return TruckAssessment.objects.create(
+            truck_id=truck_id,
+            damage_description='Damage Assessment:',
+            image_url='',
+            damages=[{'area': 'shattered_glass', 'confidence': '0.91'}],
+            severity_score=8,
+            estimated_repair_cost=6400,
+            urgency_level=urgency_level,
+            priority_score=priority_score,
+        )
+
+    def make_due(self):
+        NotificationOutbox.objects.update(next_attempt_at=timezone.now())
+
+    def test_alert_is_queued_not_sent_during_save(self):
+        self.create_assessment('high')
+        self.create_assessment('low')
+        notification = NotificationOutbox.objects.get()
+        self.assertEqual(notification.status, 'pending')
+        self.assertEqual(notification.recipient, '+639170000001')
+        self.assertIn('TRUCK-7', notification.message)
+        self.assertEqual(self.gateway.received, [])
+
+    def test_alert_rolls_back_with_its_assessment(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.create_assessment()
+                raise RuntimeError
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_dispatcher_delivers_through_gateway(self):
+        self.create_assessment()
+        self.assertEqual(dispatch_pending(self.gateways), (1, 0))
+        notification = NotificationOutbox.objects.get()
+        self.assertEqual(notification.status, 'sent')
+        self.assertEqual(notification.attempts, 1)
+        self.assertEqual(len(self.gateway.received), 1)
+        self.assertEqual(self.gateway.received[0]['phone'], '+639170000001')
+        self.assertIn('shattered_glass (0.91)', self.gateway.received[0]['message'])
+        # Nothing left to send
+        self.assertEqual(dispatch_pending(self.gateways), (0, 0))
+
+    def test_server_errors_back_off_then_dead_letter(self):
+        self.create_assessment()
+        self.gateway.responses.extend([(500, {'message': 'down'}, 0)] * 3)
+
+        self.assertEqual(dispatch_pending(self.gateways), (0, 1))
+        notification = NotificationOutbox.objects.get()
+        self.assertEqual((notification.status, notification.attempts), ('pending', 1))
+        self.assertGreater(notification.next_attempt_at, timezone.now() + timedelta(seconds=10))
+        # Not due yet
+        self.assertEqual(dispatch_pending(self.gateways), (0, 0))
+
+        for _ in range(2):
+            self.make_due()
+            dispatch_pending(self.gateways)
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.attempts), ('dead', 3))
+        self.assertIn('HTTP 500', notification.last_error)
+        self.assertEqual(len(self.gateway.received), 3)
+
+    @override_settings(NOTIFICATION_READ_TIMEOUT=0.2)
+    def test_slow_gateway_times_out_and_is_retried(self):
+        self.create_assessment()
+        self.gateway.responses.append((200, {'status': 200}, 1))
+        started = time.monotonic()
+        self.assertEqual(dispatch_pending(self.gateways), (0, 1))
+        self.assertLess(time.monotonic() - started, 1)
+        notification = NotificationOutbox.objects.get()
+        self.assertEqual(notification.status, 'pending')
+        self.assertIn('Timeout', notification.last_error)
+
+        self.make_due()
+        self.assertEqual(dispatch_pending(self.gateways), (1, 0))
+
+    def test_rejected_credentials_are_dead_lettered_at_once(self):
+        self.create_assessment()
+        self.gateway.responses.append((401, {'message': 'Invalid secret'}, 0))
+        dispatch_pending(self.gateways)
+        notification = NotificationOutbox.objects.get()
+        self.assertEqual((notification.status, notification.attempts), ('dead', 1))
+        self.assertEqual(notification.provider_response, {'message': 'Invalid secret'})
+
+    def test_burst_is_coalesced_into_one_digest(self):
+        first = self.create_assessment(truck_id='TRUCK-1', priority_score=7.1)
+        for number, priority in [(2, 8.2), (3, 9.4), (4, 7.3), (5, 9.9)]:
+            self.create_assessment(truck_id=f'TRUCK-{number}', priority_score=priority)
+
+        alert = NotificationOutbox.objects.get(kind='alert')
+        digest = NotificationOutbox.objects.get(kind='digest')
+        self.assertEqual(alert.assessment, first)
+        self.assertEqual(digest.digest_assessments.count(), 4)
+        self.assertGreater(digest.next_attempt_at, timezone.now() + timedelta(seconds=250))
+
+        # The first alert goes out at once, the digest when the window closes
+        self.assertEqual(dispatch_pending(self.gateways), (1, 0))
+        self.make_due()
+        self.assertEqual(dispatch_pending(self.gateways), (1, 0))
+        message = self.gateway.received[1]['message']
+        self.assertIn('4 more high-urgency', message)
+        self.assertIn('₱25,600.00', message)
+        self.assertLess(message.index('TRUCK-5'), message.index('TRUCK-3'))
+        self.assertLess(message.index('TRUCK-3'), message.index('TRUCK-2'))
+        self.assertIn('(+1 more)', message)
+
+    def test_digest_retry_includes_alerts_added_after_a_failure(self):
+        self.create_assessment(truck_id='TRUCK-1')
+        self.create_assessment(truck_id='TRUCK-2')
+        self.assertEqual(dispatch_pending(self.gateways), (1, 0))
+
+        self.gateway.responses.append((500, {'message': 'down'}, 0))
+        self.make_due()
+        self.assertEqual(dispatch_pending(self.gateways), (0, 1))
+        self.create_assessment(truck_id='TRUCK-3')
+        self.assertEqual(NotificationOutbox.objects.filter(kind='digest').count(), 1)
+
+        self.make_due()
+        self.assertEqual(dispatch_pending(self.gateways), (1, 0))
+        message = self.gateway.received[-1]['message']
+        self.assertIn('2 more high-urgency', message)
+        self.assertIn('TRUCK-2', message)
+        self.assertIn('TRUCK-3', message)
+
+    def test_alert_arriving_while_a_digest_is_sending_survives_its_failure(self):
+        self.create_assessment(truck_id='TRUCK-1')
+        self.create_assessment(truck_id='TRUCK-2')
+        self.assertEqual(dispatch_pending(self.gateways), (1, 0))
+
+        # Claimed, then an alert comes in before the gateway answers
+        self.make_due()
+        digest = claim_notifications('dispatcher-1')[0]
+        self.create_assessment(truck_id='TRUCK-3')
+        self.assertEqual(NotificationOutbox.objects.filter(kind='digest', status='pending').count(), 1)
+        self.gateway.responses.append((500, {'message': 'down'}, 0))
+        self.assertFalse(deliver(digest, self.gateways['sms']))
+
+        digest.refresh_from_db()
+        self.assertEqual((digest.status, digest.attempts), ('pending', 1))
+        self.assertEqual(NotificationOutbox.objects.filter(kind='digest').count(), 1)
+        self.make_due()
+        self.assertEqual(dispatch_pending(self.gateways), (1, 0))
+        message = self.gateway.received[-1]['message']
+        self.assertIn('TRUCK-2', message)
+        self.assertIn('TRUCK-3', message)
+
+    @override_settings(NOTIFICATION_DIGEST_WINDOW_SECONDS=0, NOTIFICATION_RATE_LIMIT_BURST=2)
+    def test_rate_limit_defers_messages_per_recipient(self):
+        for number in range(3):
+            self.create_assessment(truck_id=f'TRUCK-{number}')
+        self.assertEqual(dispatch_pending(self.gateways), (2, 0))
+        deferred = NotificationOutbox.objects.get(status='pending')
+        self.assertEqual(deferred.attempts, 0)
+        self.assertGreater(deferred.next_attempt_at, timezone.now() + timedelta(seconds=20))
+        self.assertEqual(len(self.gateway.received), 2)
+
+    @override_settings(
+        NOTIFICATION_RECIPIENTS=[('sms', '+639170000001'), ('sms', '+639170000002'), ('email', 'fleet@example.com')],
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    )
+    def test_each_recipient_and_channel_gets_the_alert(self):
+        from django.core import mail
+
+        self.create_assessment()
+        self.assertEqual(dispatch_pending(self.gateways), (3, 0))
+        self.assertEqual(sorted(request['phone'] for request in self.gateway.received), ['+639170000001', '+639170000002'])
+        self.assertEqual(mail.outbox[0].to, ['fleet@example.com'])
+        self.assertEqual(mail.outbox[0].subject, 'URGENT: Truck TRUCK-7 Assessment')
@@ -1,10 +1,11 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from . import views
 from .views import AdminDashboardView, user_profile, get_user_data, assess_damage
 from django.views.decorators.csrf import csrf_exempt
+from .image_store import IMAGE_NAME_PATTERN
 
 api_patterns = [
     path('login/', views.UserLoginView.as_view(), name='api-login'),
@@ -12,6 +13,8 @@ api_patterns = [
     path('verify-otp/', views.verify_otp, name='api-verify-otp'),
     path('user/', views.UserView.as_view(), name='api-user'),
     path('chatbot/', views.chatbot, name='chatbot'),
+    path('chatbot/async/', views.chatbot_async, name='chatbot_async'),
+    path('chatbot/stream/', views.chatbot_stream, name='chatbot_stream'),
     path('user-profile/', views.user_profile, name='user_profile'),
 ]
 
@@ -19,10 +22,23 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('custom-admin-dashboard/', views.AdminDashboardView.as_view(), name='custom_admin_dashboard'),
     path('', views.home, name='home'),
+    path('health/live', views.health_live, name='health_live'),
+    path('health/ready', views.health_ready, name='health_ready'),
+    path('health/metrics', views.health_metrics, name='health_metrics'),
     path('register/', views.UserRegistrationView.as_view(), name='user-registration'),
     path('assess_damage/', csrf_exempt(assess_damage), name='assess_damage'),
+    path('assess_damage/async/', views.assess_damage_async, name='assess_damage_async'),
+    path('assess_damage/batch/', csrf_exempt(views.assess_damage_batch), name='assess_damage_batch'),
+    path('assessment_jobs/', csrf_exempt(views.submit_assessment_job), name='submit_assessment_job'),
+    path('assessment_jobs/<int:job_id>/', views.assessment_job_status, name='assessment_job_status'),
+    re_path(rf'^images/(?P<name>{IMAGE_NAME_PATTERN})$', views.stored_image, name='stored_image'),
     path('api/', include((api_patterns, 'api'))),
     path('api/admin-dashboard/', AdminDashboardView.as_view(), name='api_admin_dashboard'),
+    path('api/admin-dashboard/notifications/', views.NotificationStatusView.as_view(), name='api_admin_notifications'),
+    path('api/admin-dashboard/search/', views.AssessmentSearchView.as_view(), name='api_admin_assessment_search'),
+    path('api/admin-dashboard/analytics/', views.AssessmentAnalyticsView.as_view(), name='api_admin_assessment_analytics'),
+    path('api/admin-dashboard/export/', views.AssessmentExportView.as_view(), name='api_admin_assessment_export'),
+    path('api/admin-dashboard/<int:assessment_id>/', views.AdminAssessmentDetailView.as_view(), name='api_admin_assessment_detail'),
     path('api/user-profile/', user_profile, name='user_profile'),
     path('api/user/', get_user_data, name='get_user_data'),
 ]
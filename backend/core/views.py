@@ -1,12 +1,12 @@
+import asyncio
 import logging
 import random
 import base64
 import json
 import os
 import re
-import cv2
+import time
 import numpy as np
-import openai
 
 from django.contrib.auth import get_user_model
 from django.shortcuts import render
@@ -23,32 +23,50 @@ from rest_framework.views import APIView
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from django.utils import timezone
-from decimal import Decimal, InvalidOperation
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
 from statistics import mean
+from collections import Counter
 
 from .serializers import UserRegistrationSerializer, UserSerializer, OTPVerificationSerializer
 from .gmail_auth import get_gmail_service
-from .models import User, TruckAssessment
+from .models import User, TruckAssessment, AssessmentJob, NotificationOutbox
+from . import metrics, providers
+from .analytics import analytics_report, parse_analytics_query
+from .assessment_cache import get_cached_assessment, store_assessment
+from .assessment_parser import format_records, match_records, parse_assessment
+from .batching import MicroBatcher
+from .damage_detections import save_detections
+from .dashboard import InvalidDashboardQuery, dashboard_page, get_page_size
+from .detection_cache import detect_with_cache
+from .export import EXPORT_FORMATS, iter_export
+from .response_cache import cached_json_response, get_table_version
+from .search import search_page
+from .identifiers import allocate_assessment_number
+from .image_store import (
+    content_type as stored_image_content_type,
+    image_path as stored_image_path,
+    image_url as stored_image_url,
+    image_urls,
+    is_image_name,
+    store_annotated,
+)
+from .notifications import serialize_notification
+from .ingestion import UploadRejected, ingest_upload, to_original_coordinates
+from .jobs import enqueue_assessment_job, enqueue_enrichment_job
+from .warmup import PROCESS_STARTED_AT, get_readiness, start_warmup
  
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 from django.views.generic import ListView
 from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Q
 from django.shortcuts import get_object_or_404
-from ultralytics import YOLO
-
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.documents import Document
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_community.document_loaders.csv_loader import CSVLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores.faiss import FAISS
-from langchain.chains import create_retrieval_chain
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_core.prompts import MessagesPlaceholder
-from langchain.chains.history_aware_retriever import create_history_aware_retriever
+from django.urls import reverse
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -78,11 +96,18 @@ class AdminRequiredMixin(UserPassesTestMixin):
     def test_func(self):
         return self.request.user.is_authenticated and self.request.user.is_admin_user()
 
+def assessment_list_etag(request, *args, **kwargs):
+    return f"assessment-list-{get_table_version(TruckAssessment._meta.db_table)[0]}"
+
 class AssessmentListView(AdminRequiredMixin, ListView):
     model = TruckAssessment
     template_name = 'assessment_list.html'
     context_object_name = 'assessments'
 
+    @method_decorator(condition(etag_func=assessment_list_etag))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 class AdminDashboardView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -90,28 +115,135 @@ class AdminDashboardView(APIView):
         if not request.user.is_admin_user():
             return Response({"error": "You do not have permission to access this page."}, status=403)
 
-        assessments = TruckAssessment.objects.order_by('-priority_score', '-assessment_date')
-        total_assessments = assessments.count()
-        high_priority_assessments = assessments.filter(priority_score__gte=7).count()
-
-        data = {
-            'total_assessments': total_assessments,
-            'high_priority_assessments': high_priority_assessments,
-            'assessments': [
-                {
-                    'id': assessment.id,
-                    'truck_id': assessment.truck_id,
-                    'assessment_date': assessment.assessment_date,
-                    'severity_score': assessment.severity_score,  # Added this line
-                    'priority_score': assessment.priority_score,
-                    'urgency_level': assessment.urgency_level,
-                    'estimated_repair_cost': str(assessment.estimated_repair_cost)
-                }
-                for assessment in assessments  # Removed the [:10] limit for now
-            ]
-        }
-
-        return Response(data)
+        # Light list columns only, one page at a time; heavy fields via AdminAssessmentDetailView
+        def build():
+            data = dashboard_page(request.query_params)
+            for row in data['assessments']:
+                row['thumbnail_url'] = stored_image_url(row.pop('thumbnail'), request)
+                row['estimated_repair_cost'] = str(row['estimated_repair_cost'])
+                row['detail_url'] = request.build_absolute_uri(reverse('api_admin_assessment_detail', args=[row['id']]))
+            return data
+
+        try:
+            return cached_json_response(request, 'dashboard', TruckAssessment._meta.db_table, build)
+        except InvalidDashboardQuery as e:
+            return Response({"error": str(e)}, status=400)
+
+class AdminAssessmentDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, assessment_id):
+        if not request.user.is_admin_user():
+            return Response({"error": "You do not have permission to access this page."}, status=403)
+
+        def build():
+            assessment = get_object_or_404(TruckAssessment, id=assessment_id)
+            data = build_assessment_response(assessment, assessment.damages, request)
+            data.update({
+                'id': assessment.id,
+                'truck_id': assessment.truck_id,
+                'assessment_date': assessment.assessment_date,
+                'llm_assessment': assessment.llm_assessment,
+            })
+            return data
+
+        return cached_json_response(request, 'assessment', TruckAssessment._meta.db_table, build)
+
+class NotificationStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # ?status=pending|sending|sent|dead&assessment_id=&page_size= ; newest first. assessment_id
+        # also matches the digests that included the assessment.
+        if not request.user.is_admin_user():
+            return Response({"error": "You do not have permission to access this page."}, status=403)
+
+        notifications = NotificationOutbox.objects.all()
+        notification_status = request.query_params.get('status')
+        if notification_status:
+            if notification_status not in dict(NotificationOutbox.STATUS_CHOICES):
+                return Response({"error": f"Invalid status {notification_status!r}"}, status=400)
+            notifications = notifications.filter(status=notification_status)
+        assessment_id = request.query_params.get('assessment_id')
+        if assessment_id:
+            if not assessment_id.isdigit():
+                return Response({"error": "Invalid assessment_id"}, status=400)
+            notifications = notifications.filter(Q(assessment_id=int(assessment_id)) | Q(digest_assessments=int(assessment_id))).distinct()
+        try:
+            page_size = get_page_size(request.query_params)
+        except InvalidDashboardQuery as e:
+            return Response({"error": str(e)}, status=400)
+
+        counts = dict(NotificationOutbox.objects.values_list('status').annotate(count=Count('id')).order_by())
+        return Response({
+            'counts': {value: counts.get(value, 0) for value, _ in NotificationOutbox.STATUS_CHOICES},
+            'notifications': [
+                serialize_notification(n)
+                for n in notifications.prefetch_related('digest_assessments').order_by('-created_at', '-id')[:page_size]
+            ],
+        })
+
+class AssessmentSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # ?q=...&page=&page_size= plus the dashboard filters; highlight is escaped HTML with <mark> tags
+        if not request.user.is_admin_user():
+            return Response({"error": "You do not have permission to access this page."}, status=403)
+
+        def build():
+            data = search_page(request.query_params)
+            for row in data['results']:
+                row['thumbnail_url'] = stored_image_url(row.pop('thumbnail'), request)
+                row['estimated_repair_cost'] = str(row['estimated_repair_cost'])
+                row['detail_url'] = request.build_absolute_uri(reverse('api_admin_assessment_detail', args=[row['id']]))
+            return data
+
+        try:
+            return cached_json_response(request, 'search', TruckAssessment._meta.db_table, build)
+        except InvalidDashboardQuery as e:
+            return Response({"error": str(e)}, status=400)
+
+class AssessmentAnalyticsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # ?interval=day|week|month&group_by=urgency|damage_class&date_from=&date_to=
+        if not request.user.is_admin_user():
+            return Response({"error": "You do not have permission to access this page."}, status=403)
+
+        try:
+            interval, group_by, periods = parse_analytics_query(request.query_params)
+        except InvalidDashboardQuery as e:
+            return Response({"error": str(e)}, status=400)
+        # Without date_to the last bucket is the current one, so the URL alone doesn't
+        # identify the response: key it (and its ETag) by the periods it covers as well.
+        namespace = f"analytics-{periods[0].isoformat()}-{periods[-1].isoformat()}"
+        return cached_json_response(
+            request, namespace, TruckAssessment._meta.db_table, lambda: analytics_report(interval, group_by, periods)
+        )
+
+class AssessmentExportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # ?output=csv|ndjson (DRF reserves ?format=), &detections=1 for one row per detection
+        if not request.user.is_admin_user():
+            return Response({"error": "You do not have permission to access this page."}, status=403)
+
+        export_format = request.query_params.get('output', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": f"Invalid output {export_format!r}"}, status=400)
+        detections = request.query_params.get('detections', '').lower() in ['1', 'true', 'yes']
+        try:
+            content = iter_export(request.query_params, export_format, detections)
+        except InvalidDashboardQuery as e:
+            return Response({"error": str(e)}, status=400)
+
+        response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+        filename = f"assessments-{timezone.now():%Y%m%d}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
 class UserRegistrationView(generics.CreateAPIView):
     serializer_class = UserRegistrationSerializer
@@ -179,6 +311,22 @@ class UserLoginView(ObtainAuthToken):
 def home(request):
     return render(request, 'home.html')
 
+def health_live(request):
+    return JsonResponse({
+        'status': 'alive',
+        'pid': os.getpid(),
+        'uptime_seconds': round(time.time() - PROCESS_STARTED_AT, 1),
+    })
+
+def health_metrics(request):
+    return JsonResponse({'pid': os.getpid(), **metrics.snapshot()})
+
+def health_ready(request):
+    # Under runserver nothing kicks off warm-up, so the first probe does.
+    start_warmup(background=True)
+    ready, checks = get_readiness()
+    return JsonResponse({'status': 'ready' if ready else 'warming_up', 'checks': checks}, status=200 if ready else 503)
+
 class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -197,60 +345,7 @@ class UserProfileView(APIView):
     
 
     
-def get_documents_from_services():
-    csv_path = os.path.join(settings.BASE_DIR, 'data', 'TruckMate.csv')
-    loader = CSVLoader(file_path=csv_path)
-    data = loader.load()
-
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=200,
-        chunk_overlap=20
-    )
-    splitData = splitter.split_documents(data) 
-
-    return splitData
 
-def create_db(data):
-    embedding = OpenAIEmbeddings()
-    vectorStore = FAISS.from_documents(data, embedding=embedding)
-    return vectorStore
-
-def create_chain(vectorStore):
-    model = ChatOpenAI(
-        model="gpt-3.5-turbo-1106",
-        temperature=0.2,
-        max_tokens=2000,
-    )
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are an AI Truck mechanic. Every request or question is truck-related, depending on what they talk about. Answer their question with a truck-related solution, if asked. Only suggest R+M services, if asked. Also, Answer the user's questions based on the context: {context}"),
-        MessagesPlaceholder(variable_name="chat_history"),
-        ("human","{input}")
-    ])
-    chain = create_stuff_documents_chain(
-        llm=model,
-        prompt=prompt
-    )
-    retriever = vectorStore.as_retriever()
-    retriever_prompt = ChatPromptTemplate.from_messages([
-        MessagesPlaceholder(variable_name="chat_history"),
-        ("human", "{input}"),
-        ("human", "Given the above conversation, generate a search query to look up in order to get information relevant to the conversation")
-    ])
-    history_aware_retriever = create_history_aware_retriever(
-        llm=model,
-        retriever=retriever,
-        prompt=retriever_prompt
-    )
-    retrieval_chain = create_retrieval_chain(
-        history_aware_retriever,
-        chain
-    )
-    return retrieval_chain
-
-# Initialize the chain
-data = get_documents_from_services()
-vectorStore = create_db(data)
-chain = create_chain(vectorStore)
 
 @csrf_exempt
 @csrf_exempt
@@ -260,52 +355,96 @@ def chatbot(request):
         user_input = data['message']
         chat_history = data.get('chat_history', [])
 
-        # Convert chat history to HumanMessage and AIMessage objects
-        langchain_history = []
-        for message in chat_history:
-            if message['role'] == 'human':
-                langchain_history.append(HumanMessage(content=message['content']))
-            elif message['role'] == 'assistant':
-                langchain_history.append(AIMessage(content=message['content']))
-
-        response = chain.invoke({
-            "input": user_input,
-            "chat_history": langchain_history,
-        })
+        from .chatbot import to_langchain_history
+        langchain_history = to_langchain_history(chat_history)
+
+        answer = providers.get_chatbot().ask(user_input, langchain_history)
         
         # Convert the response back to a serializable format
         serializable_history = chat_history + [
             {'role': 'human', 'content': user_input},
-            {'role': 'assistant', 'content': response["answer"]}
+            {'role': 'assistant', 'content': answer}
         ]
         
         return JsonResponse({
-            'response': response["answer"],
+            'response': answer,
             'chat_history': serializable_history
         })
     return JsonResponse({'error': 'Invalid request method'}, status=400)
 
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_chatbot_answer(user_input, chat_history, started_at):
+    from .chatbot import to_langchain_history
+
+    answer = []
+    first_token_at = None
+    try:
+        bot = providers.get_chatbot()
+        for token in bot.stream(user_input, to_langchain_history(chat_history)):
+            if not token:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                metrics.observe('chatbot_time_to_first_token_ms', (first_token_at - started_at) * 1000)
+            answer.append(token)
+            yield format_sse('token', {'token': token})
+    except Exception as e:
+        logger.exception(f"Error while streaming chatbot answer: {str(e)}")
+        metrics.increment('chatbot_stream_errors')
+        yield format_sse('error', {'error': str(e)})
+        return
+
+    full_answer = ''.join(answer)
+    metrics.observe('chatbot_stream_total_ms', (time.perf_counter() - started_at) * 1000)
+    yield format_sse('done', {
+        'response': full_answer,
+        'chat_history': chat_history + [
+            {'role': 'human', 'content': user_input},
+            {'role': 'assistant', 'content': full_answer}
+        ],
+        'time_to_first_token_ms': round((first_token_at - started_at) * 1000, 1) if first_token_at else None,
+    })
+
+@csrf_exempt
+def chatbot_stream(request):
+    # Server-Sent Events: one "token" event per generated chunk, then a "done" event
+    # carrying the full answer and the updated chat history.
+    if request.method == 'POST':
+        started_at = time.perf_counter()
+        data = json.loads(request.body)
+        response = StreamingHttpResponse(
+            stream_chatbot_answer(data['message'], data.get('chat_history', []), started_at),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    return JsonResponse({'error': 'Invalid request method'}, status=400)
+
+SEVERITY_MAPPING = {'low': 3, 'minor': 3, 'moderate': 6, 'high': 9, 'severe': 9}
+
 def calculate_multiple_damage_scores(damages, chatbot_assessment):
-    severity_mapping = {'low': 3, 'minor': 3, 'moderate': 6, 'high': 9, 'severe': 9}
+    # The response is tokenised once into per-damage records (see assessment_parser)
+    records = match_records(parse_assessment(chatbot_assessment), damages)
     total_confidence = sum(float(d['confidence']) for d in damages)
     total_severity = 0
     total_cost = 0
+    severities = []
 
-    for damage in damages:
-        severity_match = re.search(rf"{re.escape(damage['area'])}.*?Severity:\s*(\w+)", chatbot_assessment, re.IGNORECASE | re.DOTALL)
-        cost_match = re.search(rf"{re.escape(damage['area'])}.*?Estimated Cost:\s*₱([\d,]+)", chatbot_assessment, re.IGNORECASE | re.DOTALL)
-        
-        if severity_match:
-            severity_word = severity_match.group(1).lower()
-            severity_score = severity_mapping.get(severity_word, 5)
+    for damage, record in zip(damages, records):
+        if record and record['severity']:
+            severity_score = SEVERITY_MAPPING.get(record['severity'], 5)
         else:
             severity_score = 5  # Default to moderate if not found
-        
+        severities.append(severity_score)
+
         confidence = float(damage['confidence'])
         total_severity += severity_score * confidence
 
-        if cost_match:
-            cost = int(cost_match.group(1).replace(',', ''))
+        if record and record['estimated_cost'] is not None:
+            cost = record['estimated_cost']
         else:
             cost = PHILIPPINE_REPAIR_COSTS.get(damage['area'].lower(), 1000)
         total_cost += cost
@@ -314,8 +453,7 @@ def calculate_multiple_damage_scores(damages, chatbot_assessment):
     normalized_severity = min(10, weighted_severity)
 
     # Determine urgency based on highest individual severity
-    max_severity = max((severity_mapping.get(re.search(rf"{re.escape(d['area'])}.*?Severity:\s*(\w+)", chatbot_assessment, re.IGNORECASE | re.DOTALL).group(1).lower(), 5) if re.search(rf"{re.escape(d['area'])}.*?Severity:\s*(\w+)", chatbot_assessment, re.IGNORECASE | re.DOTALL) else 5) for d in damages)
-    
+    max_severity = max(severities)
     if max_severity <= 3:
         urgency = 'low'
     elif max_severity <= 6:
@@ -368,11 +506,33 @@ def safe_decimal(value):
     except (InvalidOperation, TypeError):
         return None
 
+# Typical severity (0-10) of each YOLOv8 damage class, used by the rule-based engine
+DAMAGE_SEVERITY = {
+    'dent': 5,
+    'crack': 6,
+    'shattered_glass': 9,
+    'broken_lamp': 6,
+    'flat_tire': 8,
+    'scratch': 3,
+}
+
+REPAIR_ACTIONS = {
+    'dent': 'Paintless dent repair, or panel beating and repainting for deep dents',
+    'crack': 'Weld or fill the crack and refinish; replace the panel if structural',
+    'shattered_glass': 'Replace the glass/windshield and check the seal',
+    'broken_lamp': 'Replace the lamp assembly and check the wiring',
+    'flat_tire': 'Repair the puncture or replace the tire, then check pressure and alignment',
+    'scratch': 'Polish out light scratches; touch up or repaint deeper ones',
+}
+
 def calculate_severity_score(damages):
+    # Confidence-weighted average of the per-class severities
     if not damages:
         return 0.0
     total_confidence = sum(float(d['confidence']) for d in damages)
-    weighted_severity = sum(10 * float(d['confidence']) for d in damages)
+    if total_confidence <= 0:
+        return 0.0
+    weighted_severity = sum(DAMAGE_SEVERITY.get(repair_cost_key(d['area']), 5) * float(d['confidence']) for d in damages)
     return min(10.0, weighted_severity / total_confidence)
 
 # Updated PHILIPPINE_REPAIR_COSTS to match YOLOv8 model classes
@@ -385,21 +545,28 @@ PHILIPPINE_REPAIR_COSTS = {
     'scratch': 1000,          # Cost can vary based on severity and size
 }
 
+def repair_cost_key(damage_type):
+    # Map detected damage to repair cost category
+    damage_type = damage_type.lower()
+    if 'glass' in damage_type or 'windshield' in damage_type:
+        return 'shattered_glass'
+    elif 'lamp' in damage_type or 'light' in damage_type:
+        return 'broken_lamp'
+    elif 'tire' in damage_type:
+        return 'flat_tire'
+    return damage_type  # For 'dent', 'crack', and 'scratch'
+
+def damage_instance_key(damage):
+    return json.dumps(damage, sort_keys=True)
+
 def estimate_repair_cost(damages):
     total_cost = Decimal('0')
+    # Count identical detections once up front instead of damages.count() per damage
+    instance_counts = Counter(damage_instance_key(damage) for damage in damages)
     for damage in damages:
         damage_type = damage['area'].lower()
         confidence = float(damage['confidence'])
-        
-        # Map detected damage to repair cost category
-        if 'glass' in damage_type or 'windshield' in damage_type:
-            cost_key = 'shattered_glass'
-        elif 'lamp' in damage_type or 'light' in damage_type:
-            cost_key = 'broken_lamp'
-        elif 'tire' in damage_type:
-            cost_key = 'flat_tire'
-        else:
-            cost_key = damage_type  # For 'dent', 'crack', and 'scratch'
+        cost_key = repair_cost_key(damage_type)
         
         base_cost = PHILIPPINE_REPAIR_COSTS.get(cost_key, 2000)  # Default to 2000 PHP if type not found
         
@@ -409,13 +576,14 @@ def estimate_repair_cost(damages):
         # For dents and scratches, consider multiple instances
         if damage_type in ['dent', 'scratch']:
             # Assume cost increases but with diminishing returns for multiple instances
-            instance_factor = min(Decimal('2.0'), Decimal('1.0') + (Decimal('0.2') * (damages.count(damage) - 1)))
-            adjusted_cost *= instance_factor
+            instance_factor = min(Decimal('2.0'), Decimal('1.0') + (Decimal('0.2') * (instance_counts[damage_instance_key(damage)] - 1)))
+            adjusted_cost *= float(instance_factor)
         
-        total_cost += Decimal(str(adjusted_cost))
+        # round() drops float noise (0.55 * 3500 == 1925.0000000000002) so exact halves round up
+        total_cost += Decimal(str(round(adjusted_cost, 6)))
     
     # Round to nearest 100 PHP
-    return total_cost.quantize(Decimal('100'))
+    return (total_cost / 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP) * 100
 
 def calculate_urgency_level(severity_score, damages):
     damage_count = len(damages)
@@ -426,22 +594,56 @@ def calculate_urgency_level(severity_score, damages):
     else:
         return 'low'
 
+# Weights of the rule-based priority score; rescore_assessments applies changes to stored rows
+PRIORITY_WEIGHTS = {'severity': 0.4, 'cost': 0.3, 'urgency': 0.2, 'damage_count': 0.1}
+PRIORITY_COST_CEILING = 25000  # Assuming 25,000 PHP as a high-end repair for trucks
+PRIORITY_DAMAGE_CEILING = 6  # Number of damage types
+URGENCY_VALUES = {'low': 1, 'medium': 2, 'high': 3}
+
 def calculate_priority_score(severity_score, estimated_repair_cost, urgency_level, damages):
-    urgency_value = {'low': 1, 'medium': 2, 'high': 3}.get(urgency_level, 2)
-    damage_factor = min(1, len(damages) / 6)  # Increases with more damages, max out at 6 damages (number of damage types)
+    urgency_value = URGENCY_VALUES.get(urgency_level, 2)
+    damage_factor = min(1, len(damages) / PRIORITY_DAMAGE_CEILING)  # Increases with more damages
     
     # Adjust cost factor based on typical repair costs in the Philippines
-    cost_factor = min(float(estimated_repair_cost or 0) / 25000, 1)  # Assuming 25,000 PHP as a high-end repair for trucks
+    cost_factor = min(float(estimated_repair_cost or 0) / PRIORITY_COST_CEILING, 1)
     
-    return min(10.0, (severity_score * 0.4) + (cost_factor * 0.3) + (urgency_value * 0.2) + (damage_factor * 0.1))
-
-
+    return min(10.0, (severity_score * PRIORITY_WEIGHTS['severity']) + (cost_factor * PRIORITY_WEIGHTS['cost'])
+               + (urgency_value * PRIORITY_WEIGHTS['urgency']) + (damage_factor * PRIORITY_WEIGHTS['damage_count']))
+
+def severity_label(severity):
+    if severity <= 3:
+        return 'Low'
+    elif severity <= 6:
+        return 'Moderate'
+    return 'High'
+
+def generate_damage_description(damages):
+    # Same layout as the LLM response requested by CHATBOT_PROMPT
+    if not damages:
+        return "Damage Assessment:\nNo damage was detected in the uploaded image."
+    lines = ["Damage Assessment:"]
+    for damage in damages:
+        cost_key = repair_cost_key(damage['area'])
+        cost = PHILIPPINE_REPAIR_COSTS.get(cost_key, 2000) * float(damage['confidence'])
+        lines.extend([
+            "",
+            f"* Area: {damage['area']}",
+            f"* Severity: {severity_label(DAMAGE_SEVERITY.get(cost_key, 5))}",
+            f"* Recommended Action: {REPAIR_ACTIONS.get(cost_key, 'Inspect and repair as needed')}",
+            f"* Estimated Cost: ₱{round(cost, -2):,.0f}",
+        ])
+    return "\n".join(lines)
+
+def score_damages_with_rules(damages):
+    # Deterministic alternative to parse_chatbot_response: no LLM call involved.
+    severity_score = calculate_severity_score(damages)
+    estimated_repair_cost = estimate_repair_cost(damages)
+    urgency_level = calculate_urgency_level(severity_score, damages)
+    priority_score = calculate_priority_score(severity_score, estimated_repair_cost, urgency_level, damages)
+    priority_explanation = generate_priority_explanation(severity_score, estimated_repair_cost, urgency_level, damages, priority_score)
+    return severity_score, estimated_repair_cost, urgency_level, priority_score, priority_explanation, generate_damage_description(damages)
 
-# Set up the OpenAI client
-logger = logging.getLogger(__name__)
-client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
 
-model = YOLO('last.pt')
 
 CHATBOT_PROMPT = """You are an expert in truck damage assessment. Provide a concise assessment of the damages, including replacement/repair recommendations and costs in Philippine Pesos (₱). For each detected damage, provide the following information:
 
@@ -454,81 +656,463 @@ Damage Assessment:
 
 Do not provide an overall assessment or explanation. Focus on assessing each individual damage accurately."""
 
+# JSON-mode variant (ASSESSMENT_PROMPT_FORMAT = 'json'): the model returns structured
+# records, which are rendered back into the CHATBOT_PROMPT layout before storing.
+CHATBOT_PROMPT_JSON = """You are an expert in truck damage assessment. Provide a concise assessment of the damages, including replacement/repair recommendations and costs in Philippine Pesos (₱).
+
+Respond with a JSON object of the form {"damages": [{"area": string, "severity": "Low" | "Moderate" | "High", "recommended_action": string, "estimated_cost": integer}]}, with one entry per detected damage in the order given. estimated_cost is in PHP, digits only.
+
+Do not provide an overall assessment or explanation. Focus on assessing each individual damage accurately."""
+
+# Bump ASSESSMENT_PROMPT_VERSION whenever CHATBOT_PROMPT changes so cached
+# assessments written for the old prompt are no longer reused.
+ASSESSMENT_PROMPT_VERSION = '1'
+
+def assessment_prompt_version():
+    return f"{ASSESSMENT_PROMPT_VERSION}-json" if settings.ASSESSMENT_PROMPT_FORMAT == 'json' else ASSESSMENT_PROMPT_VERSION
+
+ASSESSMENT_LLM_MODEL = "gpt-3.5-turbo"
+
+# 'llm' asks the LLM for the assessment text and scores it; 'rules' scores the
+# detections locally (calculate_severity_score, estimate_repair_cost, ...) in milliseconds.
+ASSESSMENT_ENGINES = ('llm', 'rules')
+
+def get_assessment_options(request):
+    # Per-request switches, sent as form fields or query parameters.
+    def flag(name, default):
+        value = request.POST.get(name, request.GET.get(name))
+        return default if value is None else str(value).lower() in ('1', 'true', 'yes')
+
+    engine = request.POST.get('engine', request.GET.get('engine')) or settings.ASSESSMENT_ENGINE
+    if engine not in ASSESSMENT_ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; use one of: {', '.join(ASSESSMENT_ENGINES)}")
+    # A real fleet id for the truck; without one it is numbered TRUCK-<n>
+    truck_id = (request.POST.get('truck_id', request.GET.get('truck_id')) or '').strip()
+    if len(truck_id) > TruckAssessment._meta.get_field('truck_id').max_length:
+        raise ValueError('truck_id is too long')
+    return {
+        'engine': engine,
+        'use_llm_cache': not flag('no_cache', False),
+        'enrich': flag('enrich', settings.ASSESSMENT_ENRICH_RULES_WITH_LLM),
+        'truck_id': truck_id or None,
+    }
+
+def detect_batch(images):
+    # One forward pass for the whole list; images of different shapes are
+    # letterboxed to the same input size by ultralytics.
+    model = providers.detector.get()
+    detections = []
+    for start in range(0, len(images), settings.DETECTOR_MAX_BATCH_SIZE):
+        chunk = images[start:start + settings.DETECTOR_MAX_BATCH_SIZE]
+        results = model(chunk, imgsz=settings.DETECTOR_IMAGE_SIZE, verbose=False)
+        detections.extend(extract_detections(result, model.names) for result in results)
+    return detections
+
+detector_batcher = MicroBatcher(
+    'detector',
+    detect_batch,
+    max_batch_size=settings.DETECTOR_MAX_BATCH_SIZE,
+    max_wait_ms=settings.DETECTOR_MAX_BATCH_WAIT_MS,
+)
+
+def detect_micro_batched(images):
+    return [detector_batcher.submit(img) for img in images]
+
+def extract_detections(result, names):
+    detections = []
+    for box in result.boxes:
+        x1, y1, x2, y2 = box.xyxy[0].tolist()
+        conf = box.conf.item()
+        cls = int(box.cls.item())
+        detections.append({
+            'area': names[cls],
+            'confidence': f"{conf:.2f}",
+            'box': [x1, y1, x2, y2],
+        })
+    return detections
+
+def annotate_image(img, detections):
+    import cv2
+    for detection in detections:
+        x1, y1, x2, y2 = detection['box']
+        cv2.rectangle(img, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+        cv2.putText(img, f"{detection['area']}: {detection['confidence']}", (int(x1), int(y1) - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+    return img
+
+def to_damages(detections, image_index=None):
+    damages = []
+    for detection in detections:
+        damage = {'area': detection['area'], 'confidence': detection['confidence']}
+        if image_index is not None:
+            damage['image'] = image_index
+        damages.append(damage)
+    return damages
+
+def build_assessment_messages(damages):
+    return [
+        {"role": "system", "content": CHATBOT_PROMPT_JSON if settings.ASSESSMENT_PROMPT_FORMAT == 'json' else CHATBOT_PROMPT},
+        {"role": "user", "content": f"Assess the following truck damages: {damages}"}
+    ]
+
+def assessment_completion_options():
+    if settings.ASSESSMENT_PROMPT_FORMAT == 'json':
+        return {'response_format': {'type': 'json_object'}}
+    return {}
+
+def normalize_llm_assessment(content):
+    if settings.ASSESSMENT_PROMPT_FORMAT != 'json':
+        return content
+    records = parse_assessment(content)
+    return format_records(records) if records else content
+
+def request_llm_assessment(damages, use_cache=True):
+    if use_cache:
+        cached = get_cached_assessment(damages, assessment_prompt_version(), ASSESSMENT_LLM_MODEL)
+        if cached is not None:
+            return cached
+
+    client = providers.assessment_client.get()
+    response = client.chat.completions.create(
+        model=ASSESSMENT_LLM_MODEL,
+        messages=build_assessment_messages(damages),
+        **assessment_completion_options()
+    )
+    chatbot_assessment = normalize_llm_assessment(response.choices[0].message.content)
+    logger.info(f"Full Chatbot response: {chatbot_assessment}")
+
+    store_assessment(damages, assessment_prompt_version(), ASSESSMENT_LLM_MODEL, chatbot_assessment)
+    return chatbot_assessment
+
+def create_assessment(damages, chatbot_assessment, image_url, engine='llm', truck_id=None, images=None, on_created=None):
+    if truck_id is None:
+        truck_id = f"TRUCK-{allocate_assessment_number()}"
+    if engine == 'rules':
+        parsed_data = score_damages_with_rules(damages)
+    else:
+        parsed_data = parse_chatbot_response(chatbot_assessment, damages)
+    severity_score, estimated_repair_cost, urgency_level, priority_score, priority_explanation, overall_assessment = parsed_data
+
+    # Create a single TruckAssessment object for all damages, and its DamageDetection rows in one INSERT
+    with transaction.atomic():
+        assessment = TruckAssessment.objects.create(
+            truck_id=truck_id,
+            damage_description=overall_assessment,
+            assessment_engine=engine,
+            image_url=image_url,
+            images=images or [],
+            damages=damages,
+            severity_score=Decimal(str(severity_score)),
+            estimated_repair_cost=Decimal(str(estimated_repair_cost)),
+            urgency_level=urgency_level,
+            priority_score=Decimal(str(priority_score)),
+            priority_explanation=priority_explanation
+        )
+        save_detections([assessment])
+        # e.g. link the background job, so a retry after a later failure reuses this row
+        if on_created is not None:
+            on_created(assessment)
+    return assessment
+
+def build_assessment_response(assessment, damages, request=None):
+    images = [
+        dict(image_urls(stored, request), width=stored.get('width'), height=stored.get('height'), detections=stored.get('detections', []))
+        for stored in assessment.images
+    ]
+    return {
+        'image_url': images[0]['image_url'] if images else None,
+        'thumbnail_url': images[0]['thumbnail_url'] if images else None,
+        'images': images,
+        'damages': damages,
+        'assessment': assessment.damage_description,
+        'severity_score': f"{assessment.severity_score:.2f}",
+        'estimated_repair_cost': f"₱ {assessment.estimated_repair_cost:.2f}",
+        'urgency_level': assessment.urgency_level.capitalize(),
+        'priority_score': f"{assessment.priority_score:.2f}",
+        'priority_explanation': assessment.priority_explanation,
+        'engine': assessment.assessment_engine,
+    }
+
 @csrf_exempt
 def assess_damage(request):
     if request.method == 'POST' and request.FILES.get('image'):
         try:
-            uploaded_file = request.FILES['image']
-            img_array = np.frombuffer(uploaded_file.read(), np.uint8)
-            img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-
-            results = model(img)
-            damages = []
-
-            for box in results[0].boxes:
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                conf = box.conf.item()
-                cls = int(box.cls.item())
-                class_name = model.names[cls]
-                
-                damages.append({
-                    'area': class_name,
-                    'confidence': f"{conf:.2f}"
-                })
-
-                cv2.rectangle(img, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-                cv2.putText(img, f"{class_name}: {conf:.2f}", (int(x1), int(y1) - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-
-            img_name = f"assessment_{TruckAssessment.objects.count() + 1}.jpg"
-            img_path = os.path.join(settings.MEDIA_ROOT, 'assessments', img_name)
-            os.makedirs(os.path.dirname(img_path), exist_ok=True)
-            cv2.imwrite(img_path, img)
-
-            _, img_encoded = cv2.imencode('.jpg', img)
-            img_base64 = base64.b64encode(img_encoded).decode('utf-8')
-
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": CHATBOT_PROMPT},
-                    {"role": "user", "content": f"Assess the following truck damages: {damages}"}
-                ]
-            )
-            chatbot_assessment = response.choices[0].message.content
-            logger.info(f"Full Chatbot response: {chatbot_assessment}")
-
-            parsed_data = parse_chatbot_response(chatbot_assessment, damages)
-            severity_score, estimated_repair_cost, urgency_level, priority_score, priority_explanation, overall_assessment = parsed_data
-
-            # Create a single TruckAssessment object for all damages
-            assessment = TruckAssessment.objects.create(
-                truck_id=f"TRUCK-{TruckAssessment.objects.count() + 1}",
-                damage_description=chatbot_assessment,
-                image_url=img_path,
-                damages=damages,
-                severity_score=Decimal(str(severity_score)),
-                estimated_repair_cost=Decimal(str(estimated_repair_cost)),
-                urgency_level=urgency_level,
-                priority_score=Decimal(str(priority_score)),
-                priority_explanation=priority_explanation
+            options = get_assessment_options(request)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        try:
+            img, upload = ingest_upload(request.FILES['image'])
+            assessment, damages = run_assessment_pipeline(
+                [img], detect=detect_micro_batched, options=options, uploads=[upload]
             )
+            return JsonResponse(build_assessment_response(assessment, damages, request))
+
+        except UploadRejected as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
+        except Exception as e:
+            logger.exception(f"Error in assess_damage view: {str(e)}")
+            return JsonResponse({'error': str(e)}, status=500)
+    else:
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+def original_hashes(images, uploads):
+    # Stored originals are named by the SHA-256 of the uploaded bytes
+    return [upload['original'].split('.')[0] if upload and upload.get('original') else None for upload in (uploads or [None] * len(images))]
+
+def annotate_and_save_images(images, batch_detections, uploads=None):
+    # Stored content-addressed, so concurrent uploads can never overwrite each other's files
+    uploads = uploads or [None] * len(images)
+    damages = []
+    stored = []
+    for index, (img, detections, upload) in enumerate(zip(images, batch_detections, uploads)):
+        damages.extend(to_damages(detections, image_index=index if len(images) > 1 else None))
+        annotate_image(img, detections)
+        annotated, thumbnail = store_annotated(img)
+        stored.append({
+            'original': upload['original'] if upload else None,
+            'annotated': annotated,
+            'thumbnail': thumbnail,
+            'width': upload['width'] if upload else img.shape[1],
+            'height': upload['height'] if upload else img.shape[0],
+            'detections': to_original_coordinates(detections, img, upload),
+        })
+    return damages, stored
+
+def run_assessment_pipeline(images, detect=detect_batch, report_progress=None, options=None, uploads=None, on_created=None):
+    # Shared by the batch endpoint and the background job worker. report_progress
+    # is called with (percent, stage) between the slow steps; on_created runs in the
+    # transaction that saves the assessment.
+    report_progress = report_progress or (lambda progress, stage: None)
+    options = options or {}
+
+    report_progress(20, 'detecting')
+    batch_detections = detect_with_cache(images, original_hashes(images, uploads), detect)
+    damages, stored = annotate_and_save_images(images, batch_detections, uploads)
+    image_url = '\n'.join(image_urls(entry)['image_url'] for entry in stored)
+
+    engine = options.get('engine', settings.ASSESSMENT_ENGINE)
+    if engine == 'rules':
+        report_progress(90, 'saving')
+        assessment = create_assessment(damages, None, image_url, engine='rules', truck_id=options.get('truck_id'), images=stored, on_created=on_created)
+        if options.get('enrich'):
+            enqueue_enrichment_job(assessment, options)
+        return assessment, damages
+
+    report_progress(50, 'assessing')
+    chatbot_assessment = request_llm_assessment(damages, use_cache=options.get('use_llm_cache', True))
+
+    report_progress(90, 'saving')
+    assessment = create_assessment(damages, chatbot_assessment, image_url, truck_id=options.get('truck_id'), images=stored, on_created=on_created)
+    return assessment, damages
+
+@csrf_exempt
+def assess_damage_batch(request):
+    # All photos of one truck: a single batched forward pass, one LLM call and
+    # one TruckAssessment covering every detection.
+    uploaded_files = request.FILES.getlist('images') if request.method == 'POST' else []
+    if not uploaded_files:
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    if len(uploaded_files) > settings.ASSESSMENT_BATCH_MAX_IMAGES:
+        return JsonResponse({'error': f"At most {settings.ASSESSMENT_BATCH_MAX_IMAGES} images per batch"}, status=400)
+
+    try:
+        options = get_assessment_options(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    try:
+        ingested = [ingest_upload(uploaded_file) for uploaded_file in uploaded_files]
+        images = [img for img, _ in ingested]
+        assessment, damages = run_assessment_pipeline(
+            images, options=options, uploads=[upload for _, upload in ingested]
+        )
 
-            response_data = {
-                'damages': damages, 
-                'image': img_base64,
-                'assessment': chatbot_assessment,
-                'severity_score': f"{severity_score:.2f}",
-                'estimated_repair_cost': f"₱ {estimated_repair_cost:.2f}",
-                'urgency_level': urgency_level.capitalize(),
-                'priority_score': f"{priority_score:.2f}",
-                'priority_explanation': priority_explanation
-            }
+        response_data = build_assessment_response(assessment, damages, request)
+        response_data['image_count'] = len(images)
 
-            return JsonResponse(response_data)
+        return JsonResponse(response_data)
 
+    except UploadRejected as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    except Exception as e:
+        logger.exception(f"Error in assess_damage_batch view: {str(e)}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+def serialize_job(job):
+    return {
+        'job_id': job.id,
+        'kind': job.kind,
+        'assessment_id': job.assessment_id,
+        'status': job.status,
+        'progress': job.progress,
+        'stage': job.stage,
+        'attempts': job.attempts,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'result': job.result,
+        'error': job.error or None,
+    }
+
+@csrf_exempt
+def submit_assessment_job(request):
+    uploaded_files = (request.FILES.getlist('images') or request.FILES.getlist('image')) if request.method == 'POST' else []
+    if not uploaded_files:
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    if len(uploaded_files) > settings.ASSESSMENT_BATCH_MAX_IMAGES:
+        return JsonResponse({'error': f"At most {settings.ASSESSMENT_BATCH_MAX_IMAGES} images per batch"}, status=400)
+
+    try:
+        options = get_assessment_options(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if any(uploaded_file.size > settings.UPLOAD_MAX_BYTES for uploaded_file in uploaded_files):
+        return JsonResponse({'error': f"Images must be at most {settings.UPLOAD_MAX_BYTES / (1024 * 1024):g} MB"}, status=413)
+
+    job = enqueue_assessment_job(uploaded_files, options=options)
+    response_data = serialize_job(job)
+    response_data['status_url'] = request.build_absolute_uri(reverse('assessment_job_status', args=[job.id]))
+    return JsonResponse(response_data, status=202)
+
+def assessment_job_status(request, job_id):
+    job = get_object_or_404(AssessmentJob, id=job_id)
+    return JsonResponse(serialize_job(job))
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def stored_image(request, name):
+    # Stored images never change (the name is their hash), so the name is a strong
+    # ETag and clients may cache them forever. Single byte ranges are supported.
+    if not is_image_name(name):
+        raise Http404('Unknown image')
+    path = stored_image_path(name)
+    if not os.path.exists(path):
+        raise Http404('Unknown image')
+
+    etag = f'"{name.split(".")[0]}"'
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        return response
+
+    size = os.path.getsize(path)
+    range_match = RANGE_PATTERN.match(request.headers.get('Range', ''))
+    if_range = request.headers.get('If-Range')
+    if range_match and (if_range is None or if_range == etag) and any(range_match.groups()):
+        start, end = range_match.groups()
+        if start:
+            start, end = int(start), min(int(end), size - 1) if end else size - 1
+        else:
+            start, end = max(0, size - int(end)), size - 1
+        if start > end or start >= size:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{size}"
+            return response
+        with open(path, 'rb') as f:
+            f.seek(start)
+            response = HttpResponse(f.read(end - start + 1), status=206, content_type=stored_image_content_type(name))
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=stored_image_content_type(name))
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+# Async (ASGI) variants. LLM calls use the async OpenAI/langchain clients so a worker
+# can keep many of them in flight; CPU-bound decoding, YOLO and image encoding run on
+# a bounded thread pool, and ORM calls go through sync_to_async.
+detector_executor = ThreadPoolExecutor(max_workers=settings.DETECTOR_EXECUTOR_WORKERS, thread_name_prefix='detector')
+
+def run_with_db(func, *args):
+    # Detector threads are not request threads, so Django never closes their
+    # connections; do it around each call like the job workers do.
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+async def run_in_detector_executor(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(detector_executor, run_with_db, func, *args)
+
+async def request_llm_assessment_async(damages, use_cache=True):
+    if use_cache:
+        cached = await sync_to_async(get_cached_assessment)(damages, assessment_prompt_version(), ASSESSMENT_LLM_MODEL)
+        if cached is not None:
+            return cached
+
+    client = await sync_to_async(providers.async_assessment_client.get, thread_sensitive=False)()
+    response = await client.chat.completions.create(
+        model=ASSESSMENT_LLM_MODEL,
+        messages=build_assessment_messages(damages),
+        **assessment_completion_options()
+    )
+    chatbot_assessment = normalize_llm_assessment(response.choices[0].message.content)
+    logger.info(f"Full Chatbot response: {chatbot_assessment}")
+
+    await sync_to_async(store_assessment)(damages, assessment_prompt_version(), ASSESSMENT_LLM_MODEL, chatbot_assessment)
+    return chatbot_assessment
+
+async def run_assessment_pipeline_async(images, options=None, uploads=None):
+    options = options or {}
+    batch_detections = await run_in_detector_executor(
+        detect_with_cache, images, original_hashes(images, uploads), detect_micro_batched
+    )
+    damages, stored = await run_in_detector_executor(annotate_and_save_images, images, batch_detections, uploads)
+    image_url = '\n'.join(image_urls(entry)['image_url'] for entry in stored)
+    truck_id = options.get('truck_id')
+
+    if options.get('engine', settings.ASSESSMENT_ENGINE) == 'rules':
+        assessment = await sync_to_async(create_assessment)(damages, None, image_url, engine='rules', truck_id=truck_id, images=stored)
+        if options.get('enrich'):
+            await sync_to_async(enqueue_enrichment_job)(assessment, options)
+        return assessment, damages
+
+    chatbot_assessment = await request_llm_assessment_async(damages, use_cache=options.get('use_llm_cache', True))
+    assessment = await sync_to_async(create_assessment)(damages, chatbot_assessment, image_url, truck_id=truck_id, images=stored)
+    return assessment, damages
+
+@csrf_exempt
+async def assess_damage_async(request):
+    if request.method == 'POST' and request.FILES.get('image'):
+        try:
+            options = get_assessment_options(request)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        try:
+            img, upload = await run_in_detector_executor(ingest_upload, request.FILES['image'])
+            assessment, damages = await run_assessment_pipeline_async([img], options, [upload])
+            return JsonResponse(build_assessment_response(assessment, damages, request))
+
+        except UploadRejected as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
         except Exception as e:
-            logger.exception(f"Error in assess_damage view: {str(e)}")
+            logger.exception(f"Error in assess_damage_async view: {str(e)}")
             return JsonResponse({'error': str(e)}, status=500)
     else:
-        return JsonResponse({'error': 'Invalid request'}, status=400)
\ No newline at end of file
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+@csrf_exempt
+async def chatbot_async(request):
+    if request.method == 'POST':
+        data = json.loads(request.body)
+        user_input = data['message']
+        chat_history = data.get('chat_history', [])
+
+        from .chatbot import to_langchain_history
+        langchain_history = to_langchain_history(chat_history)
+
+        # First use loads the index from disk; keep that off the event loop.
+        bot = await sync_to_async(providers.get_chatbot, thread_sensitive=False)()
+        answer = await bot.aask(user_input, langchain_history)
+
+        serializable_history = chat_history + [
+            {'role': 'human', 'content': user_input},
+            {'role': 'assistant', 'content': answer}
+        ]
+
+        return JsonResponse({
+            'response': answer,
+            'chat_history': serializable_history
+        })
+    return JsonResponse({'error': 'Invalid request method'}, status=400)
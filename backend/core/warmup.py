@@ -0,0 +1,153 @@
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PROCESS_STARTED_AT = time.time()
+
+# Per-process warm-up state, reported by the /health/ready endpoint.
+warmup_state = {
+    'pid': os.getpid(),
+    'status': 'pending',  # pending -> running -> ready | failed (-> running again)
+    'detector_ready': False,
+    'started_at': None,
+    'finished_at': None,
+    'warmup_seconds': None,
+    'inference_ms': [],
+    'error': None,
+    'failures': 0,
+    'retry_at': None,
+}
+_warmup_lock = threading.Lock()
+
+
+def warm_up_detector(model):
+    # Run dummy frames through the detector at the shapes real uploads are letterboxed
+    # to, so graph setup and allocator growth happen before the first real request.
+    timings = []
+    for height, width in settings.DETECTOR_WARMUP_SHAPES:
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        for _ in range(settings.DETECTOR_WARMUP_RUNS):
+            start = time.perf_counter()
+            model(frame, imgsz=settings.DETECTOR_IMAGE_SIZE, verbose=False)
+            timings.append(round((time.perf_counter() - start) * 1000, 1))
+    return timings
+
+
+def run_warmup():
+    with _warmup_lock:
+        if warmup_state['status'] in ('running', 'ready'):
+            return
+        warmup_state['status'] = 'running'
+        warmup_state['started_at'] = time.time()
+        warmup_state['error'] = None
+
+    from . import providers
+
+    start = time.perf_counter()
+    errors = []
+    # The detector first and on its own, so a chatbot or LLM client failure doesn't
+    # keep it cold; a retry skips it once it is warm.
+    if not warmup_state['detector_ready']:
+        try:
+            warmup_state['inference_ms'] = warm_up_detector(providers.detector.get())
+            warmup_state['detector_ready'] = True
+        except Exception as e:
+            errors.append(f"detector: {str(e)}")
+            logger.exception(f"Detector warm-up failed in worker {os.getpid()}: {str(e)}")
+    for provider in providers.ALL_PROVIDERS:
+        if provider is providers.detector:
+            continue
+        try:
+            provider.get()
+        except Exception as e:
+            errors.append(f"{provider.name}: {str(e)}")
+
+    warmup_state['warmup_seconds'] = round(time.perf_counter() - start, 3)
+    warmup_state['finished_at'] = time.time()
+    if errors:
+        warmup_state['failures'] += 1
+        delay = min(settings.DETECTOR_WARMUP_RETRY_MAX_SECONDS, settings.DETECTOR_WARMUP_RETRY_SECONDS * 2 ** (warmup_state['failures'] - 1))
+        warmup_state['retry_at'] = time.time() + delay
+        warmup_state['error'] = '; '.join(errors)
+        warmup_state['status'] = 'failed'
+        logger.warning(f"Warm-up failed in worker {os.getpid()}, retrying in {delay}s: {warmup_state['error']}")
+    else:
+        warmup_state['failures'] = 0
+        warmup_state['retry_at'] = None
+        warmup_state['status'] = 'ready'
+        logger.info(f"Worker {os.getpid()} warmed up in {warmup_state['warmup_seconds']:.2f}s")
+
+
+def reset_after_fork():
+    # A worker forked from a preloading master (gunicorn --preload) inherits the
+    # master's state but not its warm-up thread. Only reset here: the hook runs in
+    # every forked child (job worker processes too), and the worker's first readiness
+    # probe starts its own warm-up.
+    global _warmup_lock
+    _warmup_lock = threading.Lock()
+    warmup_state.update({
+        'pid': os.getpid(),
+        'status': 'pending',
+        'detector_ready': False,
+        'started_at': None,
+        'finished_at': None,
+        'warmup_seconds': None,
+        'inference_ms': [],
+        'error': None,
+        'failures': 0,
+        'retry_at': None,
+    })
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def start_warmup(background=None):
+    if background is None:
+        background = settings.DETECTOR_WARMUP_IN_BACKGROUND
+    if warmup_state['pid'] != os.getpid():
+        reset_after_fork()
+    if warmup_state['status'] == 'failed' and time.time() < warmup_state['retry_at']:
+        return
+    if warmup_state['status'] not in ('pending', 'failed'):
+        return
+    if background:
+        threading.Thread(target=run_warmup, name='truckmate-warmup', daemon=True).start()
+    else:
+        run_warmup()
+
+
+def get_readiness():
+    from . import providers
+    from .knowledge_base import current_index_key
+    from .semantic_cache import answer_cache
+
+    vector_store = providers.vector_store.peek()
+
+    checks = {
+        'detector': {
+            **providers.detector.status(),
+            'warm': warmup_state['detector_ready'] and warmup_state['pid'] == os.getpid(),
+            'warmup_status': warmup_state['status'],
+            'warmup_seconds': warmup_state['warmup_seconds'],
+            'warmup_inference_ms': warmup_state['inference_ms'],
+            'warmup_error': warmup_state['error'],
+            'warmup_failures': warmup_state['failures'],
+        },
+        'assessment_llm': providers.assessment_client.status(),
+        'chatbot_index': {
+            **providers.vector_store.status(),
+            'documents': vector_store.index.ntotal if vector_store is not None else 0,
+            'index_key': current_index_key()[:16],
+        },
+        'chatbot_chain': providers.chatbot.status(),
+        'chatbot_cache': answer_cache.stats(),
+    }
+    ready = checks['detector']['warm'] and checks['chatbot_chain']['loaded']
+    return ready, checks
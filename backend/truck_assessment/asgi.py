@@ -14,3 +14,12 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'truck_assessment.settings')
 
 application = get_asgi_application()
+
+# Load and warm up the detector as soon as the worker boots; /health/ready
+# reports 503 until this has finished.
+from django.conf import settings
+
+if settings.DETECTOR_WARMUP_ON_STARTUP:
+    from core.warmup import start_warmup
+
+    start_warmup()
@@ -138,10 +138,41 @@ GOOGLE_OAUTH2_REFRESH_TOKEN = os.getenv('GOOGLE_OAUTH2_REFRESH_TOKEN')
 
 # Sendista SMS API configuration
 SENDISTA_API_SECRET = os.getenv('SENDISTA_API_SECRET')
-SENDISTA_API_URL = 'https://sendista.com/api/send/sms'
+SENDISTA_API_URL = os.getenv('SENDISTA_API_URL', 'https://sendista.com/api/send/sms')
 SENDISTA_DEVICE_ID = os.getenv('SENDISTA_DEVICE_ID')
 ADMIN_PHONE_NUMBER = '+639763269593'
 
+# High-urgency alerts go through the NotificationOutbox table and are delivered by
+# `manage.py run_notification_dispatcher` (core.notifications): timeouts are
+# (connect, read) seconds per attempt; failures back off exponentially from
+# RETRY_BASE to RETRY_MAX seconds and are dead-lettered after MAX_ATTEMPTS.
+NOTIFICATION_CONNECT_TIMEOUT = float(os.getenv('NOTIFICATION_CONNECT_TIMEOUT', '3'))
+NOTIFICATION_READ_TIMEOUT = float(os.getenv('NOTIFICATION_READ_TIMEOUT', '10'))
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', '6'))
+NOTIFICATION_RETRY_BASE_SECONDS = 30
+NOTIFICATION_RETRY_MAX_SECONDS = 60 * 60
+NOTIFICATION_SENDING_TIMEOUT = 120
+NOTIFICATION_BATCH_SIZE = 50
+NOTIFICATION_POLL_SECONDS = 2.0
+NOTIFICATION_HTTP_POOL_SIZE = 4
+
+# Who gets high-urgency alerts: comma-separated channel:address pairs, channel being
+# sms or email, e.g. "sms:+639171234567,email:fleet@example.com".
+NOTIFICATION_RECIPIENTS = [
+    tuple(entry.strip().split(':', 1))
+    for entry in os.getenv('NOTIFICATION_RECIPIENTS', f'sms:{ADMIN_PHONE_NUMBER}').split(',')
+    if entry.strip()
+]
+# The first alert to a recipient goes out at once; alerts raised within the window
+# after it are coalesced into one digest (count, top N by priority, total cost) sent
+# when the window closes. 0 sends every alert on its own.
+NOTIFICATION_DIGEST_WINDOW_SECONDS = int(os.getenv('NOTIFICATION_DIGEST_WINDOW_SECONDS', '300'))
+NOTIFICATION_DIGEST_TOP_N = 3
+# Token bucket per recipient: BURST messages at once, refilled at RATE per minute.
+# Messages over the limit wait for a token (retries included).
+NOTIFICATION_RATE_LIMIT_PER_MINUTE = float(os.getenv('NOTIFICATION_RATE_LIMIT_PER_MINUTE', '2'))
+NOTIFICATION_RATE_LIMIT_BURST = int(os.getenv('NOTIFICATION_RATE_LIMIT_BURST', '5'))
+
 # Logging configuration
 LOGGING = {
     'version': 1,
@@ -195,4 +226,131 @@ REST_FRAMEWORK = {
 }
 
 # OpenAI API Key
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
\ No newline at end of file
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+
+# Chatbot knowledge base (FAISS index persisted per content hash of data/TruckMate.csv)
+CHATBOT_INDEX_DIR = os.getenv('CHATBOT_INDEX_DIR', os.path.join(BASE_DIR, 'data', 'index'))
+CHATBOT_CHUNK_SIZE = 200
+CHATBOT_CHUNK_OVERLAP = 20
+CHATBOT_EMBEDDING_MODEL = 'text-embedding-ada-002'
+CHATBOT_RETRIEVER_K = 4
+
+# Semantic answer cache: answers are reused for questions whose (rewritten) query
+# embedding is at least this cosine-similar to a cached one.
+CHATBOT_CACHE_ENABLED = os.getenv('CHATBOT_CACHE_ENABLED', 'true').lower() == 'true'
+CHATBOT_CACHE_SIMILARITY_THRESHOLD = 0.95
+CHATBOT_CACHE_TTL_SECONDS = 24 * 60 * 60
+CHATBOT_CACHE_MAX_ENTRIES = 1000
+
+# YOLO damage detector
+DETECTOR_WEIGHTS = os.getenv('DETECTOR_WEIGHTS', 'last.pt')
+DETECTOR_IMAGE_SIZE = 640
+# Warm-up runs dummy frames at the letterboxed shapes of typical landscape/portrait
+# phone photos before /health/ready reports the worker as ready.
+DETECTOR_WARMUP_SHAPES = [(480, 640), (640, 480), (640, 640)]
+DETECTOR_WARMUP_RUNS = 2
+DETECTOR_WARMUP_ON_STARTUP = os.getenv('DETECTOR_WARMUP_ON_STARTUP', 'true').lower() == 'true'
+DETECTOR_WARMUP_IN_BACKGROUND = True
+# A failed warm-up (e.g. a transient OpenAI or embeddings error) is retried by the next
+# readiness probe after RETRY_SECONDS * 2^(failures-1), at most RETRY_MAX_SECONDS.
+DETECTOR_WARMUP_RETRY_SECONDS = 5
+DETECTOR_WARMUP_RETRY_MAX_SECONDS = 300
+# Concurrent single-image requests are grouped into one forward pass. A lone request
+# waits at most DETECTOR_MAX_BATCH_WAIT_MS for company; 0 disables micro-batching.
+DETECTOR_MAX_BATCH_SIZE = int(os.getenv('DETECTOR_MAX_BATCH_SIZE', '16'))
+DETECTOR_MAX_BATCH_WAIT_MS = int(os.getenv('DETECTOR_MAX_BATCH_WAIT_MS', '10'))
+# Thread pool the async views use for decoding, YOLO inference and image encoding
+DETECTOR_EXECUTOR_WORKERS = int(os.getenv('DETECTOR_EXECUTOR_WORKERS', '4'))
+
+# Maximum number of photos accepted by the batch assessment endpoint
+ASSESSMENT_BATCH_MAX_IMAGES = 16
+
+# Assessment engine: 'llm' (OpenAI writes the assessment, scores are parsed from it)
+# or 'rules' (deterministic scoring from the detections, no network call). Uploads can
+# pick one with engine=llm|rules. Rule-based assessments can get an LLM narrative
+# added later by a background job (enrich=1 per request, or this default).
+ASSESSMENT_ENGINE = os.getenv('ASSESSMENT_ENGINE', 'llm')
+ASSESSMENT_ENRICH_RULES_WITH_LLM = os.getenv('ASSESSMENT_ENRICH_RULES_WITH_LLM', 'false').lower() == 'true'
+
+# 'text' uses the bullet-list CHATBOT_PROMPT; 'json' asks for a JSON object (OpenAI JSON
+# mode) that is parsed directly instead of scraped from prose.
+ASSESSMENT_PROMPT_FORMAT = os.getenv('ASSESSMENT_PROMPT_FORMAT', 'text')
+
+# Persistent cache of LLM damage assessments, keyed by the sorted damage classes with
+# confidences rounded down to ASSESSMENT_LLM_CACHE_CONFIDENCE_BUCKET, plus the prompt
+# version and model. Send no_cache=1 with an upload to bypass it; a TTL of 0 disables it.
+ASSESSMENT_LLM_CACHE_TTL_SECONDS = int(os.getenv('ASSESSMENT_LLM_CACHE_TTL_SECONDS', str(30 * 24 * 60 * 60)))
+ASSESSMENT_LLM_CACHE_CONFIDENCE_BUCKET = 0.1
+
+# Background assessment jobs (queued in the AssessmentJob table, no broker needed).
+# Run `manage.py run_assessment_worker --processes N`, or set
+# ASSESSMENT_JOB_INPROCESS_WORKERS to run worker threads inside each web process.
+ASSESSMENT_JOB_INPROCESS_WORKERS = int(os.getenv('ASSESSMENT_JOB_INPROCESS_WORKERS', '0'))
+ASSESSMENT_JOB_POLL_SECONDS = 1.0
+ASSESSMENT_JOB_MAX_ATTEMPTS = 3
+ASSESSMENT_JOB_STALE_SECONDS = 300
+# A failed attempt waits RETRY_BASE * 2^(attempt-1) seconds (jittered, capped at RETRY_MAX)
+ASSESSMENT_JOB_RETRY_BASE_SECONDS = 10
+ASSESSMENT_JOB_RETRY_MAX_SECONDS = 300
+
+# Assessment numbers (TRUCK-<n>, assessment_<n>.jpg) are reserved from the database
+# in blocks of this size per process; larger blocks mean fewer writes but bigger gaps.
+IDENTIFIER_BLOCK_SIZE = int(os.getenv('IDENTIFIER_BLOCK_SIZE', '20'))
+
+# Content-addressed store for uploaded and annotated images (served by core.views.stored_image)
+IMAGE_STORE_ROOT = os.getenv('IMAGE_STORE_ROOT', os.path.join(MEDIA_ROOT, 'images'))
+IMAGE_JPEG_QUALITY = 95
+IMAGE_THUMBNAIL_SIZE = 320
+IMAGE_THUMBNAIL_QUALITY = 80
+
+# Detector results cached per uploaded image (SHA-256 of the bytes). Keyed by the weights'
+# hash; least recently used entries beyond MAX_ENTRIES are evicted, 0 disables the cache.
+# Setting DETECTION_CACHE_PHASH_MAX_DISTANCE >= 0 also reuses the detections of a
+# same-size image whose dHash is within that many bits (re-encodes of the same photo),
+# checking at most PHASH_CANDIDATES entries that share the top 16 hash bits. Off by
+# default: a similar photo of a different truck can match.
+DETECTION_CACHE_MAX_ENTRIES = int(os.getenv('DETECTION_CACHE_MAX_ENTRIES', '10000'))
+DETECTION_CACHE_PHASH_MAX_DISTANCE = int(os.getenv('DETECTION_CACHE_PHASH_MAX_DISTANCE', '-1'))
+DETECTION_CACHE_PHASH_CANDIDATES = int(os.getenv('DETECTION_CACHE_PHASH_CANDIDATES', '200'))
+
+# Upload ingestion: uploads are spooled to disk, rejected above these limits, and
+# decoded at the largest 1/2, 1/4 or 1/8 scale whose long side is still at least
+# UPLOAD_DECODE_MIN_SIDE. UPLOAD_TRACE_MEMORY reports per-request peak memory in
+# /health/metrics (tracemalloc; slows allocations, use for profiling).
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', str(30 * 1024 * 1024)))
+UPLOAD_MAX_PIXELS = int(os.getenv('UPLOAD_MAX_PIXELS', str(120_000_000)))
+UPLOAD_DECODE_MIN_SIDE = int(os.getenv('UPLOAD_DECODE_MIN_SIDE', str(DETECTOR_IMAGE_SIZE)))
+UPLOAD_TRACE_MEMORY = os.getenv('UPLOAD_TRACE_MEMORY', 'false').lower() == 'true'
+
+# Dashboard and assessment API responses are cached per TruckAssessment table version
+# (core.response_cache) and revalidated with ETag / Last-Modified. 'locmem' keeps a
+# cache per process; 'file' (RESPONSE_CACHE_LOCATION) shares one between workers.
+# A TTL of 0 disables the body cache but keeps the conditional 304s.
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'locmem')
+RESPONSE_CACHE_LOCATION = os.getenv('RESPONSE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache', 'responses'))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '300'))
+RESPONSE_CACHE_ALIAS = 'responses'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    RESPONSE_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': RESPONSE_CACHE_LOCATION,
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    } if RESPONSE_CACHE_BACKEND == 'file' else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+}
+
+# Rows fetched per round trip by the streaming assessment export (core.export)
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+
+# Trend analytics (core.analytics): periods that ended more than the grace time ago
+# are cached per period until an existing assessment changes; a TTL of 0 recomputes
+# every bucket on each request.
+ANALYTICS_CACHE_TTL_SECONDS = int(os.getenv('ANALYTICS_CACHE_TTL_SECONDS', str(7 * 24 * 60 * 60)))
+ANALYTICS_CLOSED_BUCKET_GRACE_SECONDS = 300
+ANALYTICS_MAX_BUCKETS = 400
@@ -25,7 +25,7 @@ ChartJS.register(
 
 const AdminPage = ({ handleLogout }) => {
   const [dashboardData, setDashboardData] = useState(null);
-  const [filteredAssessments, setFilteredAssessments] = useState([]);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [priorityFilter, setPriorityFilter] = useState("all");
   const [urgencyFilter, setUrgencyFilter] = useState("all");
   const [dateFilter, setDateFilter] = useState("all");
@@ -41,88 +41,74 @@ const AdminPage = ({ handleLogout }) => {
     return "high";
   }, []);
 
-  const applyFiltersAndSort = useCallback(() => {
-    if (!dashboardData) return;
-
-    let filtered = dashboardData.assessments.filter((assessment) => {
-      if (
-        priorityFilter !== "all" &&
-        getPriorityCategory(assessment.priority_score) !== priorityFilter
-      )
-        return false;
-      if (
-        urgencyFilter !== "all" &&
-        (assessment.urgency_level === null ||
-          assessment.urgency_level.toLowerCase() !== urgencyFilter)
-      )
-        return false;
-      if (dateFilter !== "all") {
-        const assessmentDate = new Date(assessment.assessment_date);
-        const today = new Date();
-        if (
-          dateFilter === "week" &&
-          today - assessmentDate > 7 * 24 * 60 * 60 * 1000
-        )
-          return false;
-        if (
-          dateFilter === "month" &&
-          today - assessmentDate > 30 * 24 * 60 * 60 * 1000
-        )
-          return false;
-      }
-      return true;
-    });
-
-    filtered.sort((a, b) => {
-      if (sortBy === "date") {
-        return sortOrder === "asc"
-          ? new Date(a.assessment_date) - new Date(b.assessment_date)
-          : new Date(b.assessment_date) - new Date(a.assessment_date);
-      } else if (sortBy === "priority") {
-        return sortOrder === "asc"
-          ? a.priority_score - b.priority_score
-          : b.priority_score - a.priority_score;
-      }
-      return 0;
-    });
+  // Filtering and sorting are done by the server, so the keyset pages stay in order.
+  // date_from is a whole day: the same URL (and cursor) all day, which the response
+  // cache can answer.
+  const getFilterParams = useCallback(() => {
+    const params = { sort: `${sortOrder === "desc" ? "-" : ""}${sortBy}` };
+    if (priorityFilter !== "all") params.priority = priorityFilter;
+    if (urgencyFilter !== "all") params.urgency = urgencyFilter;
+    if (dateFilter !== "all") {
+      const since = new Date();
+      since.setDate(since.getDate() - (dateFilter === "week" ? 7 : 30));
+      const month = String(since.getMonth() + 1).padStart(2, "0");
+      const day = String(since.getDate()).padStart(2, "0");
+      params.date_from = `${since.getFullYear()}-${month}-${day}`;
+    }
+    return params;
+  }, [priorityFilter, urgencyFilter, dateFilter, sortBy, sortOrder]);
 
-    setFilteredAssessments(filtered);
-  }, [
-    dashboardData,
-    priorityFilter,
-    urgencyFilter,
-    dateFilter,
-    sortBy,
-    sortOrder,
-    getPriorityCategory,
-  ]);
+  const fetchDashboardPage = useCallback(
+    async (cursor) => {
+      const token = localStorage.getItem("token");
+      const params = { ...getFilterParams() };
+      if (cursor) params.cursor = cursor;
+      const response = await axios.get(API_ENDPOINTS.adminDashboard, {
+        headers: { Authorization: `Token ${token}` },
+        params,
+      });
+      return response.data;
+    },
+    [getFilterParams]
+  );
 
   const fetchDashboardData = useCallback(async () => {
     try {
       setIsLoading(true);
       setError(null);
-      const token = localStorage.getItem("token");
-      const response = await axios.get(API_ENDPOINTS.adminDashboard, {
-        headers: { Authorization: `Token ${token}` },
-      });
-      setDashboardData(response.data);
-      setFilteredAssessments(response.data.assessments);
+      const data = await fetchDashboardPage(null);
+      setDashboardData(data);
     } catch (error) {
       console.error("Error fetching dashboard data:", error);
       setError("Failed to fetch dashboard data. Please try again later.");
     } finally {
       setIsLoading(false);
     }
-  }, []);
+  }, [fetchDashboardPage]);
+
+  const loadMore = async () => {
+    if (!dashboardData || !dashboardData.next_cursor) return;
+    try {
+      setIsLoadingMore(true);
+      const data = await fetchDashboardPage(dashboardData.next_cursor);
+      setDashboardData((previous) => ({
+        ...previous,
+        assessments: [...previous.assessments, ...data.assessments],
+        next_cursor: data.next_cursor,
+        has_more: data.has_more,
+      }));
+    } catch (error) {
+      console.error("Error fetching more assessments:", error);
+      setError("Failed to fetch dashboard data. Please try again later.");
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
 
   useEffect(() => {
     fetchDashboardData();
   }, [fetchDashboardData]);
 
-  useEffect(() => {
-    applyFiltersAndSort();
-  }, [applyFiltersAndSort]);
-
   const onLogout = () => {
     handleLogout();
     navigate("/", { replace: true });
@@ -153,7 +139,7 @@ const AdminPage = ({ handleLogout }) => {
         </tr>
       </thead>
       <tbody>
-        {filteredAssessments.map((assessment) => (
+        {dashboardData.assessments.map((assessment) => (
           <tr key={assessment.id}>
             <td>{assessment.truck_id}</td>
             <td>{new Date(assessment.assessment_date).toLocaleDateString()}</td>
@@ -176,13 +162,13 @@ const AdminPage = ({ handleLogout }) => {
       {
         label: "Number of Assessments",
         data: [
-          filteredAssessments.filter(
+          dashboardData.assessments.filter(
             (a) => getPriorityCategory(a.priority_score) === "low"
           ).length,
-          filteredAssessments.filter(
+          dashboardData.assessments.filter(
             (a) => getPriorityCategory(a.priority_score) === "medium"
           ).length,
-          filteredAssessments.filter(
+          dashboardData.assessments.filter(
             (a) => getPriorityCategory(a.priority_score) === "high"
           ).length,
         ],
@@ -266,6 +252,11 @@ const AdminPage = ({ handleLogout }) => {
       </div>
 
       {renderAssessmentTable()}
+      {dashboardData.has_more && (
+        <button onClick={loadMore} disabled={isLoadingMore}>
+          {isLoadingMore ? "Loading..." : "Load more"}
+        </button>
+      )}
     </div>
   );
 };
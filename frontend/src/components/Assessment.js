@@ -131,9 +131,9 @@ const Assessment = () => {
       <div className={styles.contentContainer}>
         <div className={styles.leftColumn}>
           <div className={styles.imageContainer}>
-            {assessmentData && assessmentData.image && (
+            {assessmentData && assessmentData.image_url && (
               <img
-                src={`data:image/jpeg;base64,${assessmentData.image}`}
+                src={assessmentData.image_url}
                 alt="Assessed Damage"
                 className={styles.assessmentImage}
               />